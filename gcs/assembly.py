@@ -0,0 +1,130 @@
+'''assembly
+
+Provides the chain_fragments and assemble functions, for joining many
+Polyline fragments into whole shapes.
+'''
+
+from gcs.index import Grid
+from gcs.polyline import Polyline
+
+def _matches(fragments, tolerance):
+    '''Pairs up the endpoints of the fragments, closest pairs first, each
+    endpoint at most once. Endpoint 2 * i is the first point of fragment i and
+    2 * i + 1 its last point. Returns the list of partners, None for an
+    unmatched endpoint.
+    '''
+    ends = []
+    for fragment in fragments:
+        ends.append(fragment.first)
+        ends.append(fragment.last)
+
+    grid = Grid(max(tolerance, 1.0))
+    cells = grid.bucket([p.lat for p in ends], [p.lng for p in ends])
+
+    candidates = []
+    for members in cells.itervalues():
+        for end in members:
+            point = ends[end]
+            for others in grid.neighbors(cells, point.lat, point.lng):
+                for other in others:
+                    #each pair once, and never the two ends of one fragment
+                    if other <= end or other // 2 == end // 2:
+                        continue
+                    distance = point.distance_to(ends[other])
+                    if distance <= tolerance:
+                        candidates.append((distance, end, other))
+    candidates.sort()
+
+    partners = [None] * len(ends)
+    for _, end, other in candidates:
+        if partners[end] is None and partners[other] is None:
+            partners[end] = other
+            partners[other] = end
+    return partners
+
+def chain_fragments(fragments, tolerance=1.0):
+    '''Works out how fragments join up into chains, without building them.
+
+    The endpoints of the fragments are bucketed into a grid of cells
+    tolerance meters wide, so only endpoints in neighboring cells are
+    compared, and the closest pairs within tolerance are joined first. Each
+    endpoint joins at most one other, so where three or more fragments meet
+    the closest two are joined. The joined fragments are then walked in one
+    pass, reversing fragments as needed.
+
+    :param fragments: Polylines to join.
+    :type fragments: list
+    :param tolerance: Maximum distance, in meters, between two endpoints that
+    are joined.
+    :type tolerance: number
+    :returns: One list per chain of (fragment position, reversed) tuples in
+    order along the chain. Chains are ordered by their lowest fragment
+    position, that fragment keeps its direction.
+    :rtype: list
+
+    '''
+    fragments = list(fragments)
+    partners = _matches(fragments, tolerance)
+    visited = [False] * len(fragments)
+
+    chains = []
+    for i in xrange(len(fragments)):
+        if visited[i]:
+            continue
+        visited[i] = True
+
+        after = []
+        end = partners[2 * i + 1]
+        while end is not None and not visited[end // 2]:
+            visited[end // 2] = True
+            #entered from its last point, walked backwards
+            after.append((end // 2, end % 2 == 1))
+            end = partners[end ^ 1]
+
+        before = []
+        end = partners[2 * i]
+        while end is not None and not visited[end // 2]:
+            visited[end // 2] = True
+            #entered from its first point, it comes before reversed
+            before.append((end // 2, end % 2 == 0))
+            end = partners[end ^ 1]
+
+        before.reverse()
+        chains.append(before + [(i, False)] + after)
+
+    return chains
+
+def assemble(fragments, tolerance=1.0):
+    '''Joins fragments into as few Polylines as possible (see
+    chain_fragments).
+
+    Unlike repeated calls to Polyline.splice_fuzzy, which copy the points of
+    the shape built so far on each call, every point is copied once and each
+    Polyline is built once, so hundreds of fragments take linear time.
+    Joined endpoints that are not equal are both kept.
+
+    :param fragments: Polylines to join.
+    :type fragments: list
+    :param tolerance: Maximum distance, in meters, between two endpoints that
+    are joined.
+    :type tolerance: number
+    :returns: Assembled Polylines, one per chain.
+    :rtype: list
+
+    '''
+    fragments = list(fragments)
+
+    result = []
+    for chain in chain_fragments(fragments, tolerance):
+        lats = []
+        lngs = []
+        for i, reverse in chain:
+            points = fragments[i].points
+            if reverse:
+                points = points[::-1]
+            lats.extend(p.lat for p in points)
+            lngs.extend(p.lng for p in points)
+        result.append(Polyline.from_arrays(lats, lngs))
+    return result
+
+__all__ = ['assemble', 'chain_fragments']
@@ -0,0 +1,302 @@
+'''cluster
+
+Provides the dbscan and dbscan_arrays functions, for density based clustering
+of large sets of points with a grid index, and the merge_points function,
+for merging near-duplicate points.
+'''
+
+from math import radians, sin, cos, ceil, floor, pi
+from multiprocessing import Pool
+
+from gcs.constants import RADIUS_EARTH_M
+from gcs.index import Grid
+from gcs.latlng import LatLng
+
+NOISE = -1
+'''Label of the points that are not part of any cluster'''
+
+DEFAULT_TILE_CELLS = 64
+
+class _Points(object):
+    '''Precomputed trigonometry of a set of points for repeated haversine
+    checks against a fixed distance.
+    '''
+
+    def __init__(self, lats, lngs, distance):
+        self.lat_rad = [radians(lat) for lat in lats]
+        self.lng_rad = [radians(lng) for lng in lngs]
+        self.cos_lat = [cos(lat) for lat in self.lat_rad]
+
+        #haversine a for the distance, comparing against it avoids the asin and sqrt
+        half_angle = min(distance / RADIUS_EARTH_M, pi) / 2.0
+        self.max_a = sin(half_angle) ** 2
+
+    def within(self, i, j):
+        sin_dlat_over_2 = sin((self.lat_rad[j] - self.lat_rad[i]) / 2.0)
+        sin_dlng_over_2 = sin((self.lng_rad[j] - self.lng_rad[i]) / 2.0)
+        a = sin_dlat_over_2 * sin_dlat_over_2 + \
+            self.cos_lat[i] * self.cos_lat[j] * sin_dlng_over_2 * sin_dlng_over_2
+        return a <= self.max_a
+
+def _tile_neighbors(task):
+    '''Yields (position, neighbor positions) for the own points of a tile,
+    positions are within the tile's points.
+    '''
+    count, lats, lngs, eps = task[:4]
+
+    grid = Grid(eps)
+    cells = grid.bucket(lats, lngs)
+    points = _Points(lats, lngs, eps)
+
+    for i in xrange(count):
+        neighbors = []
+        for members in grid.neighbors(cells, lats[i], lngs[i]):
+            neighbors.extend(j for j in members if j != i and points.within(i, j))
+        yield i, neighbors
+
+def _count_task(task):
+    '''Counts the neighbors of the own points of a tile, including themselves.
+    '''
+    return [len(neighbors) + 1 for _, neighbors in _tile_neighbors(task)]
+
+def _link_task(task):
+    '''Links the core points of a tile.
+
+    Returns (links, borders): links maps every core point of the tile (own or
+    halo) to a core point it is density connected to within the tile, borders
+    maps every own non-core point next to a core point to the lowest such core
+    point. Both are in positions within the tile.
+    '''
+    count, core = task[0], task[4]
+    n = len(core)
+
+    parents = range(n)
+
+    def find(i):
+        while parents[i] != i:
+            parents[i] = parents[parents[i]]
+            i = parents[i]
+        return i
+
+    borders = []
+
+    #halo points are tested too so that chains crossing the tile edge are linked
+    for i, neighbors in _tile_neighbors((n, ) + tuple(task[1:4])):
+        if core[i]:
+            for j in neighbors:
+                if core[j]:
+                    a = find(i)
+                    b = find(j)
+                    if a != b:
+                        parents[max(a, b)] = min(a, b)
+        elif i < count:
+            cores = [j for j in neighbors if core[j]]
+            if cores:
+                borders.append((i, min(cores)))
+
+    links = [(i, find(i)) for i in xrange(n) if core[i]]
+    return links, borders
+
+def _map(func, tasks, processes):
+    if not processes or processes < 2 or len(tasks) < 2:
+        return [func(task) for task in tasks]
+
+    pool = Pool(processes)
+    try:
+        return pool.map(func, tasks)
+    finally:
+        pool.close()
+        pool.join()
+
+def _tiles(grid, lats, lngs, tile_cells):
+    '''Groups the points into square tiles of tile_cells x tile_cells grid
+    cells. Returns a list of (own ids, halo ids) where the halo is every point
+    in a cell next to the tile.
+    '''
+    cells = grid.bucket(lats, lngs)
+    tiles = {}
+
+    for (y, x), members in cells.iteritems():
+        tile = (y // tile_cells, x // tile_cells)
+        tiles.setdefault(tile, ([], set()))[0].extend(members)
+
+        #the cells of the rows around that the neighbors of the cell's points
+        #can be in, rows have cells of different widths
+        west = x * grid.width(y)
+        east = (x + 1) * grid.width(y)
+        for other_y in (y - 1, y, y + 1):
+            width = grid.width(other_y)
+            first = int(floor(west / width)) - 1
+            last = int(ceil(east / width))
+            for other_x in xrange(first // tile_cells, last // tile_cells + 1):
+                other = (other_y // tile_cells, other_x)
+                if other != tile:
+                    tiles.setdefault(other, ([], set()))[1].update(members)
+
+    return [(own, sorted(halo)) for own, halo in tiles.itervalues() if own]
+
+def dbscan_arrays(lats, lngs, eps, min_samples=5, processes=None, tile_cells=DEFAULT_TILE_CELLS):
+    '''Clusters points with DBSCAN.
+
+    A point is a core point when at least min_samples points (itself
+    included) are within eps meters of it. Core points within eps of each
+    other are in the same cluster, other points within eps of a core point
+    join one of the clusters of those core points, the rest is noise.
+
+    Neighbors are found with a grid of cells at least eps meters wide (sized
+    for the latitude of each row of cells with gcs.arcdegrees), so only the 9
+    cells around a point are searched. The grid is cut into tiles of tile_cells x tile_cells cells
+    that can be processed by a pool of processes.
+
+    :param lats: Latitudes of the points.
+    :type lats: sequence
+    :param lngs: Longitudes of the points.
+    :type lngs: sequence
+    :param eps: Neighborhood radius, in meters.
+    :type eps: number
+    :param min_samples: Number of points in the neighborhood of a core point.
+    :type min_samples: number
+    :param processes: Number of worker processes, tiles are processed in this
+    process when None or less than 2.
+    :type processes: number
+    :param tile_cells: Width, in grid cells, of the tiles.
+    :type tile_cells: number
+    :returns: Cluster label of each point, clusters are numbered from 0 in
+    order of their first point, noise is labelled NOISE.
+    :rtype: list
+
+    '''
+    lats = [float(lat) for lat in lats]
+    lngs = [float(lng) for lng in lngs]
+    n = len(lats)
+
+    if len(lngs) != n:
+        raise ValueError('There must be exactly one longitude per latitude.')
+
+    if not n:
+        return []
+
+    grid = Grid(eps)
+    tiles = _tiles(grid, lats, lngs, tile_cells)
+
+    def task(own, halo, *extra):
+        ids = own + halo
+        return ((len(own), [lats[i] for i in ids], [lngs[i] for i in ids], eps) + extra, ids)
+
+    #first pass: find the core points
+    core = [False] * n
+    tasks = [task(own, halo) for own, halo in tiles]
+    for (_, ids), counts in zip(tasks, _map(_count_task, [t for t, _ in tasks], processes)):
+        for i, count in zip(ids, counts):
+            core[i] = count >= min_samples
+
+    #second pass: link the core points of each tile and find the border points
+    parents = range(n)
+
+    def find(i):
+        while parents[i] != i:
+            parents[i] = parents[parents[i]]
+            i = parents[i]
+        return i
+
+    tasks = []
+    for own, halo in tiles:
+        ids = own + halo
+        tasks.append(task(own, halo, [core[i] for i in ids]))
+
+    borders = {}
+    for (_, ids), (links, tile_borders) in zip(tasks, _map(_link_task, [t for t, _ in tasks], processes)):
+        for i, j in links:
+            a = find(ids[i])
+            b = find(ids[j])
+            if a != b:
+                parents[max(a, b)] = min(a, b)
+
+        for i, j in tile_borders:
+            borders[ids[i]] = ids[j]
+
+    labels = [NOISE] * n
+    cluster_ids = {}
+    for i in xrange(n):
+        if core[i]:
+            root = find(i)
+            if root not in cluster_ids:
+                cluster_ids[root] = len(cluster_ids)
+            labels[i] = cluster_ids[root]
+
+    for i, j in borders.iteritems():
+        labels[i] = labels[j]
+
+    return labels
+
+def dbscan(latlngs, eps, min_samples=5, processes=None, tile_cells=DEFAULT_TILE_CELLS):
+    '''Clusters LatLngs with DBSCAN, see dbscan_arrays.
+
+    :param latlngs: Points to cluster.
+    :type latlngs: list
+    :param eps: Neighborhood radius, in meters.
+    :type eps: number
+    :param min_samples: Number of points in the neighborhood of a core point.
+    :type min_samples: number
+    :param processes: Number of worker processes.
+    :type processes: number
+    :param tile_cells: Width, in grid cells, of the tiles.
+    :type tile_cells: number
+    :returns: Cluster label of each point.
+    :rtype: list
+
+    '''
+    latlngs = list(latlngs)
+    return dbscan_arrays([ll.lat for ll in latlngs], [ll.lng for ll in latlngs], eps,
+                         min_samples, processes, tile_cells)
+
+def merge_points(latlngs, tolerance):
+    '''Merges near-duplicate points by snap rounding them onto a grid of
+    cells at least tolerance meters wide (sized with gcs.arcdegrees), in a
+    single pass. The first point of a cell starts a group, the following
+    points of the cell join the first group whose first point is within
+    tolerance of them or start a new one. The points of each group are
+    replaced by their centroid.
+
+    Every point of a group is within tolerance of the group's first point,
+    so no two merged points are more than twice tolerance apart, however
+    wide the cells are near the poles. Points less than tolerance apart may
+    still be kept apart when a cell edge falls between them, use dbscan for
+    merging by exact distances.
+
+    :param latlngs: Points to merge.
+    :type latlngs: list
+    :param tolerance: Distance, in meters, from the first point of a group
+    of the points that join it, and smallest width of the grid cells.
+    :type tolerance: number
+    :returns: (merged points in order of their first input point, position
+    in the merged points of each input point).
+    :rtype: tuple
+
+    '''
+    grid = Grid(tolerance)
+
+    cells = {} #cell key -> [(first point, position in sums)] of its groups
+    sums = [] #[sum of lats, sum of lngs, count]
+    assignment = []
+    for latlng in latlngs:
+        lat, lng = latlng.lat, latlng.lng
+        groups = cells.setdefault(grid.key(lat, lng), [])
+        for first, position in groups:
+            if first.distance_to(latlng) <= tolerance:
+                break
+        else:
+            position = len(sums)
+            groups.append((latlng, position))
+            sums.append([0.0, 0.0, 0])
+
+        total = sums[position]
+        total[0] += lat
+        total[1] += lng
+        total[2] += 1
+        assignment.append(position)
+
+    merged = [LatLng(sum_lat / count, sum_lng / count) for sum_lat, sum_lng, count in sums]
+    return merged, assignment
+
+__all__ = ['NOISE', 'dbscan', 'dbscan_arrays', 'merge_points']
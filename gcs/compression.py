@@ -0,0 +1,183 @@
+'''compression
+
+Provides the TraceCompressor class, for compressing streaming GPS traces as
+the points arrive, and the compress utility function.
+'''
+
+from gcs.line import GeoLine
+from gcs.polyline import Polyline
+
+DEFAULT_MAX_WINDOW = 256
+
+class TraceCompressor(object):
+    '''Online trajectory compression with the opening window algorithm.
+
+    The last kept point is the anchor of a window. Each new point is tried as
+    the end of a segment from the anchor: when a point between the two would
+    be more than tolerance meters off that segment, the point before the new
+    one is kept and becomes the new anchor.
+
+    Without timestamps the error of a point is its distance to the segment.
+    With timestamps it is the synchronized distance: the distance to where the
+    point would be at the same time if it moved along the segment at a
+    constant speed, which also keeps the points where the speed changed.
+
+    Kept points are appended to a Polyline as they are decided.
+
+    >>> from gcs import LatLng
+    >>> compressor = TraceCompressor(5.0)
+    >>> for i in range(10):
+    ...     _ = compressor.push(LatLng(35.0, -78.0 + i * 0.0001))
+    >>> len(compressor.finish())
+    2
+
+    '''
+
+    def __init__(self, tolerance, max_window=DEFAULT_MAX_WINDOW):
+        '''Creates a new TraceCompressor.
+
+        :param tolerance: Maximum error, in meters, of a dropped point.
+        :type tolerance: number
+        :param max_window: Maximum number of points between kept points, when
+        the window reaches it the last point is kept regardless of the error.
+        This bounds the work done for each new point.
+        :type max_window: number
+
+        '''
+        if max_window < 1:
+            raise ValueError('max_window must be at least 1.')
+
+        self.tolerance = tolerance
+        self.max_window = max_window
+
+        self._polyline = None
+        self._times = []
+        self._timed = None #whether the points have timestamps, set by the first point
+        self._anchor = None #(latlng, timestamp) of the last kept point
+        self._window = [] #(latlng, timestamp) of the points after the anchor
+
+    @property
+    def polyline(self):
+        '''The Polyline of the points kept so far, None until two points have
+        been kept. The most recent points are only part of it once decided,
+        see finish.'''
+        return self._polyline
+
+    @property
+    def times(self):
+        '''Timestamps of the points in polyline, one per point if timestamps
+        were pushed, empty otherwise.'''
+        return self._times
+
+    def _error(self, anchor, end, point):
+        '''Error, in meters, of dropping point if anchor and end are kept.
+
+        '''
+        latlng, timestamp = point
+        start, start_time = anchor
+        end_latlng, end_time = end
+
+        if timestamp is None or start_time is None or end_time is None or end_time == start_time:
+            return GeoLine(start, end_latlng).closest_point(latlng).distance_to(latlng)
+
+        line = GeoLine(start, end_latlng)
+        ratio = float(timestamp - start_time) / (end_time - start_time)
+        return line.point_at_distance(line.distance * ratio).distance_to(latlng)
+
+    def _keep(self, point):
+        latlng, timestamp = point
+
+        if self._polyline is None:
+            self._polyline = Polyline([self._anchor[0], latlng])
+        else:
+            self._polyline.append(latlng)
+
+        if timestamp is not None:
+            self._times.append(timestamp)
+
+        self._anchor = point
+
+    def push(self, latlng, timestamp=None):
+        '''Adds the next point of the trace.
+
+        :param latlng: Position.
+        :type latlng: LatLng
+        :param timestamp: Time of the position, in seconds, optional but
+        either given for every point of the trace or for none.
+        :type timestamp: number
+        :returns: List of the points that were kept because of this point.
+        :rtype: list
+
+        '''
+        if self._timed is None:
+            self._timed = timestamp is not None
+        elif self._timed != (timestamp is not None):
+            #times must line up with the kept points
+            raise ValueError('Either every point or no point of a trace must have a timestamp.')
+
+        point = (latlng, timestamp)
+
+        if self._anchor is None:
+            self._anchor = point
+            if timestamp is not None:
+                self._times.append(timestamp)
+            return []
+
+        kept = []
+        if self._window and (len(self._window) >= self.max_window or
+                             any(self._error(self._anchor, point, p) > self.tolerance for p in self._window)):
+            #the previous point can not be dropped, keep it and start a new window from it
+            previous = self._window[-1]
+            self._keep(previous)
+            kept.append(previous[0])
+            self._window = []
+
+        self._window.append(point)
+        return kept
+
+    def finish(self):
+        '''Keeps the last point of the trace and returns the compressed trace.
+
+        A trace of a single point gives a Polyline of that point twice, with
+        its timestamp twice in times.
+
+        :returns: Compressed Polyline, or None if no points were pushed.
+        :rtype: Polyline
+
+        '''
+        if self._window:
+            self._keep(self._window[-1])
+            self._window = []
+        elif self._polyline is None and self._anchor is not None:
+            #a Polyline of one point holds it twice, so do the times
+            self._polyline = Polyline([self._anchor[0]])
+            if self._anchor[1] is not None:
+                self._times.append(self._anchor[1])
+
+        return self._polyline
+
+def compress(latlngs, tolerance, timestamps=None):
+    '''Compresses a whole trace with a TraceCompressor.
+
+    :param latlngs: Positions of the trace, in order.
+    :type latlngs: list
+    :param tolerance: Maximum error, in meters, of a dropped point.
+    :type tolerance: number
+    :param timestamps: Time of each position, in seconds, optional.
+    :type timestamps: list
+    :returns: Compressed Polyline.
+    :rtype: Polyline
+
+    '''
+    compressor = TraceCompressor(tolerance)
+
+    if timestamps is None:
+        for latlng in latlngs:
+            compressor.push(latlng)
+    else:
+        for latlng, timestamp in zip(latlngs, timestamps):
+            compressor.push(latlng, timestamp)
+
+    return compressor.finish()
+
+__all__ = ['TraceCompressor', 'compress']
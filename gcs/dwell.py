@@ -0,0 +1,220 @@
+'''dwell
+
+Provides the detect_dwells function and the Dwell class, for finding where a
+vehicle stayed put along a GPS trace.
+'''
+
+from collections import deque
+
+from gcs.index import Grid
+from gcs.latlng import LatLng
+from gcs.trajectory import Trajectory
+
+import gcs.arcdegrees.spherical as arcdegrees
+
+class Dwell(object):
+    '''A stretch of a trace that stayed within a radius of its centroid.
+    '''
+
+    def __init__(self, start_index, end_index, start_time, end_time, centroid):
+        self.start_index = start_index #index of the first sample of the dwell
+        self.end_index = end_index #index of the last sample of the dwell
+        self.start_time = start_time
+        self.end_time = end_time
+        self.centroid = centroid
+
+    def __repr__(self):
+        return 'Dwell(%s, %s, %s)' % (self.start_time, self.end_time, repr(self.centroid))
+
+    @property
+    def duration(self):
+        '''Time between the first and the last sample of the dwell.'''
+        return self.end_time - self.start_time
+
+class _Cell(object):
+    '''Samples of a group in one grid cell, oldest first, with their extent.
+    '''
+
+    def __init__(self, lat, lng):
+        self.members = [(lat, lng)]
+        self.south = self.north = lat
+        self.west = self.east = lng
+
+    def add(self, lat, lng):
+        self.members.append((lat, lng))
+        self.south = min(self.south, lat)
+        self.north = max(self.north, lat)
+        self.west = min(self.west, lng)
+        self.east = max(self.east, lng)
+
+    def remove_oldest(self):
+        del self.members[0]
+        if self.members:
+            lats = [lat for lat, _ in self.members]
+            lngs = [lng for _, lng in self.members]
+            self.south, self.north = min(lats), max(lats)
+            self.west, self.east = min(lngs), max(lngs)
+
+class _Group(object):
+    '''Samples that all stayed within the radius of their centroid, bucketed
+    into grid cells, and the outliers seen since the last sample that joined.
+    '''
+
+    def __init__(self, sample, grid):
+        _, _, lat, _ = sample
+        self.grid = grid
+        self.samples = deque() #(index, time, lat, lng) of the samples, oldest first
+        self.count = 0
+        self.sum_lat = 0.0
+        self.sum_lng = 0.0
+        self.lat_length = arcdegrees.lat_length_at(lat) #meters per degree of latitude
+        self.lng_length = arcdegrees.lng_length_at(lat) #meters per degree of longitude
+        self.cells = {}
+        self.outliers = []
+        self.add(sample)
+
+    @property
+    def duration(self):
+        return self.samples[-1][1] - self.samples[0][1]
+
+    def fits(self, lat, lng, radius2):
+        '''Whether every sample, the new one included, would be within the
+        radius of the centroid once the new sample joins.'''
+        count = self.count + 1
+        center_lat = (self.sum_lat + lat) / count
+        center_lng = (self.sum_lng + lng) / count
+        lat_length = self.lat_length
+        lng_length = self.lng_length
+
+        dy = (lat - center_lat) * lat_length
+        dx = (lng - center_lng) * lng_length
+        if dx * dx + dy * dy > radius2:
+            return False
+
+        for cell in self.cells.itervalues():
+            #the farthest corner of the extent bounds the farthest sample
+            dy = max(abs(cell.south - center_lat), abs(cell.north - center_lat)) * lat_length
+            dx = max(abs(cell.west - center_lng), abs(cell.east - center_lng)) * lng_length
+            if dx * dx + dy * dy <= radius2:
+                continue
+
+            for member_lat, member_lng in cell.members:
+                dy = (member_lat - center_lat) * lat_length
+                dx = (member_lng - center_lng) * lng_length
+                if dx * dx + dy * dy > radius2:
+                    return False
+        return True
+
+    def add(self, sample):
+        _, _, lat, lng = sample
+        self.samples.append(sample)
+        self.count += 1
+        self.sum_lat += lat
+        self.sum_lng += lng
+        self.outliers = []
+
+        key = self.grid.key(lat, lng)
+        cell = self.cells.get(key)
+        if cell is None:
+            self.cells[key] = _Cell(lat, lng)
+        else:
+            cell.add(lat, lng)
+
+    def remove_oldest(self):
+        '''Slides the start of the group to its next sample.'''
+        _, _, lat, lng = self.samples.popleft()
+        self.count -= 1
+        self.sum_lat -= lat
+        self.sum_lng -= lng
+
+        key = self.grid.key(lat, lng)
+        cell = self.cells[key]
+        cell.remove_oldest()
+        if not cell.members:
+            del self.cells[key]
+
+    def to_dwell(self):
+        first = self.samples[0]
+        last = self.samples[-1]
+        return Dwell(first[0], last[0], first[1], last[1],
+                     LatLng(self.sum_lat / self.count, self.sum_lng / self.count))
+
+def detect_dwells(trace, radius, min_duration, times=None, max_outliers=0):
+    '''Finds the dwells in a trace in a single pass.
+
+    Samples are grouped in a window that slides along the trace while every
+    sample of the window stays within radius meters of its centroid, so a
+    slow drift can not chain into one long dwell. When the next sample does
+    not fit, a window shorter than min_duration drops its oldest sample and
+    tries again, a longer one is reported as a dwell and the next window
+    starts from the sample. Each sample joins and leaves the window at most
+    once.
+
+    The samples of the window are bucketed into a grid (see gcs.index.Grid)
+    of cells a quarter of the radius wide along with their extent, and each
+    new centroid is checked against the extents of the few cells the window
+    covers; only a cell whose extent reaches past the radius is checked
+    sample by sample. Distances are measured on a flat grid scaled with
+    gcs.arcdegrees at the first sample of each window.
+
+    :param trace: Trace to scan, either a Trajectory or a sequence of LatLngs
+    (such as a Polyline) with their times.
+    :param radius: Maximum distance, in meters, from the centroid.
+    :type radius: number
+    :param min_duration: Minimum duration of a dwell.
+    :type min_duration: number
+    :param times: Time of each sample when trace is not a Trajectory. Defaults
+    to the index of the sample, for traces sampled once a second.
+    :type times: sequence
+    :param max_outliers: Number of consecutive samples allowed outside the
+    radius before a window ends or slides, for GPS jumps during a stop.
+    Outliers are not part of the centroid, they are tried again as the next
+    samples when the window ends or slides.
+    :type max_outliers: number
+    :returns: List of Dwells, in order.
+    :rtype: list
+
+    '''
+    if isinstance(trace, Trajectory):
+        samples = ((i, t, ll.lat, ll.lng) for i, (t, ll) in enumerate(trace))
+    else:
+        if times is None:
+            times = xrange(len(trace))
+        samples = ((i, t, ll.lat, ll.lng) for i, (t, ll) in enumerate(zip(times, trace)))
+
+    result = []
+    radius2 = radius * radius
+    grid = Grid(radius / 4.0)
+    group = None
+
+    for sample in samples:
+        pending = [sample]
+        while pending:
+            sample = pending.pop(0)
+
+            if group is None:
+                group = _Group(sample, grid)
+            elif group.fits(sample[2], sample[3], radius2):
+                group.add(sample)
+            elif len(group.outliers) < max_outliers:
+                group.outliers.append(sample)
+            else:
+                #the outliers are tried again as the samples that come next
+                pending[:0] = group.outliers + [sample]
+                group.outliers = []
+
+                if group.duration >= min_duration:
+                    result.append(group.to_dwell())
+                    group = None
+                else:
+                    #too short to be a dwell, slide the start of the window
+                    group.remove_oldest()
+                    if not group.count:
+                        group = None
+
+    if group is not None and group.duration >= min_duration:
+        result.append(group.to_dwell())
+
+    return result
+
+__all__ = ['Dwell', 'detect_dwells']
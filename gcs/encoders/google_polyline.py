@@ -31,7 +31,7 @@ def encode_coords(coords):
     prev_lng = 0
     
     for x, y in coords:        
-        lat, lng = int(y * 1e5), int(x * 1e5)
+        lat, lng = int(round(y * 1e5)), int(round(x * 1e5))
         
         d_lat = _encode_value(lat - prev_lat)
         d_lng = _encode_value(lng - prev_lng)        
@@ -41,7 +41,7 @@ def encode_coords(coords):
         result.append(d_lat)
         result.append(d_lng)
     
-    return ''.join(c for r in result for c in r)
+    return ''.join(result)
     
 
 def encode_polyline(polyline):
@@ -53,7 +53,7 @@ def encode_polyline(polyline):
     :rtype: String
     
     '''
-    return encode_coords(ll.coords for ll in polyline)
+    return encode_coords((ll.lng, ll.lat) for ll in polyline)
     
 def encode_linestring(linestring):
     '''Encodes a shapely LineString object with the google encoded polyline 
@@ -84,7 +84,7 @@ def _encode_value(value):
     chunks = _split_into_chunks(value)
     
     #Step 9-10
-    return (chr(chunk + 63) for chunk in chunks)
+    return ''.join([chr(chunk + 63) for chunk in chunks])
 
 def decode(point_str):
     '''Decodes a polyline that has been encoded using Google's algorithm
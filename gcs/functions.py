@@ -3,9 +3,14 @@
 Utility functions for GCS operations.
 '''
 
-from math import radians, sin, cos, asin, sqrt
+from math import radians, sin, cos, asin, atan2, sqrt, pi
 from gcs.constants import RADIUS_EARTH_M
 
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
 def distance(a, b):
     '''Calculates the distance between two coordinates in meters using the haversine formula
     
@@ -38,6 +43,80 @@ def distance(a, b):
     a = sin_dlat_over_2 * sin_dlat_over_2 + cos(lat1) * cos(lat2) * sin_dlng_over_2 * sin_dlng_over_2        
     return RADIUS_EARTH_M * 2.0 * asin(sqrt(a))
 
+def distance_many(lats1, lngs1, lats2, lngs2):
+    '''Calculates the distance in meters between many pairs of coordinates 
+    using the haversine formula. Vectorized when numpy is available, in which 
+    case a numpy array is returned.
+    
+    :param lats1: Latitudes of the first coordinates.
+    :type lats1: sequence
+    :param lngs1: Longitudes of the first coordinates.
+    :type lngs1: sequence
+    :param lats2: Latitudes of the second coordinates.
+    :type lats2: sequence
+    :param lngs2: Longitudes of the second coordinates.
+    :type lngs2: sequence
+    :returns: Distance between each pair of coordinates, in meters.
+    :rtype: list
+    
+    '''
+    if numpy is None:
+        return [_haversine(radians(a), radians(b), radians(c), radians(d)) 
+                for a, b, c, d in zip(lats1, lngs1, lats2, lngs2)]
+    
+    lat1 = numpy.radians(numpy.asarray(lats1, dtype=float))
+    lat2 = numpy.radians(numpy.asarray(lats2, dtype=float))
+    d_lng = numpy.radians(numpy.asarray(lngs2, dtype=float) - numpy.asarray(lngs1, dtype=float))
+    
+    sin_dlat_over_2 = numpy.sin((lat2 - lat1) / 2.0)
+    sin_dlng_over_2 = numpy.sin(d_lng / 2.0)
+    
+    a = sin_dlat_over_2 * sin_dlat_over_2 + numpy.cos(lat1) * numpy.cos(lat2) * sin_dlng_over_2 * sin_dlng_over_2
+    return RADIUS_EARTH_M * 2.0 * numpy.arcsin(numpy.sqrt(numpy.minimum(a, 1.0)))
+
+def _haversine(lat1, lng1, lat2, lng2):
+    sin_dlat_over_2 = sin((lat2 - lat1) / 2.0)
+    sin_dlng_over_2 = sin((lng2 - lng1) / 2.0)
+    
+    a = sin_dlat_over_2 * sin_dlat_over_2 + cos(lat1) * cos(lat2) * sin_dlng_over_2 * sin_dlng_over_2
+    return RADIUS_EARTH_M * 2.0 * asin(sqrt(min(a, 1.0)))
+
+def bearing_many(lats1, lngs1, lats2, lngs2):
+    '''Calculates the initial bearing, in radians between 0 and 2 pi, from 
+    each first coordinate to each second coordinate (see LatLng.angle_to). 
+    Vectorized when numpy is available, in which case a numpy array is 
+    returned. Identical coordinates have a bearing of 0.0.
+    
+    :param lats1: Latitudes of the first coordinates.
+    :type lats1: sequence
+    :param lngs1: Longitudes of the first coordinates.
+    :type lngs1: sequence
+    :param lats2: Latitudes of the second coordinates.
+    :type lats2: sequence
+    :param lngs2: Longitudes of the second coordinates.
+    :type lngs2: sequence
+    :returns: Bearing from each first coordinate to each second coordinate.
+    :rtype: list
+    
+    '''
+    if numpy is None:
+        return [_bearing(radians(a), radians(b), radians(c), radians(d)) 
+                for a, b, c, d in zip(lats1, lngs1, lats2, lngs2)]
+    
+    lat1 = numpy.radians(numpy.asarray(lats1, dtype=float))
+    lat2 = numpy.radians(numpy.asarray(lats2, dtype=float))
+    d_lng = numpy.radians(numpy.asarray(lngs2, dtype=float) - numpy.asarray(lngs1, dtype=float))
+    
+    y = numpy.sin(d_lng) * numpy.cos(lat2)
+    x = numpy.cos(lat1) * numpy.sin(lat2) - numpy.sin(lat1) * numpy.cos(lat2) * numpy.cos(d_lng)
+    return numpy.arctan2(y, x) % (2 * pi)
+
+def _bearing(lat1, lng1, lat2, lng2):
+    d_lng = lng2 - lng1
+    y = sin(d_lng) * cos(lat2)
+    x = (cos(lat1) * sin(lat2)) - (sin(lat1) * cos(lat2) * cos(d_lng))
+    return atan2(y, x) % (2 * pi)
+
 def _test():
     import doctest
     doctest.testmod()
@@ -45,4 +124,4 @@ def _test():
 if __name__ == '__main__':
     _test()
     
-__all__ = ['distance']
+__all__ = ['distance', 'distance_many', 'bearing_many']
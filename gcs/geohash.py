@@ -0,0 +1,336 @@
+'''geohash
+
+Provides utility functions for bucketing coordinates into uniform grid cells,
+either as geohash strings or as integer Z-order (Morton) codes.
+
+A geohash of precision p is the base32 form of a Z-order code of 5 * p bits,
+so both keys sort and nest the same way: cells that share a prefix are
+contained in the cell of that prefix.
+'''
+
+from math import floor
+
+from gcs.latlng import LatLng
+from gcs.latlngbounds import LatLngBounds
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+
+_BASE32_VALUES = dict((c, i) for i, c in enumerate(BASE32))
+
+MAX_PRECISION = 12
+'''Longest geohash whose code fits in a 64 bit integer'''
+
+def _axis_bits(total_bits):
+    '''Returns (latitude bits, longitude bits) for a code of total_bits, the
+    longitude gets the extra bit when total_bits is odd.
+    '''
+    return total_bits // 2, (total_bits + 1) // 2
+
+def _quantize(value, low, span, bits):
+    cells = 1 << bits
+    q = int((value - low) / span * cells)
+    return min(max(q, 0), cells - 1)
+
+def _spread(value):
+    '''Spreads the bits of value so that bit i moves to bit 2i.'''
+    result = 0
+    bit = 0
+    while value:
+        result |= (value & 1) << (bit << 1)
+        value >>= 1
+        bit += 1
+    return result
+
+def _compact(value):
+    '''Inverse of _spread, gathers the even bits of value.'''
+    result = 0
+    bit = 0
+    while value:
+        result |= (value & 1) << bit
+        value >>= 2
+        bit += 1
+    return result
+
+def _interleave(lat_q, lng_q, total_bits):
+    if total_bits % 2:
+        return _spread(lng_q) | (_spread(lat_q) << 1)
+    return (_spread(lng_q) << 1) | _spread(lat_q)
+
+def _deinterleave(code, total_bits):
+    if total_bits % 2:
+        return _compact(code >> 1), _compact(code)
+    return _compact(code), _compact(code >> 1)
+
+def encode_int(lat, lng, total_bits):
+    '''Encodes a coordinate as an integer Z-order code.
+
+    :param lat: Latitude.
+    :type lat: number
+    :param lng: Longitude.
+    :type lng: number
+    :param total_bits: Number of bits in the code, shared between latitude
+    and longitude.
+    :type total_bits: number
+    :returns: Z-order code of the cell containing the coordinate.
+    :rtype: number
+
+    '''
+    lat_bits, lng_bits = _axis_bits(total_bits)
+    return _interleave(_quantize(lat, -90.0, 180.0, lat_bits),
+                       _quantize(lng, -180.0, 360.0, lng_bits),
+                       total_bits)
+
+def morton(lat, lng, bits=26):
+    '''Encodes a coordinate as a Morton code with bits bits for each axis.
+
+    >>> morton(-45.0, 90.0, 1)
+    2
+
+    :param lat: Latitude.
+    :type lat: number
+    :param lng: Longitude.
+    :type lng: number
+    :param bits: Bits of precision for each of latitude and longitude.
+    :type bits: number
+    :returns: Morton code of the cell containing the coordinate.
+    :rtype: number
+
+    '''
+    return encode_int(lat, lng, bits * 2)
+
+def encode(lat, lng, precision=9):
+    '''Encodes a coordinate as a geohash.
+
+    >>> encode(57.64911, 10.40744, 11)
+    'u4pruydqqvj'
+
+    :param lat: Latitude.
+    :type lat: number
+    :param lng: Longitude.
+    :type lng: number
+    :param precision: Number of characters in the geohash.
+    :type precision: number
+    :returns: Geohash of the cell containing the coordinate.
+    :rtype: string
+
+    '''
+    return _code_to_string(encode_int(lat, lng, precision * 5), precision)
+
+def _code_to_string(code, precision):
+    chars = []
+    for _ in xrange(precision):
+        chars.append(BASE32[code & 31])
+        code >>= 5
+    return ''.join(reversed(chars))
+
+def _string_to_code(geohash):
+    code = 0
+    try:
+        for c in geohash:
+            code = (code << 5) | _BASE32_VALUES[c]
+    except KeyError:
+        raise ValueError('Invalid geohash: %s' % geohash)
+    return code
+
+def bounds(geohash):
+    '''Returns the area covered by a geohash.
+
+    :param geohash: Geohash.
+    :type geohash: string
+    :returns: Bounds of the geohash cell.
+    :rtype: LatLngBounds
+
+    '''
+    total_bits = len(geohash) * 5
+    lat_q, lng_q = _deinterleave(_string_to_code(geohash), total_bits)
+    return _cell_bounds(lat_q, lng_q, total_bits)
+
+def _cell_bounds(lat_q, lng_q, total_bits):
+    lat_bits, lng_bits = _axis_bits(total_bits)
+    d_lat = 180.0 / (1 << lat_bits)
+    d_lng = 360.0 / (1 << lng_bits)
+    south = -90.0 + lat_q * d_lat
+    west = -180.0 + lng_q * d_lng
+    return LatLngBounds.from_edges(south, west, south + d_lat, west + d_lng)
+
+def decode(geohash):
+    '''Returns the center of a geohash cell.
+
+    :param geohash: Geohash.
+    :type geohash: string
+    :returns: Center of the geohash cell.
+    :rtype: LatLng
+
+    '''
+    cell = bounds(geohash)
+    return LatLng((cell.south + cell.north) / 2.0, (cell.west + cell.east) / 2.0)
+
+def cell_size(precision):
+    '''Returns the size, in degrees, of the cells of a given precision.
+
+    :param precision: Geohash precision.
+    :type precision: number
+    :returns: 2-tuple containing (degrees of latitude, degrees of longitude)
+    :rtype: tuple
+
+    '''
+    lat_bits, lng_bits = _axis_bits(precision * 5)
+    return (180.0 / (1 << lat_bits), 360.0 / (1 << lng_bits))
+
+def neighbors(geohash):
+    '''Returns the geohashes of the (up to) 8 cells surrounding a cell.
+    Longitude wraps around the antimeridian, there are no neighbors beyond
+    the poles.
+
+    :param geohash: Geohash.
+    :type geohash: string
+    :returns: Geohashes of the neighboring cells.
+    :rtype: list
+
+    '''
+    precision = len(geohash)
+    total_bits = precision * 5
+    lat_bits, lng_bits = _axis_bits(total_bits)
+    lat_q, lng_q = _deinterleave(_string_to_code(geohash), total_bits)
+
+    result = []
+    for d_lat in (1, 0, -1):
+        y = lat_q + d_lat
+        if not 0 <= y < (1 << lat_bits):
+            continue
+
+        for d_lng in (-1, 0, 1):
+            if d_lat == 0 and d_lng == 0:
+                continue
+
+            x = (lng_q + d_lng) % (1 << lng_bits)
+            result.append(_code_to_string(_interleave(y, x, total_bits), precision))
+    return result
+
+def cells_within(latlng, radius, precision):
+    '''Returns the geohashes of every cell that has any part within radius
+    meters of a point.
+
+    :param latlng: Center point.
+    :type latlng: LatLng
+    :param radius: Radius in meters.
+    :type radius: number
+    :param precision: Geohash precision.
+    :type precision: number
+    :returns: Geohashes of the cells.
+    :rtype: list
+
+    '''
+    total_bits = precision * 5
+    lat_bits, lng_bits = _axis_bits(total_bits)
+    area = LatLngBounds(latlng).buffer(radius)
+
+    lat_start = _quantize(area.south, -90.0, 180.0, lat_bits)
+    lat_stop = _quantize(area.north, -90.0, 180.0, lat_bits)
+
+    lng_cells = 1 << lng_bits
+    lng_start = int(floor((area.west + 180.0) / 360.0 * lng_cells))
+    lng_stop = int(floor((area.east + 180.0) / 360.0 * lng_cells))
+    if lng_stop - lng_start >= lng_cells:
+        lng_start, lng_stop = 0, lng_cells - 1
+
+    result = []
+    for y in xrange(lat_start, lat_stop + 1):
+        for x in xrange(lng_start, lng_stop + 1):
+            #measured on the unwrapped column, on the same side of the
+            #antimeridian as the point, only the code wraps around
+            if _cell_bounds(y, x, total_bits).distance_to(latlng) <= radius:
+                result.append(_code_to_string(_interleave(y, x % lng_cells, total_bits), precision))
+    return result
+
+def encode_int_many(lats, lngs, total_bits):
+    '''Encodes many coordinates as integer Z-order codes. Vectorized when
+    numpy is available, in which case a numpy uint64 array is returned.
+
+    :param lats: Latitudes.
+    :type lats: sequence
+    :param lngs: Longitudes.
+    :type lngs: sequence
+    :param total_bits: Number of bits in each code, at most 64.
+    :type total_bits: number
+    :returns: Z-order codes.
+    :rtype: list
+
+    '''
+    if total_bits > 64:
+        raise ValueError('total_bits must be at most 64.')
+
+    if numpy is None:
+        return [encode_int(lat, lng, total_bits) for lat, lng in zip(lats, lngs)]
+
+    lat_bits, lng_bits = _axis_bits(total_bits)
+    lat_q = _quantize_many(lats, -90.0, 180.0, lat_bits)
+    lng_q = _quantize_many(lngs, -180.0, 360.0, lng_bits)
+
+    if total_bits % 2:
+        return _spread_many(lng_q) | (_spread_many(lat_q) << numpy.uint64(1))
+    return (_spread_many(lng_q) << numpy.uint64(1)) | _spread_many(lat_q)
+
+def _quantize_many(values, low, span, bits):
+    cells = 1 << bits
+    q = numpy.floor((numpy.asarray(values, dtype=float) - low) / span * cells)
+    return numpy.clip(q, 0, cells - 1).astype(numpy.uint64)
+
+def _spread_many(values):
+    '''Vectorized _spread for values of at most 32 bits.'''
+    values = values & numpy.uint64(0xFFFFFFFF)
+    for shift, mask in ((16, 0x0000FFFF0000FFFF), (8, 0x00FF00FF00FF00FF),
+                        (4, 0x0F0F0F0F0F0F0F0F), (2, 0x3333333333333333),
+                        (1, 0x5555555555555555)):
+        values = (values | (values << numpy.uint64(shift))) & numpy.uint64(mask)
+    return values
+
+def morton_many(lats, lngs, bits=26):
+    '''Encodes many coordinates as Morton codes, see morton and
+    encode_int_many.
+
+    :param lats: Latitudes.
+    :type lats: sequence
+    :param lngs: Longitudes.
+    :type lngs: sequence
+    :param bits: Bits of precision for each axis, at most 32.
+    :type bits: number
+    :returns: Morton codes.
+    :rtype: list
+
+    '''
+    return encode_int_many(lats, lngs, bits * 2)
+
+def encode_many(lats, lngs, precision=9):
+    '''Encodes many coordinates as geohashes.
+
+    :param lats: Latitudes.
+    :type lats: sequence
+    :param lngs: Longitudes.
+    :type lngs: sequence
+    :param precision: Number of characters in each geohash, at most
+    MAX_PRECISION.
+    :type precision: number
+    :returns: Geohashes.
+    :rtype: list
+
+    '''
+    if precision > MAX_PRECISION:
+        raise ValueError('precision must be at most %d.' % MAX_PRECISION)
+
+    return [_code_to_string(int(code), precision) for code in encode_int_many(lats, lngs, precision * 5)]
+
+def _test():
+    import doctest
+    doctest.testmod()
+
+if __name__ == '__main__':
+    _test()
+
+__all__ = ['encode', 'decode', 'bounds', 'neighbors', 'cells_within', 'cell_size',
+           'encode_int', 'morton', 'encode_many', 'encode_int_many', 'morton_many']
@@ -0,0 +1,381 @@
+'''graph
+
+Provides the Graph class, a routable network built from Polylines, and the
+GraphSnap class.
+'''
+
+import heapq
+
+from array import array
+
+from gcs.index import BoundsIndex, Grid, PointIndex
+from gcs.intersection import intersections
+from gcs.latlng import LatLng
+from gcs.line import GeoLine
+from gcs.polyline import Polyline
+
+class GraphSnap(object):
+    '''A position on an edge of a Graph, distance meters from its start.
+    '''
+
+    def __init__(self, point, start, end, distance, distance_from_initial):
+        self.point = point
+        self.start = start #node at the start of the edge
+        self.end = end #node at the end of the edge
+        self.distance = distance #distance along the edge from start, in meters
+        self.distance_from_initial = distance_from_initial #distance of the snapped point from the point, in meters
+
+    def __repr__(self):
+        return 'GraphSnap(%s, %d, %d, %.1f)' % (repr(self.point), self.start, self.end, self.distance)
+
+class Graph(object):
+    '''A network of nodes and weighted edges built from Polylines.
+
+    The points of the Polylines become nodes, points within tolerance meters
+    of each other are merged into one node using a spatial hash (a grid of
+    cells tolerance meters wide), and the points where the Polylines cross
+    are added as nodes too. Each line segment becomes an edge weighted by its
+    length in meters.
+
+    Edges are stored as compact adjacency arrays (the edges leaving node i
+    are at offsets[i] to offsets[i + 1] of targets and weights), so the graph
+    scales to the shapes of a whole city.
+
+    >>> from gcs import LatLng, Polyline
+    >>> graph = Graph([Polyline(LatLng(35, -78), LatLng(35, -77.99)),
+    ...                Polyline(LatLng(34.995, -77.995), LatLng(35.005, -77.995))])
+    >>> len(graph)
+    5
+    >>> distance, path = graph.shortest_path(LatLng(35, -78), LatLng(35.005, -77.995))
+    >>> round(distance)
+    1011.0
+
+    '''
+
+    def __init__(self, polylines, tolerance=1.0, split_at_intersections=True, directed=False):
+        '''Builds the graph.
+
+        :param polylines: Shapes of the network.
+        :type polylines: list
+        :param tolerance: Distance, in meters, under which points are merged
+        into one node.
+        :type tolerance: number
+        :param split_at_intersections: Whether to add nodes where the
+        Polylines cross.
+        :type split_at_intersections: bool
+        :param directed: Whether edges can only be followed in the direction
+        of their Polyline.
+        :type directed: bool
+
+        '''
+        polylines = list(polylines)
+        self.tolerance = tolerance
+        self.directed = directed
+
+        #points of each shape in order, with the crossings added
+        shapes = [[(m, k, 0, p) for k, (m, p) in enumerate(zip(polyline.measures, polyline))]
+                  for polyline in polylines]
+        if split_at_intersections:
+            for crossing in intersections(polylines):
+                shapes[crossing.shape_a].append((crossing.measure_a, crossing.segment_a, 1, crossing.point))
+                shapes[crossing.shape_b].append((crossing.measure_b, crossing.segment_b, 1, crossing.point))
+        for shape in shapes:
+            shape.sort(key=lambda x: x[:3])
+
+        grid = Grid(tolerance)
+        cells = {}
+
+        self._lats = array('d')
+        self._lngs = array('d')
+
+        edges = {} #(node, node) -> weight
+        for shape in shapes:
+            previous = None
+            for _, _, _, point in shape:
+                node = self._merge(grid, cells, point)
+                if previous is not None and previous != node:
+                    weight = self.node(previous).distance_to(self.node(node))
+                    pairs = [(previous, node)] if directed else [(previous, node), (node, previous)]
+                    for pair in pairs:
+                        if pair not in edges or weight < edges[pair]:
+                            edges[pair] = weight
+                previous = node
+
+        self._build_adjacency(edges)
+
+        self._edge_index = None
+        self._node_index = None
+
+    def _merge(self, grid, cells, point):
+        '''Returns the node within tolerance of the point, adding one if there
+        is none.
+        '''
+        key = grid.key(point.lat, point.lng)
+
+        best = None
+        best_distance = None
+        for members in grid.neighbors(cells, point.lat, point.lng):
+            for node in members:
+                distance = point.distance_to(self.node(node))
+                if distance <= self.tolerance and (best is None or distance < best_distance):
+                    best = node
+                    best_distance = distance
+
+        if best is None:
+            best = len(self._lats)
+            self._lats.append(point.lat)
+            self._lngs.append(point.lng)
+            cells.setdefault(key, []).append(best)
+        return best
+
+    def _build_adjacency(self, edges):
+        count = len(self._lats)
+        degrees = [0] * (count + 1)
+        for source, _ in edges:
+            degrees[source + 1] += 1
+
+        offsets = array('l', degrees)
+        for i in xrange(1, count + 1):
+            offsets[i] += offsets[i - 1]
+
+        targets = array('l', [0] * len(edges))
+        weights = array('d', [0.0] * len(edges))
+        position = array('l', offsets[:-1])
+        for (source, target), weight in sorted(edges.iteritems()):
+            targets[position[source]] = target
+            weights[position[source]] = weight
+            position[source] += 1
+
+        self.offsets = offsets
+        self.targets = targets
+        self.weights = weights
+
+    def __len__(self):
+        '''Gets the number of nodes.
+
+        :returns: Number of nodes.
+        :rtype: number
+
+        '''
+        return len(self._lats)
+
+    @property
+    def edge_count(self):
+        '''Number of edges, each direction of an undirected edge counts.'''
+        return len(self.targets)
+
+    def node(self, i):
+        '''Gets the position of a node.
+
+        :param i: Node.
+        :type i: number
+        :returns: Position of the node.
+        :rtype: LatLng
+
+        '''
+        return LatLng(self._lats[i], self._lngs[i])
+
+    def neighbors(self, i):
+        '''Gets the edges leaving a node.
+
+        :param i: Node.
+        :type i: number
+        :returns: List of (node, weight) tuples.
+        :rtype: list
+
+        '''
+        start, stop = self.offsets[i], self.offsets[i + 1]
+        return zip(self.targets[start:stop], self.weights[start:stop])
+
+    def weight(self, source, target):
+        '''Gets the weight of the edge between two nodes, None if there is no
+        such edge.
+        '''
+        for node, weight in self.neighbors(source):
+            if node == target:
+                return weight
+        return None
+
+    def nearest_node(self, latlng):
+        '''Finds the node closest to a point.
+
+        :param latlng: Point to search around.
+        :type latlng: LatLng
+        :returns: Closest node.
+        :rtype: number
+
+        '''
+        if self._node_index is None:
+            self._node_index = PointIndex.from_arrays(self._lats, self._lngs)
+        return self._node_index.nearest(latlng)[0]
+
+    @property
+    def edge_index(self):
+        '''Spatial index over the bounds of the edges, queries return
+        (start, end) node pairs, with start < end for undirected graphs.
+        '''
+        if self._edge_index is None:
+            bounds = []
+            pairs = []
+            for source in xrange(len(self)):
+                for target, _ in self.neighbors(source):
+                    if not self.directed and target < source:
+                        continue
+                    #bounds of the arc, it can bulge beyond the nodes
+                    bounds.append(GeoLine(self.node(source), self.node(target)).bounds)
+                    pairs.append((source, target))
+            self._edge_index = BoundsIndex(bounds, pairs)
+        return self._edge_index
+
+    def snap(self, latlng):
+        '''Finds the closest position on an edge to a point, best-first
+        through edge_index.
+
+        :param latlng: Point to snap.
+        :type latlng: LatLng
+        :returns: Position on the closest edge, None for a graph without edges.
+        :rtype: GraphSnap
+
+        '''
+        best = None
+        for lower_bound, (start, end) in self.edge_index.iter_nearest(latlng):
+            if best is not None and lower_bound >= best.distance_from_initial:
+                break
+
+            origin = self.node(start)
+            point = GeoLine(origin, self.node(end)).closest_point(latlng)
+            distance = point.distance_to(latlng)
+            if best is None or distance < best.distance_from_initial:
+                best = GraphSnap(point, start, end, origin.distance_to(point), distance)
+        return best
+
+    def _search(self, starts, goals, goal_point=None):
+        '''Best-first search from several start nodes to several goal nodes.
+
+        starts maps nodes to their initial cost, goals maps nodes to the cost
+        of reaching the goal from them. With goal_point, the straight line
+        distance to it is used as an A* heuristic. Returns (cost, nodes) of the
+        cheapest path, or None.
+        '''
+        if goal_point is not None:
+            heuristic = lambda node: goal_point.distance_to(self.node(node))
+        else:
+            heuristic = lambda node: 0.0
+
+        offsets, targets, weights = self.offsets, self.targets, self.weights
+
+        costs = {}
+        previous = {}
+        heap = []
+        for node, cost in starts.iteritems():
+            if node not in costs or cost < costs[node]:
+                costs[node] = cost
+                previous[node] = None
+                heapq.heappush(heap, (cost + heuristic(node), cost, node))
+
+        best = None
+        best_node = None
+        done = set()
+        while heap:
+            estimate, cost, node = heapq.heappop(heap)
+            if best is not None and estimate >= best:
+                break
+            if node in done:
+                continue
+            done.add(node)
+
+            if node in goals and (best is None or cost + goals[node] < best):
+                best = cost + goals[node]
+                best_node = node
+
+            for k in xrange(offsets[node], offsets[node + 1]):
+                target = targets[k]
+                new_cost = cost + weights[k]
+                if target not in done and (target not in costs or new_cost < costs[target]):
+                    costs[target] = new_cost
+                    previous[target] = node
+                    heapq.heappush(heap, (new_cost + heuristic(target), new_cost, target))
+
+        if best is None:
+            return None
+
+        path = []
+        node = best_node
+        while node is not None:
+            path.append(node)
+            node = previous[node]
+        path.reverse()
+        return best, path
+
+    def dijkstra(self, source, target):
+        '''Finds the shortest path between two nodes with Dijkstra's algorithm.
+
+        :param source: Start node.
+        :type source: number
+        :param target: End node.
+        :type target: number
+        :returns: (distance in meters, list of nodes), None if the target can
+        not be reached.
+        :rtype: tuple
+
+        '''
+        return self._search({source: 0.0}, {target: 0.0})
+
+    def astar(self, source, target):
+        '''Finds the shortest path between two nodes with A*, using the great
+        circle distance to the target as the heuristic.
+
+        :param source: Start node.
+        :type source: number
+        :param target: End node.
+        :type target: number
+        :returns: (distance in meters, list of nodes), None if the target can
+        not be reached.
+        :rtype: tuple
+
+        '''
+        return self._search({source: 0.0}, {target: 0.0}, self.node(target))
+
+    def shortest_path(self, origin, destination):
+        '''Finds the shortest path between two points, snapped onto the
+        closest edges (see snap), with A*.
+
+        :param origin: Start point.
+        :type origin: LatLng
+        :param destination: End point.
+        :type destination: LatLng
+        :returns: (distance in meters, Polyline from the snapped origin to the
+        snapped destination), None if the destination can not be reached.
+        :rtype: tuple
+
+        '''
+        start = self.snap(origin)
+        end = self.snap(destination)
+        if start is None or end is None:
+            return None
+
+        def length(snap):
+            return self.weight(snap.start, snap.end)
+
+        starts = {start.end: length(start) - start.distance}
+        goals = {end.start: end.distance}
+        if not self.directed:
+            starts[start.start] = start.distance
+            goals[end.end] = length(end) - end.distance
+
+        result = self._search(starts, goals, end.point)
+
+        #both points on the same edge, in order
+        same_edge = (start.start, start.end) == (end.start, end.end)
+        if same_edge and (start.distance <= end.distance or not self.directed):
+            direct = abs(end.distance - start.distance)
+            if result is None or direct <= result[0]:
+                return direct, Polyline([start.point, end.point])
+
+        if result is None:
+            return None
+
+        distance, nodes = result
+        return distance, Polyline([start.point] + [self.node(n) for n in nodes] + [end.point])
+
+__all__ = ['Graph', 'GraphSnap']
@@ -0,0 +1,253 @@
+'''gtfs
+
+Provides the Feed class and functions for loading the shapes and stops of GTFS
+feeds in a single streaming pass over their files.
+'''
+
+import csv
+import os
+import zipfile
+
+from array import array
+from itertools import izip
+from multiprocessing import Pool
+
+from gcs.encoders.google_polyline import encode_coords, encode_polyline
+from gcs.latlng import LatLng
+from gcs.polyline import Polyline
+
+class Feed(object):
+    '''The shapes and stops of a GTFS feed.
+    '''
+
+    def __init__(self, path, shapes, stops):
+        self.path = path
+        self.shapes = shapes #shape_id -> Polyline, or encoded polyline string
+        self.stops = stops #stop_id -> LatLng
+
+    def __repr__(self):
+        return 'Feed(%r, %d shapes, %d stops)' % (self.path, len(self.shapes), len(self.stops))
+
+def _reader(csvfile):
+    '''Returns a csv reader and a dict of column name -> position from the
+    header row.
+    '''
+    reader = csv.reader(csvfile)
+    header = next(reader, [])
+    if header and header[0].startswith('\xef\xbb\xbf'):
+        header[0] = header[0][3:]
+    return reader, dict((name.strip(), i) for i, name in enumerate(header))
+
+def _columns(header, *names):
+    try:
+        return [header[name] for name in names]
+    except KeyError, e:
+        raise ValueError('Missing GTFS column %s' % e)
+
+def read_shape_columns(csvfile):
+    '''Groups the rows of a shapes.txt file by shape_id in a single pass.
+
+    The points of each shape are kept in typed arrays (see the array module)
+    and are only sorted by shape_pt_sequence if the rows were out of order.
+
+    :param csvfile: Open shapes.txt file, or any iterable of CSV lines.
+    :returns: dict of shape_id -> (latitudes, longitudes).
+    :rtype: dict
+
+    '''
+    reader, header = _reader(csvfile)
+    id_i, lat_i, lng_i, seq_i = _columns(header, 'shape_id', 'shape_pt_lat', 'shape_pt_lon', 'shape_pt_sequence')
+
+    shapes = {} #shape_id -> [sequences, lats, lngs, sorted]
+    current_id = None
+    current = None
+
+    for row in reader:
+        if not row:
+            continue
+
+        shape_id = row[id_i]
+        if shape_id != current_id:
+            #rows of a shape are usually together, so this lookup is rare
+            current_id = shape_id
+            current = shapes.get(shape_id)
+            if current is None:
+                current = shapes[shape_id] = [array('l'), array('d'), array('d'), True]
+
+        sequence = int(row[seq_i])
+        sequences = current[0]
+        if sequences and sequence < sequences[-1]:
+            current[3] = False
+
+        sequences.append(sequence)
+        current[1].append(float(row[lat_i]))
+        current[2].append(float(row[lng_i]))
+
+    result = {}
+    for shape_id, (sequences, lats, lngs, in_order) in shapes.iteritems():
+        if not in_order:
+            order = sorted(xrange(len(sequences)), key=sequences.__getitem__)
+            lats = array('d', (lats[i] for i in order))
+            lngs = array('d', (lngs[i] for i in order))
+        result[shape_id] = (lats, lngs)
+
+    return result
+
+def read_shapes(csvfile, encoded=False):
+    '''Loads the shapes of a shapes.txt file, see read_shape_columns.
+
+    :param csvfile: Open shapes.txt file, or any iterable of CSV lines.
+    :param encoded: Whether to return google encoded polylines instead of
+    Polylines.
+    :type encoded: bool
+    :returns: dict of shape_id -> Polyline (or encoded polyline string).
+    :rtype: dict
+
+    '''
+    columns = read_shape_columns(csvfile)
+    return _build_shapes(columns, encoded)
+
+def _build_shapes(columns, encoded):
+    if encoded:
+        return dict((shape_id, encode_coords(izip(lngs, lats)))
+                    for shape_id, (lats, lngs) in columns.iteritems())
+
+    return dict((shape_id, Polyline.from_arrays(lats, lngs))
+                for shape_id, (lats, lngs) in columns.iteritems())
+
+def read_stop_coords(csvfile):
+    '''Reads the positions of the stops of a stops.txt file. Stops without a
+    position (such as generic nodes) are skipped.
+
+    :param csvfile: Open stops.txt file, or any iterable of CSV lines.
+    :returns: dict of stop_id -> (latitude, longitude).
+    :rtype: dict
+
+    '''
+    reader, header = _reader(csvfile)
+    id_i, lat_i, lng_i = _columns(header, 'stop_id', 'stop_lat', 'stop_lon')
+
+    stops = {}
+    for row in reader:
+        if row and row[lat_i] and row[lng_i]:
+            stops[row[id_i]] = (float(row[lat_i]), float(row[lng_i]))
+    return stops
+
+def read_stops(csvfile):
+    '''Loads the stops of a stops.txt file, see read_stop_coords.
+
+    :param csvfile: Open stops.txt file, or any iterable of CSV lines.
+    :returns: dict of stop_id -> LatLng.
+    :rtype: dict
+
+    '''
+    return dict((stop_id, LatLng(lat, lng)) for stop_id, (lat, lng) in read_stop_coords(csvfile).iteritems())
+
+def _read_member(archive, path, name, read):
+    '''Reads a file of a feed with read. The feed is either a directory or a
+    zip file, archive is the open zip file or None. Returns None if the feed
+    does not have the file.
+    '''
+    if archive is None:
+        filename = os.path.join(path, name)
+        if not os.path.exists(filename):
+            return None
+        csvfile = open(filename, 'rb')
+    else:
+        if name not in archive.namelist():
+            return None
+        csvfile = archive.open(name)
+
+    try:
+        return read(csvfile)
+    finally:
+        csvfile.close()
+
+def _read_feed(task):
+    '''Reads the raw columns of a feed, in a worker process. Shapes are
+    encoded here when requested since the strings are cheap to send back.
+    '''
+    path, encoded = task
+
+    archive = None if os.path.isdir(path) else zipfile.ZipFile(path)
+    try:
+        shapes = _read_member(archive, path, 'shapes.txt', read_shape_columns) or {}
+        stops = _read_member(archive, path, 'stops.txt', read_stop_coords) or {}
+    finally:
+        if archive is not None:
+            archive.close()
+
+    if encoded:
+        shapes = _build_shapes(shapes, True)
+
+    return path, shapes, stops
+
+def _make_feed(path, shapes, stops, encoded):
+    if not encoded:
+        shapes = _build_shapes(shapes, False)
+    stops = dict((stop_id, LatLng(lat, lng)) for stop_id, (lat, lng) in stops.iteritems())
+    return Feed(path, shapes, stops)
+
+def load_feed(path, encoded=False):
+    '''Loads the shapes and stops of a GTFS feed.
+
+    :param path: Path of the feed, either a directory or a zip file.
+    :type path: string
+    :param encoded: Whether to keep the shapes as google encoded polylines
+    instead of Polylines.
+    :type encoded: bool
+    :returns: The shapes and stops of the feed.
+    :rtype: Feed
+
+    '''
+    return _make_feed(*(_read_feed((path, encoded)) + (encoded, )))
+
+def load_feeds(paths, processes=None, encoded=False):
+    '''Loads the shapes and stops of many GTFS feeds, reading the files with
+    a pool of processes. Polylines are built in this process from the columns
+    sent back by the workers, which is cheaper than sending the Polylines.
+
+    :param paths: Paths of the feeds, see load_feed.
+    :type paths: list
+    :param processes: Number of worker processes, the feeds are read in this
+    process when None or less than 2.
+    :type processes: number
+    :param encoded: Whether to keep the shapes as google encoded polylines.
+    :type encoded: bool
+    :returns: A Feed for each path, in order.
+    :rtype: list
+
+    '''
+    tasks = [(path, encoded) for path in paths]
+
+    if not processes or processes < 2 or len(tasks) < 2:
+        results = [_read_feed(task) for task in tasks]
+    else:
+        pool = Pool(processes)
+        try:
+            results = pool.map(_read_feed, tasks)
+        finally:
+            pool.close()
+            pool.join()
+
+    return [_make_feed(path, shapes, stops, encoded) for path, shapes, stops in results]
+
+def write_encoded_shapes(shapes, csvfile):
+    '''Writes shapes as a CSV file of shape_id, encoded_polyline rows, sorted
+    by shape_id.
+
+    :param shapes: dict of shape_id -> Polyline or encoded polyline string.
+    :type shapes: dict
+    :param csvfile: Open file to write to.
+
+    '''
+    writer = csv.writer(csvfile)
+    writer.writerow(['shape_id', 'encoded_polyline'])
+    for shape_id in sorted(shapes):
+        shape = shapes[shape_id]
+        if isinstance(shape, Polyline):
+            shape = encode_polyline(shape)
+        writer.writerow([shape_id, shape])
+
+__all__ = ['Feed', 'read_shape_columns', 'read_shapes', 'read_stop_coords', 'read_stops',
+           'load_feed', 'load_feeds', 'write_encoded_shapes']
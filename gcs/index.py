@@ -0,0 +1,806 @@
+'''index
+
+Provides the BoundsIndex, PolylineIndex and PointIndex classes, spatial indexes
+for quickly finding which of many shapes or points are near a point or an area,
+and the Grid class, a spatial hash of points.
+'''
+
+import heapq
+
+from math import asin, ceil, cos, floor, pi, radians, sin, sqrt
+
+from gcs.constants import RADIUS_EARTH_M
+from gcs.latlngbounds import LatLngBounds
+
+import gcs.arcdegrees.spherical as arcdegrees
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+DEFAULT_NODE_CAPACITY = 16
+
+class BoundsIndex(object):
+    '''A read-only R-tree over LatLngBounds, bulk loaded with the
+    Sort-Tile-Recursive (STR) algorithm.
+
+    The tree is stored implicitly, level by level: the children of node i are
+    the entries i * node_capacity through (i + 1) * node_capacity - 1 of the
+    level below. Each level is kept as four parallel sequences of edges so
+    that, when numpy is available, a whole level of the traversal is tested
+    at once.
+
+    >>> from gcs import LatLng
+    >>> index = BoundsIndex([LatLng(35, -78).buffer(10), LatLng(36, -78).buffer(10)], ['a', 'b'])
+    >>> index.within_distance(LatLng(35.0001, -78), 50)
+    ['a']
+
+    '''
+
+    def __init__(self, bounds, values=None, node_capacity=DEFAULT_NODE_CAPACITY, use_numpy=None):
+        '''Builds the index.
+
+        :param bounds: Bounds of each item to index.
+        :type bounds: list
+        :param values: Value returned by queries for each item, defaults to the
+        position of the item in bounds.
+        :type values: list
+        :param node_capacity: Maximum number of children per node.
+        :type node_capacity: number
+        :param use_numpy: Whether to vectorize traversals with numpy, defaults
+        to whether numpy is available.
+        :type use_numpy: bool
+
+        '''
+        bounds = list(bounds)
+
+        if values is None:
+            values = range(len(bounds))
+        else:
+            values = list(values)
+
+        if len(values) != len(bounds):
+            raise ValueError('There must be exactly one value per bounds.')
+
+        if node_capacity < 2:
+            raise ValueError('node_capacity must be at least 2.')
+
+        if use_numpy is None:
+            use_numpy = numpy is not None
+        elif use_numpy and numpy is None:
+            raise ImportError('numpy is required when use_numpy is True.')
+
+        self.node_capacity = node_capacity
+        self.use_numpy = use_numpy
+
+        order = _str_order(bounds, node_capacity)
+        self._bounds = [bounds[i] for i in order]
+        self._values = [values[i] for i in order]
+
+        level = ([b.south for b in self._bounds], [b.west for b in self._bounds],
+                 [b.north for b in self._bounds], [b.east for b in self._bounds])
+        levels = [level]
+
+        while len(level[0]) > node_capacity:
+            level = _pack_level(level, node_capacity)
+            levels.append(level)
+
+        if use_numpy:
+            levels = [tuple(numpy.array(edges, dtype=float) for edges in level) for level in levels]
+
+        self._levels = levels
+
+    def __len__(self):
+        '''Gets the number of items in the index.
+
+        :returns: Number of indexed items.
+        :rtype: number
+
+        '''
+        return len(self._values)
+
+    def __iter__(self):
+        '''Iterates over (bounds, value) pairs in the index, in storage order.
+
+        '''
+        for pair in zip(self._bounds, self._values):
+            yield pair
+
+    def _leaves_intersecting(self, south, west, north, east):
+        '''Returns the leaf positions whose bounds intersect the given edges.
+
+        '''
+        if not self._values:
+            return []
+
+        cap = self.node_capacity
+        top = len(self._levels) - 1
+
+        if self.use_numpy:
+            candidates = numpy.arange(len(self._levels[top][0]))
+            for depth in xrange(top, -1, -1):
+                s, w, n, e = self._levels[depth]
+                mask = ((s[candidates] <= north) & (n[candidates] >= south) &
+                        (w[candidates] <= east) & (e[candidates] >= west))
+                hits = candidates[mask]
+                if depth == 0 or not len(hits):
+                    return hits.tolist()
+
+                children = (hits[:, None] * cap + numpy.arange(cap)).ravel()
+                candidates = children[children < len(self._levels[depth - 1][0])]
+
+        candidates = xrange(len(self._levels[top][0]))
+        for depth in xrange(top, -1, -1):
+            s, w, n, e = self._levels[depth]
+            hits = [i for i in candidates
+                    if s[i] <= north and n[i] >= south and w[i] <= east and e[i] >= west]
+            if depth == 0:
+                return hits
+
+            count = len(self._levels[depth - 1][0])
+            candidates = [c for i in hits for c in xrange(i * cap, min((i + 1) * cap, count))]
+
+    def intersects(self, bounds):
+        '''Finds the items whose bounds intersect the given bounds.
+
+        :param bounds: Area to search.
+        :type bounds: LatLngBounds
+        :returns: Values of the matching items.
+        :rtype: list
+
+        '''
+        hits = self._leaves_intersecting(bounds.south, bounds.west, bounds.north, bounds.east)
+        return [self._values[i] for i in hits]
+
+    def contains(self, latlng):
+        '''Finds the items whose bounds contain the given point.
+
+        :param latlng: Point to search for.
+        :type latlng: LatLng
+        :returns: Values of the matching items.
+        :rtype: list
+
+        '''
+        hits = self._leaves_intersecting(latlng.lat, latlng.lng, latlng.lat, latlng.lng)
+        return [self._values[i] for i in hits]
+
+    def within_distance(self, latlng, distance):
+        '''Finds the items whose bounds are within a distance of a point.
+
+        :param latlng: Point to search around.
+        :type latlng: LatLng
+        :param distance: Distance in meters.
+        :type distance: number
+        :returns: Values of the matching items.
+        :rtype: list
+
+        '''
+        area = LatLngBounds(latlng).buffer(distance)
+        hits = self._leaves_intersecting(area.south, area.west, area.north, area.east)
+        return [self._values[i] for i in hits if self._bounds[i].distance_to(latlng) <= distance]
+
+    def iter_nearest(self, latlng):
+        '''Generator: yields (distance, value) pairs for every item, ordered by
+        the lower bound of the distance from the point to the item's bounds
+        (see LatLngBounds.distance_to).
+
+        Items are visited best-first, so stopping early only pays for the part
+        of the tree that was actually needed.
+
+        :param latlng: Point to search around.
+        :type latlng: LatLng
+
+        '''
+        if not self._values:
+            return
+
+        lat = latlng.lat
+        lng = latlng.lng
+        cap = self.node_capacity
+        top = len(self._levels) - 1
+
+        heap = []
+        self._push_children(heap, top, xrange(len(self._levels[top][0])), lat, lng)
+
+        while heap:
+            distance, depth, i = heapq.heappop(heap)
+            if depth == -1:
+                yield distance, self._values[i]
+            else:
+                count = len(self._levels[depth][0])
+                self._push_children(heap, depth, xrange(i * cap, min((i + 1) * cap, count)), lat, lng)
+
+    def _push_children(self, heap, depth, positions, lat, lng):
+        '''Pushes the nodes at the given positions of a level onto the search
+        heap, keyed by their lower bound distance. Leaves are pushed with a
+        depth of -1, other nodes with the depth of their children.
+
+        '''
+        s, w, n, e = self._levels[depth]
+
+        if self.use_numpy:
+            positions = numpy.arange(positions[0], positions[-1] + 1)
+            distances = _lower_bounds_numpy(lat, lng, s[positions], w[positions],
+                                            n[positions], e[positions]).tolist()
+            positions = positions.tolist()
+        else:
+            distances = [_lower_bound(lat, lng, s[i], w[i], n[i], e[i]) for i in positions]
+
+        for distance, i in zip(distances, positions):
+            heapq.heappush(heap, (distance, depth - 1, i))
+
+    def nearest(self, latlng, k=1):
+        '''Finds the k items whose bounds are closest to a point.
+
+        :param latlng: Point to search around.
+        :type latlng: LatLng
+        :param k: Number of items to return.
+        :type k: number
+        :returns: Values of the closest items, closest first.
+        :rtype: list
+
+        '''
+        result = []
+        if k < 1:
+            return result
+
+        for _, value in self.iter_nearest(latlng):
+            result.append(value)
+            if len(result) >= k:
+                break
+        return result
+
+class PolylineIndex(BoundsIndex):
+    '''A BoundsIndex over Polylines that refines bounds matches with the real
+    distance from the point to each Polyline.
+
+    '''
+
+    def __init__(self, polylines, keys=None, node_capacity=DEFAULT_NODE_CAPACITY, use_numpy=None):
+        '''Builds the index.
+
+        :param polylines: Polylines to index.
+        :type polylines: list
+        :param keys: Value returned by queries for each polyline, defaults to the
+        polylines themselves.
+        :type keys: list
+        :param node_capacity: Maximum number of children per node.
+        :type node_capacity: number
+        :param use_numpy: Whether to vectorize traversals with numpy.
+        :type use_numpy: bool
+
+        '''
+        self.polylines = list(polylines)
+        self.keys = self.polylines if keys is None else list(keys)
+
+        if len(self.keys) != len(self.polylines):
+            raise ValueError('There must be exactly one key per polyline.')
+
+        super(PolylineIndex, self).__init__([p.bounds for p in self.polylines],
+                                            node_capacity=node_capacity,
+                                            use_numpy=use_numpy)
+
+    def within_distance(self, latlng, distance):
+        '''Finds the polylines that pass within a distance of a point.
+
+        :param latlng: Point to search around.
+        :type latlng: LatLng
+        :param distance: Distance in meters.
+        :type distance: number
+        :returns: Keys of the matching polylines.
+        :rtype: list
+
+        '''
+        result = []
+        for i in super(PolylineIndex, self).within_distance(latlng, distance):
+            if latlng.distance_to(self.polylines[i].closest_point(latlng)) <= distance:
+                result.append(self.keys[i])
+        return result
+
+    def intersects(self, bounds):
+        '''Finds the polylines whose bounds intersect the given bounds.
+
+        :param bounds: Area to search.
+        :type bounds: LatLngBounds
+        :returns: Keys of the matching polylines.
+        :rtype: list
+
+        '''
+        return [self.keys[i] for i in super(PolylineIndex, self).intersects(bounds)]
+
+    def contains(self, latlng):
+        '''Finds the polylines whose bounds contain the given point.
+
+        :param latlng: Point to search for.
+        :type latlng: LatLng
+        :returns: Keys of the matching polylines.
+        :rtype: list
+
+        '''
+        return [self.keys[i] for i in super(PolylineIndex, self).contains(latlng)]
+
+    def iter_nearest(self, latlng):
+        '''Generator: yields (distance, key) pairs ordered by the real distance
+        from the point to each polyline.
+
+        :param latlng: Point to search around.
+        :type latlng: LatLng
+
+        '''
+        found = []
+        for lower_bound, i in super(PolylineIndex, self).iter_nearest(latlng):
+            #everything found so far that is closer than any remaining bounds is final
+            while found and found[0][0] <= lower_bound:
+                distance, j = heapq.heappop(found)
+                yield distance, self.keys[j]
+
+            distance = latlng.distance_to(self.polylines[i].closest_point(latlng))
+            heapq.heappush(found, (distance, i))
+
+        while found:
+            distance, j = heapq.heappop(found)
+            yield distance, self.keys[j]
+
+class PointIndex(object):
+    '''A read-only KD-tree over points for k-nearest and radius queries.
+
+    Points are stored as unit vectors on the sphere, where the straight line
+    (chord) distance between two vectors grows with the great circle distance
+    between the points. Searches prune on chord distance and report haversine
+    distances in meters, the same as LatLng.distance_to.
+
+    >>> from gcs import LatLng
+    >>> index = PointIndex([LatLng(35, -78), LatLng(36, -78), LatLng(35.1, -78)], ['a', 'b', 'c'])
+    >>> index.nearest(LatLng(35.06, -78), 2)
+    ['c', 'a']
+
+    '''
+
+    def __init__(self, points, values=None, leaf_size=DEFAULT_NODE_CAPACITY):
+        '''Builds the index.
+
+        :param points: Points to index, either LatLngs or (latitude, longitude)
+        tuples.
+        :type points: list
+        :param values: Value returned by queries for each point, defaults to the
+        position of the point in points.
+        :type values: list
+        :param leaf_size: Maximum number of points in a leaf of the tree.
+        :type leaf_size: number
+
+        '''
+        lats = []
+        lngs = []
+        for point in points:
+            lat, lng = point
+            lats.append(lat)
+            lngs.append(lng)
+
+        self._build(lats, lngs, values, leaf_size)
+
+    @classmethod
+    def from_arrays(cls, lats, lngs, values=None, leaf_size=DEFAULT_NODE_CAPACITY):
+        '''Builds an index from parallel sequences of coordinates.
+
+        :param lats: Latitudes of the points.
+        :type lats: sequence
+        :param lngs: Longitudes of the points.
+        :type lngs: sequence
+        :param values: Value returned by queries for each point.
+        :type values: list
+        :param leaf_size: Maximum number of points in a leaf of the tree.
+        :type leaf_size: number
+        :returns: Index over the points.
+        :rtype: PointIndex
+
+        '''
+        result = cls.__new__(cls)
+        result._build([float(lat) for lat in lats], [float(lng) for lng in lngs], values, leaf_size)
+        return result
+
+    def _build(self, lats, lngs, values, leaf_size):
+        if len(lats) != len(lngs):
+            raise ValueError('There must be exactly one longitude per latitude.')
+
+        if values is None:
+            values = range(len(lats))
+        else:
+            values = list(values)
+
+        if len(values) != len(lats):
+            raise ValueError('There must be exactly one value per point.')
+
+        if leaf_size < 1:
+            raise ValueError('leaf_size must be at least 1.')
+
+        vectors = [_unit_vector(lat, lng) for lat, lng in zip(lats, lngs)]
+        order = range(len(vectors))
+
+        #nodes are (lo, hi, left, right, bounding box of the vectors in order[lo:hi])
+        self._nodes = []
+        if order:
+            self._build_node(order, vectors, 0, len(order), leaf_size)
+
+        self._vectors = [vectors[i] for i in order]
+        self._values = [values[i] for i in order]
+
+    def _build_node(self, order, vectors, lo, hi, leaf_size):
+        '''Recursively splits order[lo:hi] at the median of its widest axis,
+        returns the position of the new node.
+
+        '''
+        box = [min(vectors[i][axis] for i in order[lo:hi]) for axis in xrange(3)] + \
+              [max(vectors[i][axis] for i in order[lo:hi]) for axis in xrange(3)]
+
+        position = len(self._nodes)
+        self._nodes.append(None)
+
+        if hi - lo <= leaf_size:
+            self._nodes[position] = (lo, hi, -1, -1, box)
+            return position
+
+        axis = max(xrange(3), key=lambda a: box[a + 3] - box[a])
+        order[lo:hi] = sorted(order[lo:hi], key=lambda i: vectors[i][axis])
+
+        mid = (lo + hi) // 2
+        left = self._build_node(order, vectors, lo, mid, leaf_size)
+        right = self._build_node(order, vectors, mid, hi, leaf_size)
+
+        self._nodes[position] = (lo, hi, left, right, box)
+        return position
+
+    def __len__(self):
+        '''Gets the number of points in the index.
+
+        :returns: Number of indexed points.
+        :rtype: number
+
+        '''
+        return len(self._values)
+
+    def iter_nearest(self, latlng):
+        '''Generator: yields (distance, value) pairs for every point, closest
+        first. Distances are in meters.
+
+        :param latlng: Point to search around.
+        :type latlng: LatLng
+
+        '''
+        if not self._nodes:
+            return
+
+        x, y, z = _unit_vector(latlng.lat, latlng.lng)
+        vectors = self._vectors
+        nodes = self._nodes
+
+        #entries are (squared chord, is a point, position)
+        heap = [(0.0, False, 0)]
+        while heap:
+            chord2, is_point, position = heapq.heappop(heap)
+
+            if is_point:
+                yield _chord_to_meters(chord2), self._values[position]
+                continue
+
+            lo, hi, left, right, _ = nodes[position]
+            if left == -1:
+                for i in xrange(lo, hi):
+                    vx, vy, vz = vectors[i]
+                    dx = vx - x
+                    dy = vy - y
+                    dz = vz - z
+                    heapq.heappush(heap, (dx * dx + dy * dy + dz * dz, True, i))
+            else:
+                for child in (left, right):
+                    heapq.heappush(heap, (_box_chord2(nodes[child][4], x, y, z), False, child))
+
+    def nearest(self, latlng, k=1):
+        '''Finds the k points closest to a point.
+
+        :param latlng: Point to search around.
+        :type latlng: LatLng
+        :param k: Number of points to return.
+        :type k: number
+        :returns: Values of the closest points, closest first.
+        :rtype: list
+
+        '''
+        result = []
+        if k < 1:
+            return result
+
+        for _, value in self.iter_nearest(latlng):
+            result.append(value)
+            if len(result) >= k:
+                break
+        return result
+
+    def within(self, latlng, radius):
+        '''Finds every point within a distance of a point.
+
+        :param latlng: Point to search around.
+        :type latlng: LatLng
+        :param radius: Distance in meters.
+        :type radius: number
+        :returns: List of (distance, value) tuples, closest first.
+        :rtype: list
+
+        '''
+        if not self._nodes:
+            return []
+
+        x, y, z = _unit_vector(latlng.lat, latlng.lng)
+        max_chord2 = _meters_to_chord2(radius)
+        vectors = self._vectors
+        nodes = self._nodes
+
+        found = []
+        stack = [0]
+        while stack:
+            lo, hi, left, right, box = nodes[stack.pop()]
+            if _box_chord2(box, x, y, z) > max_chord2:
+                continue
+
+            if left == -1:
+                for i in xrange(lo, hi):
+                    vx, vy, vz = vectors[i]
+                    dx = vx - x
+                    dy = vy - y
+                    dz = vz - z
+                    chord2 = dx * dx + dy * dy + dz * dz
+                    if chord2 <= max_chord2:
+                        found.append((chord2, i))
+            else:
+                stack.append(left)
+                stack.append(right)
+
+        found.sort()
+        return [(_chord_to_meters(chord2), self._values[i]) for chord2, i in found]
+
+    def nearest_many(self, latlngs, k=1):
+        '''Runs nearest for many query points.
+
+        :param latlngs: Points to search around.
+        :type latlngs: list
+        :param k: Number of points to return for each query.
+        :type k: number
+        :returns: A list with the result of nearest for each query point.
+        :rtype: list
+
+        '''
+        return [self.nearest(latlng, k) for latlng in latlngs]
+
+    def within_many(self, latlngs, radius):
+        '''Runs within for many query points.
+
+        :param latlngs: Points to search around.
+        :type latlngs: list
+        :param radius: Distance in meters.
+        :type radius: number
+        :returns: A list with the result of within for each query point.
+        :rtype: list
+
+        '''
+        return [self.within(latlng, radius) for latlng in latlngs]
+
+class Grid(object):
+    '''A spatial hash that buckets points into rows of cells at least
+    cell_size meters on each side.
+
+    The width in degrees of longitude of the cells is sized for each row, for
+    the latitude of the row and of the rows next to it, so high latitude
+    points do not narrow the cells everywhere else. Every point within
+    cell_size of a point is in one of the 3 cells around its longitude in its
+    own row or in the rows next to it, see neighbors. Cells are plain dict
+    entries of cell key -> list of members, filled by bucket or by the
+    caller.
+
+    >>> grid = Grid(100.0)
+    >>> cells = grid.bucket([35.0, 35.0005, 36.0], [-78.0, -78.0, -78.0])
+    >>> sorted(i for members in grid.neighbors(cells, 35.0002, -78.0) for i in members)
+    [0, 1]
+
+    '''
+
+    def __init__(self, cell_size):
+        '''Creates an empty grid.
+
+        :param cell_size: Smallest height and width of the cells, in meters.
+        :type cell_size: number
+
+        '''
+        self.cell_size = cell_size
+        #a degree of latitude is the shortest at the equator
+        self.d_lat = cell_size / arcdegrees.lat_length_at(0.0)
+        self._widths = {} #row -> width of its cells, in degrees of longitude
+
+    def width(self, row):
+        '''Gets the width of the cells of a row.
+
+        :param row: Row of cells, the first element of their keys.
+        :type row: number
+        :returns: Width in degrees of longitude.
+        :rtype: number
+
+        '''
+        d_lng = self._widths.get(row)
+        if d_lng is None:
+            #farthest latitude from the equator of the row and the rows next
+            #to it, plus a row of margin
+            lat = min((abs(row + 0.5) + 2.5) * self.d_lat, 90.0)
+            lng_length = arcdegrees.lng_length_at(lat)
+            d_lng = 360.0 if lng_length * 360.0 <= self.cell_size else self.cell_size / lng_length
+            self._widths[row] = d_lng
+        return d_lng
+
+    def row(self, lat):
+        '''Gets the row of cells of a latitude.
+
+        :param lat: Latitude.
+        :type lat: number
+        :returns: Row of cells.
+        :rtype: number
+
+        '''
+        return int(floor(lat / self.d_lat))
+
+    def key(self, lat, lng):
+        '''Gets the key of the cell of a point.
+
+        :param lat: Latitude of the point.
+        :type lat: number
+        :param lng: Longitude of the point.
+        :type lng: number
+        :returns: (row, column) of the cell.
+        :rtype: tuple
+
+        '''
+        row = self.row(lat)
+        return (row, int(floor(lng / self.width(row))))
+
+    def bucket(self, lats, lngs):
+        '''Buckets points into cells.
+
+        :param lats: Latitudes of the points.
+        :type lats: sequence
+        :param lngs: Longitudes of the points.
+        :type lngs: sequence
+        :returns: Cell key -> list of positions of the points in the cell.
+        :rtype: dict
+
+        '''
+        cells = {}
+        for i, (lat, lng) in enumerate(zip(lats, lngs)):
+            cells.setdefault(self.key(lat, lng), []).append(i)
+        return cells
+
+    def neighbors(self, cells, lat, lng):
+        '''Yields the member lists of the cells that can hold points within
+        cell_size meters of a point.
+
+        :param cells: Cell key -> list of members, see bucket.
+        :type cells: dict
+        :param lat: Latitude of the point.
+        :type lat: number
+        :param lng: Longitude of the point.
+        :type lng: number
+        :returns: Generator of the non empty member lists.
+        :rtype: generator
+
+        '''
+        row = self.row(lat)
+        for y in (row - 1, row, row + 1):
+            x = int(floor(lng / self.width(y)))
+            for dx in (-1, 0, 1):
+                members = cells.get((y, x + dx))
+                if members:
+                    yield members
+
+def _str_order(bounds, node_capacity):
+    '''Orders items with Sort-Tile-Recursive: sorted into vertical slices by
+    the longitude of their centers, then by latitude within each slice.
+
+    '''
+    count = len(bounds)
+    if not count:
+        return []
+
+    leaves = int(ceil(count / float(node_capacity)))
+    slices = int(ceil(sqrt(leaves)))
+    slice_size = slices * node_capacity
+
+    centers = [((b.west + b.east) / 2.0, (b.south + b.north) / 2.0) for b in bounds]
+    by_lng = sorted(xrange(count), key=lambda i: centers[i][0])
+
+    order = []
+    for start in xrange(0, count, slice_size):
+        tile = by_lng[start:start + slice_size]
+        order.extend(sorted(tile, key=lambda i: centers[i][1]))
+    return order
+
+def _pack_level(level, node_capacity):
+    '''Builds the parent level of a level by grouping consecutive entries.
+
+    '''
+    s, w, n, e = level
+    parents = ([], [], [], [])
+
+    for start in xrange(0, len(s), node_capacity):
+        stop = start + node_capacity
+        parents[0].append(min(s[start:stop]))
+        parents[1].append(min(w[start:stop]))
+        parents[2].append(max(n[start:stop]))
+        parents[3].append(max(e[start:stop]))
+
+    return parents
+
+def _lower_bound(lat, lng, south, west, north, east):
+    '''Scalar version of LatLngBounds.distance_to that works on edges.
+
+    '''
+    d_lat = max(south - lat, lat - north, 0.0)
+    if west <= lng <= east:
+        d_lng = 0.0
+    else:
+        d_lng = min((west - lng) % 360.0, (lng - east) % 360.0)
+
+    if d_lat == 0.0 and d_lng == 0.0:
+        return 0.0
+
+    sin_dlat_over_2 = sin(radians(d_lat) / 2.0)
+    sin_dlng_over_2 = sin(radians(d_lng) / 2.0)
+    cos_lat = cos(radians(lat)) * cos(radians(max(abs(south), abs(north))))
+
+    a = sin_dlat_over_2 * sin_dlat_over_2 + cos_lat * sin_dlng_over_2 * sin_dlng_over_2
+    return RADIUS_EARTH_M * 2.0 * asin(sqrt(min(a, 1.0)))
+
+def _lower_bounds_numpy(lat, lng, south, west, north, east):
+    '''Vectorized version of _lower_bound over arrays of edges.
+
+    '''
+    d_lat = numpy.maximum(numpy.maximum(south - lat, lat - north), 0.0)
+    d_lng = numpy.where((west <= lng) & (lng <= east), 0.0,
+                        numpy.minimum((west - lng) % 360.0, (lng - east) % 360.0))
+
+    sin_dlat_over_2 = numpy.sin(numpy.radians(d_lat) / 2.0)
+    sin_dlng_over_2 = numpy.sin(numpy.radians(d_lng) / 2.0)
+    cos_lat = cos(radians(lat)) * numpy.cos(numpy.radians(numpy.maximum(numpy.abs(south), numpy.abs(north))))
+
+    a = sin_dlat_over_2 * sin_dlat_over_2 + cos_lat * sin_dlng_over_2 * sin_dlng_over_2
+    return RADIUS_EARTH_M * 2.0 * numpy.arcsin(numpy.sqrt(numpy.minimum(a, 1.0)))
+
+def _unit_vector(lat, lng):
+    '''Converts a coordinate to a 3D unit vector.
+
+    '''
+    lat = radians(lat)
+    lng = radians(lng)
+    cos_lat = cos(lat)
+    return (cos_lat * cos(lng), cos_lat * sin(lng), sin(lat))
+
+def _chord_to_meters(chord2):
+    '''Converts a squared chord length between unit vectors to the great
+    circle distance in meters.
+
+    '''
+    return RADIUS_EARTH_M * 2.0 * asin(min(sqrt(chord2) / 2.0, 1.0))
+
+def _meters_to_chord2(distance):
+    '''Inverse of _chord_to_meters.
+
+    '''
+    angle = min(distance / RADIUS_EARTH_M, pi)
+    chord = 2.0 * sin(angle / 2.0)
+    return chord * chord
+
+def _box_chord2(box, x, y, z):
+    '''Squared distance from a vector to an axis aligned box of vectors.
+
+    '''
+    dx = max(box[0] - x, x - box[3], 0.0)
+    dy = max(box[1] - y, y - box[4], 0.0)
+    dz = max(box[2] - z, z - box[5], 0.0)
+    return dx * dx + dy * dy + dz * dz
+
+__all__ = ['BoundsIndex', 'PolylineIndex', 'PointIndex', 'Grid']
@@ -0,0 +1,205 @@
+'''intersection
+
+Provides the intersections and self_intersections functions and the
+Intersection class, for finding where Polylines cross each other or
+themselves.
+'''
+
+from math import radians, cos, floor
+
+from gcs.index import Grid
+from gcs.latlng import LatLng
+
+EPSILON = 1e-9
+'''Fraction of a line segment under which a crossing is snapped to its end'''
+
+class Intersection(object):
+    '''A point where a line segment of one Polyline crosses a line segment of
+    the same or of another Polyline.
+    '''
+
+    def __init__(self, point, shape_a, segment_a, measure_a, shape_b, segment_b, measure_b):
+        self.point = point
+        self.shape_a = shape_a #position of the first Polyline
+        self.segment_a = segment_a #position of the line segment in the first Polyline
+        self.measure_a = measure_a #distance along the first Polyline, in meters
+        self.shape_b = shape_b
+        self.segment_b = segment_b
+        self.measure_b = measure_b
+
+    def __repr__(self):
+        return 'Intersection(%s, %d:%d, %d:%d)' % (repr(self.point), self.shape_a, self.segment_a,
+                                                   self.shape_b, self.segment_b)
+
+def _cross(lat0, lng0, lat1, lng1, lat2, lng2, lat3, lng3):
+    '''Intersects the line segments (0, 1) and (2, 3) on a flat projection
+    centered on point 0. Returns (t, u), the position of the intersection
+    along each segment from 0 to 1, or None.
+    '''
+    scale = cos(radians(lat0))
+
+    def xy(lat, lng):
+        return ((lng - lng0 + 180.0) % 360.0 - 180.0) * scale, lat - lat0
+
+    rx, ry = xy(lat1, lng1)
+    qx, qy = xy(lat2, lng2)
+    sx, sy = xy(lat3, lng3)
+    sx -= qx
+    sy -= qy
+
+    denominator = rx * sy - ry * sx
+    if denominator == 0.0:
+        #parallel or collinear, overlaps are not reported
+        return None
+
+    t = _snap((qx * sy - qy * sx) / denominator)
+    u = _snap((qx * ry - qy * rx) / denominator)
+    if 0.0 <= t <= 1.0 and 0.0 <= u <= 1.0:
+        return t, u
+    return None
+
+def _snap(t):
+    if abs(t) <= EPSILON:
+        return 0.0
+    if abs(t - 1.0) <= EPSILON:
+        return 1.0
+    return t
+
+def _default_cell_size(polylines):
+    '''Twice the average length of the line segments, so that most segments
+    fall into one to four cells.'''
+    total = sum(p.distance for p in polylines)
+    count = sum(len(p) - 1 for p in polylines)
+    return max(2.0 * total / count, 1.0) if count else 1.0
+
+def intersections(polylines, cell_size=None, include_self=True):
+    '''Finds every point where the line segments of Polylines cross.
+
+    The line segments are bucketed into a grid of cells at least cell_size
+    meters wide (see gcs.index.Grid), and only the segments sharing a cell are
+    tested against each other, so the work grows with the number of segments
+    and crossings instead of with the square of the number of segments.
+    Segments are intersected on a flat projection, which is accurate for
+    segments of up to a few kilometers.
+
+    Consecutive segments of a Polyline, which always share a point, are not
+    reported, nor are segments that overlap without crossing. A crossing at
+    a vertex is reported once, from the first segment around the vertex, and
+    a shape that passes the same point several times crosses there each
+    time.
+
+    :param polylines: Polylines to intersect.
+    :type polylines: list
+    :param cell_size: Width of the grid cells, in meters, defaults to twice
+    the average length of the segments.
+    :type cell_size: number
+    :param include_self: Whether to report the intersections of a Polyline
+    with itself.
+    :type include_self: bool
+    :returns: Intersections, sorted by shape, segment and measure.
+    :rtype: list
+
+    '''
+    polylines = list(polylines)
+    if cell_size is None:
+        cell_size = _default_cell_size(polylines)
+
+    grid = Grid(cell_size)
+    cells = {}
+    for shape, polyline in enumerate(polylines):
+        points = polyline.points
+        for segment in xrange(len(points) - 1):
+            a = points[segment]
+            b = points[segment + 1]
+            y0, y1 = sorted((grid.row(a.lat), grid.row(b.lat)))
+            west, east = sorted((a.lng, b.lng))
+            if east - west > 180.0:
+                #crosses the antimeridian, covers both ends of the grid
+                ranges = ((-180.0, west), (east, 180.0))
+            else:
+                ranges = ((west, east), )
+
+            for y in xrange(y0, y1 + 1):
+                width = grid.width(y)
+                for west, east in ranges:
+                    for x in xrange(int(floor(west / width)), int(floor(east / width)) + 1):
+                        cells.setdefault((y, x), []).append((shape, segment))
+
+    measures = [polyline.measures for polyline in polylines]
+    points = [polyline.points for polyline in polylines]
+
+    def location(shape, segment, t):
+        #the vertex the crossing is on, the same from both segments around it
+        #and the first vertex stands for the last of a closed polyline, or
+        #the middle of the segment it crosses, which it crosses only once
+        if t not in (0.0, 1.0):
+            return segment + 0.5
+        vertex = segment + int(t)
+        if vertex == len(points[shape]) - 1 and points[shape][0] == points[shape][-1]:
+            return 0
+        return vertex
+
+    tested = set()
+    found = {}
+    for members in cells.itervalues():
+        for k, first in enumerate(members):
+            for second in members[k + 1:]:
+                pair = (first, second) if first < second else (second, first)
+                if pair in tested:
+                    continue
+                tested.add(pair)
+
+                (shape_a, i), (shape_b, j) = pair
+                if shape_a == shape_b:
+                    if not include_self or j - i < 2:
+                        continue
+                    if i == 0 and j == len(points[shape_a]) - 2 and points[shape_a][0] == points[shape_a][-1]:
+                        #the ends of a closed polyline
+                        continue
+
+                a0, a1 = points[shape_a][i], points[shape_a][i + 1]
+                b0, b1 = points[shape_b][j], points[shape_b][j + 1]
+                crossing = _cross(a0.lat, a0.lng, a1.lat, a1.lng, b0.lat, b0.lng, b1.lat, b1.lng)
+                if crossing is None:
+                    continue
+
+                t, u = crossing
+                key = (shape_a, location(shape_a, i, t), shape_b, location(shape_b, j, u))
+                if shape_a == shape_b and key[1] > key[3]:
+                    key = (shape_a, key[3], shape_b, key[1])
+
+                #a crossing at a vertex is found from the segments around it,
+                #the first of them reports it
+                previous = found.get(key)
+                if previous is not None and (previous.segment_a, previous.segment_b) < (i, j):
+                    continue
+
+                if t in (0.0, 1.0):
+                    point = a1 if t else a0
+                elif u in (0.0, 1.0):
+                    point = b1 if u else b0
+                else:
+                    d_lng = (a1.lng - a0.lng + 180.0) % 360.0 - 180.0
+                    point = LatLng(a0.lat + t * (a1.lat - a0.lat), (a0.lng + t * d_lng + 180.0) % 360.0 - 180.0)
+
+                measure_a = measures[shape_a][i] + t * (measures[shape_a][i + 1] - measures[shape_a][i])
+                measure_b = measures[shape_b][j] + u * (measures[shape_b][j + 1] - measures[shape_b][j])
+                found[key] = Intersection(point, shape_a, i, measure_a, shape_b, j, measure_b)
+
+    return sorted(found.itervalues(), key=lambda x: (x.shape_a, x.shape_b, x.measure_a, x.measure_b))
+
+def self_intersections(polyline, cell_size=None):
+    '''Finds every point where a Polyline crosses itself, such as the loops
+    of a trace, see intersections.
+
+    :param polyline: Polyline to check.
+    :type polyline: Polyline
+    :param cell_size: Width of the grid cells, in meters.
+    :type cell_size: number
+    :returns: Intersections, shape_a and shape_b are both 0.
+    :rtype: list
+
+    '''
+    return intersections([polyline], cell_size)
+
+__all__ = ['Intersection', 'intersections', 'self_intersections']
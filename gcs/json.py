@@ -3,12 +3,15 @@
 Provides a JSON Encoder for LatLng and Polyline objects.
 
 '''
+from __future__ import absolute_import
+
 try:
     from json import encoder
 except ImportError:
     from simplejson import encoder 
 
 from . import LatLng, Polyline
+from .polyline import PolylineView
 
 
 class RoundedFloat(float):    
@@ -27,7 +30,8 @@ class GcsJSONEncoder(encoder.JSONEncoder):
     
     callmap = {
             LatLng: 'encode_latlng',
-            Polyline: 'encode_polyline'
+            Polyline: 'encode_polyline',
+            PolylineView: 'encode_polyline'
             }
     
     def encode_latlng(self, object):
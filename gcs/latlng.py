@@ -226,6 +226,31 @@ class LatLng(object):
         
         return LatLngBounds(LatLng(min_lat, min_lng), LatLng(max_lat, max_lng))
         
+    def geohash(self, precision=9):
+        '''Returns the geohash of the grid cell containing the LatLng.
+        
+        :param precision: Number of characters in the geohash.
+        :type precision: number
+        :returns: Geohash.
+        :rtype: string
+        
+        '''
+        from geohash import encode
+        return encode(self._lat, self._lng, precision)
+    
+    def morton(self, bits=26):
+        '''Returns the integer Z-order (Morton) code of the grid cell 
+        containing the LatLng.
+        
+        :param bits: Bits of precision for each of latitude and longitude.
+        :type bits: number
+        :returns: Morton code.
+        :rtype: number
+        
+        '''
+        from geohash import morton
+        return morton(self._lat, self._lng, bits)
+        
     def angle_to(self, other, default=0.0):
         '''Calculates the angle from this point to another point, from the 
         center of the earth.
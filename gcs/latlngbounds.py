@@ -2,9 +2,19 @@
 
 Provides the LatLngBounds class.'''
 
+from math import sin, cos, sqrt, asin, radians
+
+from constants import RADIUS_EARTH_M
 from latlng import LatLng
 from shapely.geometry import Polygon
 
+import gcs.arcdegrees.spherical as arcdegrees
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
 class LatLngBounds(object):
     '''An isosceles trapezoid.
     '''
@@ -21,6 +31,30 @@ class LatLngBounds(object):
             self.north = ne.lat
             self.east = ne.lng
     
+    @classmethod
+    def from_edges(cls, south, west, north, east):
+        '''Creates a LatLngBounds directly from its four edges without 
+        allocating any intermediate LatLng objects.
+        
+        :param south: Southern latitude.
+        :type south: number
+        :param west: Western longitude.
+        :type west: number
+        :param north: Northern latitude.
+        :type north: number
+        :param east: Eastern longitude.
+        :type east: number
+        :returns: Bounds with the given edges.
+        :rtype: LatLngBounds
+        
+        '''
+        result = cls.__new__(cls)
+        result.south = south
+        result.west = west
+        result.north = north
+        result.east = east
+        return result
+    
     def __eq__(self, other):
         if self is other:
             return True
@@ -71,11 +105,29 @@ class LatLngBounds(object):
         return LatLng(lat, lng)
     
     def buffer(self, value):
-        sw = LatLng(self.south, self.west).buffer(value)
-        ne = LatLng(self.north, self.east).buffer(value)        
-        sw.north = ne.north
-        sw.east = ne.east        
-        return sw
+        '''Returns new bounds that extend at least value meters beyond each 
+        edge of these bounds.
+        
+        Works directly on the four edges, the longitude padding is computed at 
+        the most poleward latitude of the result so that it is never narrower 
+        than the requested distance.
+        
+        :param value: Distance in meters.
+        :type value: number
+        :returns: Buffered bounds.
+        :rtype: LatLngBounds
+        
+        '''
+        d_lat = value / arcdegrees.lat_length_at(self.south)
+        south = self.south - d_lat
+        north = self.north + d_lat
+        
+        lng_length = arcdegrees.lng_length_at(min(max(abs(south), abs(north)), 90.0))
+        if lng_length <= 0.0:
+            return LatLngBounds.from_edges(south, -180.0, north, 180.0)
+        
+        d_lng = value / lng_length
+        return LatLngBounds.from_edges(south, self.west - d_lng, north, self.east + d_lng)
     
     def expand(self, latlng):
         if self.north < latlng.lat:
@@ -94,14 +146,103 @@ class LatLngBounds(object):
         south = min(self.south, other.south)
         west = min(self.west, other.west)
         
-        return LatLngBounds(LatLng(south, west), LatLng(north, east))
+        return LatLngBounds.from_edges(south, west, north, east)
+    
+    def intersects(self, other):
+        '''Determines whether these bounds share any area (or edge) with the 
+        other bounds.
+        
+        :param other: Other bounds.
+        :type other: LatLngBounds
+        :returns: Whether or not the bounds intersect.
+        :rtype: bool
+        
+        '''
+        return (self.south <= other.north and other.south <= self.north and 
+                self.west <= other.east and other.west <= self.east)
     
+    def intersection(self, other):
+        '''Returns the bounds shared by these bounds and the other bounds.
+        
+        :param other: Other bounds.
+        :type other: LatLngBounds
+        :returns: Shared bounds, or None if the bounds do not intersect.
+        :rtype: LatLngBounds
+        
+        '''
+        if not self.intersects(other):
+            return None
+        
+        return LatLngBounds.from_edges(max(self.south, other.south), 
+                                       max(self.west, other.west), 
+                                       min(self.north, other.north), 
+                                       min(self.east, other.east))
     
     def contains(self, latlng):
         y = latlng.lat
         x = latlng.lng            
         return self.north >= y >= self.south and self.east >= x >= self.west     
     
+    def distance_to(self, latlng):
+        '''Calculates a lower bound, in meters, of the distance from a point to 
+        the closest point within the bounds.
+        
+        Each term of the haversine formula is bounded on its own: the latitude 
+        and longitude offsets by the closest edges of the bounds, the cosine 
+        of the latitude of the other point by the edge farthest from the 
+        equator. The result never overestimates the great circle distance, at 
+        any span, and can be used to prune searches.
+        
+        :param latlng: Point to measure from.
+        :type latlng: LatLng
+        :returns: Lower bound of the distance in meters, 0.0 if the point is 
+        within the bounds.
+        :rtype: number
+        
+        '''
+        y = latlng.lat
+        x = latlng.lng
+        
+        d_lat = max(self.south - y, y - self.north, 0.0)
+        if self.west <= x <= self.east:
+            d_lng = 0.0
+        else:
+            #the shorter way around, never more than 180 degrees
+            d_lng = min((self.west - x) % 360.0, (x - self.east) % 360.0)
+        
+        if d_lat == 0.0 and d_lng == 0.0:
+            return 0.0
+        
+        sin_dlat_over_2 = sin(radians(d_lat) / 2.0)
+        sin_dlng_over_2 = sin(radians(d_lng) / 2.0)
+        cos_lat = cos(radians(y)) * cos(radians(max(abs(self.south), abs(self.north))))
+        
+        a = sin_dlat_over_2 * sin_dlat_over_2 + cos_lat * sin_dlng_over_2 * sin_dlng_over_2
+        return RADIUS_EARTH_M * 2.0 * asin(sqrt(min(a, 1.0)))
+    
+    def contains_many(self, lats, lngs):
+        '''Determines which of many coordinates are within the bounds.
+        
+        When numpy is available the test is vectorized and a numpy boolean 
+        array is returned, otherwise a list of bools is returned.
+        
+        :param lats: Latitudes of the points.
+        :type lats: sequence
+        :param lngs: Longitudes of the points.
+        :type lngs: sequence
+        :returns: Mask where each entry is whether that point is contained.
+        :rtype: list
+        
+        '''
+        north, south, east, west = self.north, self.south, self.east, self.west
+        
+        if numpy is not None:
+            lats = numpy.asarray(lats, dtype=float)
+            lngs = numpy.asarray(lngs, dtype=float)
+            return (lats <= north) & (lats >= south) & (lngs <= east) & (lngs >= west)
+        
+        return [north >= y >= south and east >= x >= west for y, x in zip(lats, lngs)]
+    
     def to_polygon(self):
         origin = (self.west, self.south)
         return Polygon((
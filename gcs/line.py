@@ -3,7 +3,7 @@
 Provides the GeoLine and GeoLineSnap classes
 '''
 
-from math import sin, cos, pi
+from math import sin, cos, pi, acos, degrees, sqrt
 
 class GeoLineSnap():
     def __init__(self, point, distance_from_initial, distance_from_start, snapped_after_end):
@@ -69,6 +69,53 @@ class GeoLine(object):
     def points(self):
         return (self._start, self._end)
     
+    @property
+    def bounds(self):
+        '''Gets the bounds of the great circle arc between the endpoints, which 
+        bulges towards a pole beyond the latitudes of the endpoints on long 
+        lines. Lines crossing the antimeridian span every longitude.
+        
+        :returns: Bounds containing every point of the line.
+        :rtype: LatLngBounds
+        
+        '''
+        from latlngbounds import LatLngBounds
+        
+        start = self._start
+        end = self._end
+        south = min(start.lat, end.lat)
+        north = max(start.lat, end.lat)
+        
+        if abs(end.lng - start.lng) >= 180.0:
+            west, east = -180.0, 180.0
+        else:
+            west, east = min(start.lng, end.lng), max(start.lng, end.lng)
+        
+        ax, ay, az = _unit_vector(start)
+        bx, by, bz = _unit_vector(end)
+        dot = ax * bx + ay * by + az * bz
+        
+        #rate of change of the height above the equator plane at each end, 
+        #heading from start to end, the arc turns back in between when the 
+        #signs differ
+        rise_start = bz - dot * az
+        rise_end = dot * bz - az
+        if (rise_start > 0.0) != (rise_end > 0.0):
+            #the farthest latitude of the great circle from the angle between 
+            #its plane's normal and the polar axis
+            n_x = ay * bz - az * by
+            n_y = az * bx - ax * bz
+            n_z = ax * by - ay * bx
+            n = sqrt(n_x * n_x + n_y * n_y + n_z * n_z)
+            if n > 0.0:
+                lat = degrees(acos(min(abs(n_z) / n, 1.0)))
+                if rise_start > 0.0:
+                    north = max(north, lat)
+                else:
+                    south = min(south, -lat)
+        
+        return LatLngBounds.from_edges(south, west, north, east)
+    
     def _clean_angle(self, angle):
         '''Ensures that an angle is always between 0 and pi
         
@@ -110,15 +157,23 @@ class GeoLine(object):
         return None
     
     def closest_point(self, target):
-        '''Returns the point on the line closest to target.
+        '''Returns the point on the line closest to target, regardless of 
+        distance.
         
         '''
-        from constants import RADIUS_EARTH_KM
-        linesnap = self.snap_point(target, RADIUS_EARTH_KM)
-        if linesnap is None or target.distance_to(self.start) < linesnap.distance_from_initial:
-            return self.start
-        else:
-            return linesnap.point
+        hypotenuse = GeoLine(self._start, target)
+        if hypotenuse.distance == 0.0:
+            return self._start
+        
+        theta = self.angle_to(hypotenuse)
+        if theta >= (pi / 2):
+            return self._start
+        
+        adjacent_length = cos(theta) * hypotenuse.distance
+        if adjacent_length >= self.distance:
+            return self._end
+        
+        return self.point_at_distance(adjacent_length)
     
     def angle_to(self, other):
         '''Calculates the smallest angle between two lines which have to points 
@@ -160,5 +215,9 @@ class GeoLine(object):
         '''
         return self._start.apply_bearing_and_distance(self.angle, new_length)
         
+def _unit_vector(latlng):
+    cos_lat = cos(latlng.lat_rad)
+    return (cos_lat * cos(latlng.lng_rad), cos_lat * sin(latlng.lng_rad), sin(latlng.lat_rad))
+
 __all__ = ['GeoLineSnap', 'GeoLine']
     
\ No newline at end of file
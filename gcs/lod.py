@@ -0,0 +1,247 @@
+'''lod
+
+Provides the LODPyramid class, for serving a Polyline simplified at many
+levels of detail, and the tolerance_for_zoom utility function.
+'''
+
+from bisect import bisect_left
+from math import cos, pi, radians
+
+from gcs.constants import ARCDEGREE_LAT_LENGTH, WGS84_EQUATORIAL_RADIUS
+from gcs.encoders.google_polyline import encode_polyline
+from gcs.json import GcsJSONEncoder
+from gcs.polyline import Polyline
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+TILE_SIZE = 256
+'''Width, in pixels, of a web map tile'''
+
+def tolerance_for_zoom(zoom, lat=0.0, pixels=1.0):
+    '''Returns the width, in meters, of a number of pixels of a web mercator
+    map at a zoom level, the largest error that can not be seen at that zoom.
+
+    :param zoom: Zoom level, 0 shows the whole world on one tile.
+    :type zoom: number
+    :param lat: Latitude where the error is measured.
+    :type lat: number
+    :param pixels: Number of pixels.
+    :type pixels: number
+    :returns: Tolerance in meters.
+    :rtype: number
+
+    '''
+    meters_per_pixel = 2 * pi * WGS84_EQUATORIAL_RADIUS * cos(radians(lat)) / (TILE_SIZE * 2 ** zoom)
+    return pixels * meters_per_pixel
+
+def _importance(polyline):
+    '''Runs Douglas-Peucker once with no tolerance and returns, for each
+    point, the largest tolerance at which it is kept, in meters. Points are
+    compared on a flat projection centered on the polyline.
+
+    A point is kept when its distance to the segment between the points kept
+    around it is greater than the tolerance and the point that split its
+    range was kept too, so its importance is capped by that point's.
+    '''
+    points = list(polyline)
+    count = len(points)
+
+    lat0 = sum(p.lat for p in points) / count
+    lng0 = points[0].lng
+    scale = cos(radians(lat0))
+    xs = [((p.lng - lng0 + 180.0) % 360.0 - 180.0) * scale * ARCDEGREE_LAT_LENGTH for p in points]
+    ys = [(p.lat - lat0) * ARCDEGREE_LAT_LENGTH for p in points]
+    if numpy is not None:
+        xs = numpy.array(xs)
+        ys = numpy.array(ys)
+
+    importance = [0.0] * count
+    importance[0] = importance[-1] = float('inf')
+
+    stack = [(0, count - 1, float('inf'))]
+    while stack:
+        i, j, cap = stack.pop()
+        if j - i < 2:
+            continue
+
+        ax, ay = xs[i], ys[i]
+        dx = xs[j] - ax
+        dy = ys[j] - ay
+        length2 = dx * dx + dy * dy
+
+        if numpy is not None:
+            px = xs[i + 1:j] - ax
+            py = ys[i + 1:j] - ay
+            if length2 > 0:
+                t = numpy.clip((px * dx + py * dy) / length2, 0.0, 1.0)
+                px = px - t * dx
+                py = py - t * dy
+            distances = px * px + py * py
+            k = int(numpy.argmax(distances))
+            distance = float(distances[k]) ** 0.5
+        else:
+            k = 0
+            distance = -1.0
+            for position in xrange(i + 1, j):
+                px = xs[position] - ax
+                py = ys[position] - ay
+                if length2 > 0:
+                    t = min(max((px * dx + py * dy) / length2, 0.0), 1.0)
+                    px -= t * dx
+                    py -= t * dy
+                d = px * px + py * py
+                if d > distance:
+                    k = position - i - 1
+                    distance = d
+            distance **= 0.5
+
+        k += i + 1
+        distance = min(distance, cap)
+        importance[k] = distance
+        stack.append((i, k, distance))
+        stack.append((k, j, distance))
+
+    return importance
+
+class LODPyramid(object):
+    '''Every level of detail of a Polyline, from one simplification pass.
+
+    Douglas-Peucker is run once to rank the points by importance (the largest
+    tolerance, in meters, at which each point is kept), so the simplification
+    at any tolerance is the points whose importance is above it, found with a
+    binary search on the ranking and built in time proportional to its
+    number of points. Levels are nested: every point of a level is in the
+    levels with a smaller tolerance.
+
+    Levels are cached by their number of points along with their encoded
+    forms (see encode and to_json), so the same shape can be served at each
+    zoom level of a map without being simplified or encoded again.
+
+    >>> from gcs import LatLng, Polyline
+    >>> pyramid = LODPyramid(Polyline(LatLng(35, -78), LatLng(35.001, -77.995), LatLng(35, -77.99)))
+    >>> [len(pyramid.level(t)) for t in (1.0, 200.0)]
+    [3, 2]
+    >>> pyramid.encode(200.0)
+    '_}rtE~ja{M?o}@'
+
+    '''
+
+    def __init__(self, polyline):
+        '''Ranks the points of a Polyline.
+
+        :param polyline: Full resolution shape.
+        :type polyline: Polyline
+
+        '''
+        self.polyline = polyline
+        self.importance = _importance(polyline)
+
+        #positions of the points, most important first
+        self._order = sorted(xrange(len(self.importance)), key=lambda i: -self.importance[i])
+        self._ranks = [-self.importance[i] for i in self._order]
+
+        self._levels = {} #number of points -> Polyline
+        self._encoded = {} #number of points -> encoded polyline string
+        self._json = {} #number of points -> JSON-ready list
+
+    def __len__(self):
+        '''Gets the number of points at full resolution.
+
+        :returns: Number of points.
+        :rtype: number
+
+        '''
+        return len(self.importance)
+
+    def count(self, tolerance):
+        '''Gets the number of points of the level at a tolerance.
+
+        :param tolerance: Maximum distance, in meters, of a dropped point from
+        the simplified shape.
+        :type tolerance: number
+        :returns: Number of points kept.
+        :rtype: number
+
+        '''
+        return bisect_left(self._ranks, -tolerance)
+
+    def indexes(self, tolerance):
+        '''Gets the positions, in the full resolution Polyline, of the points
+        of the level at a tolerance.
+
+        :param tolerance: Maximum distance, in meters, of a dropped point.
+        :type tolerance: number
+        :returns: Positions of the kept points, in order.
+        :rtype: list
+
+        '''
+        return sorted(self._order[:self.count(tolerance)])
+
+    def level(self, tolerance):
+        '''Gets the simplified Polyline at a tolerance.
+
+        :param tolerance: Maximum distance, in meters, of a dropped point.
+        :type tolerance: number
+        :returns: Simplified shape, the same object for every tolerance that
+        keeps the same points.
+        :rtype: Polyline
+
+        '''
+        count = self.count(tolerance)
+        if count not in self._levels:
+            polyline = self.polyline
+            self._levels[count] = Polyline([polyline[i] for i in sorted(self._order[:count])])
+        return self._levels[count]
+
+    def level_for_zoom(self, zoom, pixels=1.0):
+        '''Gets the simplified Polyline for a web map zoom level, see
+        tolerance_for_zoom.
+
+        :param zoom: Zoom level.
+        :type zoom: number
+        :param pixels: Largest error, in pixels, of a dropped point.
+        :type pixels: number
+        :returns: Simplified shape.
+        :rtype: Polyline
+
+        '''
+        return self.level(self.tolerance_for_zoom(zoom, pixels))
+
+    def tolerance_for_zoom(self, zoom, pixels=1.0):
+        '''See tolerance_for_zoom, measured at the center of the shape.'''
+        return tolerance_for_zoom(zoom, self.polyline.bounds.center.lat, pixels)
+
+    def encode(self, tolerance):
+        '''Gets the level at a tolerance encoded with the Google encoded
+        polyline algorithm (see google_polyline.encode_polyline), cached.
+
+        :param tolerance: Maximum distance, in meters, of a dropped point.
+        :type tolerance: number
+        :returns: Encoded polyline string.
+        :rtype: string
+
+        '''
+        count = self.count(tolerance)
+        if count not in self._encoded:
+            self._encoded[count] = encode_polyline(self.level(tolerance))
+        return self._encoded[count]
+
+    def to_json(self, tolerance):
+        '''Gets the level at a tolerance as a JSON-ready list (see
+        GcsJSONEncoder.encode_polyline), cached.
+
+        :param tolerance: Maximum distance, in meters, of a dropped point.
+        :type tolerance: number
+        :returns: List of [latitude, longitude] lists.
+        :rtype: list
+
+        '''
+        count = self.count(tolerance)
+        if count not in self._json:
+            self._json[count] = GcsJSONEncoder().encode_polyline(self.level(tolerance))
+        return self._json[count]
+
+__all__ = ['LODPyramid', 'tolerance_for_zoom', 'TILE_SIZE']
@@ -0,0 +1,220 @@
+'''matching
+
+Provides the MapMatcher and MatchedPoint classes, for matching a stream of GPS
+pings onto a set of routes with a Hidden Markov Model.
+'''
+
+from collections import deque
+
+from gcs.polyline import SnapOptions
+from gcs.routeset import RouteSet
+
+class MatchedPoint(object):
+    '''The result of matching one ping.
+
+    key and snap are None when the ping could not be snapped onto any route.
+    '''
+
+    def __init__(self, latlng, key, snap):
+        self.latlng = latlng
+        self.key = key #key of the route in the RouteSet
+        self.snap = snap #PolylineSnap of the ping onto that route
+
+    def __repr__(self):
+        return 'MatchedPoint(%s, %r)' % (repr(self.latlng), self.key)
+
+class _Candidate(object):
+    '''A state of the Hidden Markov Model: one snap of a ping onto a route.
+    '''
+
+    __slots__ = ('key', 'snap', 'emission', 'score', 'previous')
+
+    def __init__(self, key, snap, emission):
+        self.key = key
+        self.snap = snap
+        self.emission = emission
+        self.score = emission
+        self.previous = None
+
+class MapMatcher(object):
+    '''Matches GPS pings onto a RouteSet with online Viterbi decoding.
+
+    Each ping is snapped onto the routes (see RouteSet.snap_point_all), every
+    snap is a candidate state:
+
+    * The emission score of a candidate falls off with the square of its snap
+      distance (a normal distribution with a standard deviation of sigma).
+    * The transition score between candidates on the same route falls off
+      with the difference between the great circle distance of the two pings
+      and the distance travelled along the route (an exponential distribution
+      with a scale of beta), so progress along a route is favoured over
+      jumping between parallel ones.
+    * Changing routes costs switch_penalty on top of that.
+
+    Scores are kept as logarithms. Only the last window pings are kept: when a
+    ping falls out of the window its match is decided from the best path
+    through the current window, so memory and the latency before a match is
+    reported are both bounded by window.
+
+    >>> from gcs import LatLng, Polyline
+    >>> matcher = MapMatcher({'a': Polyline(LatLng(35, -78), LatLng(35, -77.99))},
+    ...                      SnapOptions(max_distance=30.0), window=2)
+    >>> [m.key for m in matcher.match([LatLng(35.0001, -78.0 + i * 0.001) for i in range(4)])]
+    ['a', 'a', 'a', 'a']
+
+    '''
+
+    def __init__(self, routes, options=None, sigma=10.0, beta=50.0, switch_penalty=5.0,
+                 window=10, max_candidates=8):
+        '''Creates a new MapMatcher.
+
+        :param routes: Routes to match onto, a RouteSet or anything a RouteSet
+        can be created from.
+        :param options: Options for snapping pings onto the routes.
+        :type options: SnapOptions
+        :param sigma: Standard deviation of the GPS error, in meters.
+        :type sigma: number
+        :param beta: Scale, in meters, of the difference between straight line
+        and along-route distance between consecutive pings.
+        :type beta: number
+        :param switch_penalty: Score subtracted for changing routes.
+        :type switch_penalty: number
+        :param window: Number of pings kept before a match is decided.
+        :type window: number
+        :param max_candidates: Maximum number of candidates kept per ping,
+        the closest snaps are kept.
+        :type max_candidates: number
+
+        '''
+        if window < 1:
+            raise ValueError('window must be at least 1.')
+
+        self.routes = routes if isinstance(routes, RouteSet) else RouteSet(routes)
+        self.options = options if options else SnapOptions()
+        self.sigma = float(sigma)
+        self.beta = float(beta)
+        self.switch_penalty = switch_penalty
+        self.window = window
+        self.max_candidates = max_candidates
+
+        self._steps = deque() #(latlng, candidates) for each ping in the window
+
+    def __len__(self):
+        '''Gets the number of pings waiting in the window.
+
+        :returns: Number of undecided pings.
+        :rtype: number
+
+        '''
+        return len(self._steps)
+
+    def _emission(self, distance):
+        z = distance / self.sigma
+        return -0.5 * z * z
+
+    def _transition(self, previous, current, straight_distance):
+        if previous.key == current.key:
+            route_distance = current.snap.polyline_distance - previous.snap.polyline_distance
+            return -abs(straight_distance - route_distance) / self.beta
+
+        return -self.switch_penalty - straight_distance / self.beta
+
+    def update(self, latlng):
+        '''Adds a ping to the window.
+
+        :param latlng: Position of the ping.
+        :type latlng: LatLng
+        :returns: List of the MatchedPoints that were decided because of this
+        ping, oldest first. Usually empty until the window is full, then one.
+        :rtype: list
+
+        '''
+        snaps = self.routes.snap_point_all(latlng, self.options)[:self.max_candidates]
+        candidates = [_Candidate(key, snap, self._emission(snap.distance_from_initial)) for key, snap in snaps]
+
+        result = []
+        if not candidates:
+            #the chain is broken, decide everything that is waiting
+            result.extend(self.flush())
+            result.append(MatchedPoint(latlng, None, None))
+            return result
+
+        if self._steps:
+            previous_latlng, previous_candidates = self._steps[-1]
+            straight_distance = previous_latlng.distance_to(latlng)
+
+            for candidate in candidates:
+                best = None
+                for previous in previous_candidates:
+                    score = previous.score + self._transition(previous, candidate, straight_distance)
+                    if best is None or score > best:
+                        best = score
+                        candidate.previous = previous
+
+                candidate.score += best
+
+        self._steps.append((latlng, candidates))
+
+        while len(self._steps) > self.window:
+            result.append(self._decide_oldest())
+
+        return result
+
+    def _best_path(self):
+        '''Returns the candidates of the best path through the window, oldest
+        first.
+        '''
+        _, candidates = self._steps[-1]
+        state = max(candidates, key=lambda c: c.score)
+
+        path = []
+        for _ in xrange(len(self._steps)):
+            path.append(state)
+            state = state.previous
+        path.reverse()
+        return path
+
+    def _decide_oldest(self):
+        chosen = self._best_path()[0]
+        latlng, _ = self._steps.popleft()
+
+        #the decided ping is the start of the chain for the next one
+        if self._steps:
+            for candidate in self._steps[0][1]:
+                candidate.previous = None
+
+        return MatchedPoint(latlng, chosen.key, chosen.snap)
+
+    def flush(self):
+        '''Decides every ping left in the window, for example at the end of a
+        trace.
+
+        :returns: List of MatchedPoints, oldest first.
+        :rtype: list
+
+        '''
+        if not self._steps:
+            return []
+
+        path = self._best_path()
+        result = [MatchedPoint(latlng, state.key, state.snap)
+                  for (latlng, _), state in zip(self._steps, path)]
+        self._steps.clear()
+        return result
+
+    def match(self, latlngs):
+        '''Matches a whole trace.
+
+        :param latlngs: Positions of the pings, in order.
+        :type latlngs: list
+        :returns: A MatchedPoint for each ping.
+        :rtype: list
+
+        '''
+        result = []
+        for latlng in latlngs:
+            result.extend(self.update(latlng))
+        result.extend(self.flush())
+        return result
+
+__all__ = ['MapMatcher', 'MatchedPoint']
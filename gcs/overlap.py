@@ -0,0 +1,256 @@
+'''overlap
+
+Provides the overlap and pairwise_overlap functions and the Overlap and
+OverlapPart classes, for finding which parts of a Polyline run along another
+one.
+'''
+
+from math import radians, cos
+
+from gcs.constants import RADIUS_EARTH_M
+from gcs.index import BoundsIndex
+from gcs.polyline import Polyline, SEGMENT_INDEX_THRESHOLD
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+_METERS_PER_DEGREE = radians(RADIUS_EARTH_M)
+
+class OverlapPart(object):
+    '''A piece of a Polyline, from start to end meters along it.
+    '''
+
+    def __init__(self, polyline, start, end):
+        self.polyline = polyline
+        self.start = start
+        self.end = end
+
+    def __repr__(self):
+        return 'OverlapPart(%.1f, %.1f)' % (self.start, self.end)
+
+    @property
+    def distance(self):
+        '''Length of the part, in meters.'''
+        return self.end - self.start
+
+class Overlap(object):
+    '''The parts of a Polyline that run along a base Polyline (shared) and
+    the parts that do not (unshared), both in order along the Polyline.
+    '''
+
+    def __init__(self, shared, unshared, distance):
+        self.shared = shared
+        self.unshared = unshared
+        self.distance = distance #total length of the polyline, in meters
+
+    def __repr__(self):
+        return 'Overlap(%d shared, %d unshared)' % (len(self.shared), len(self.unshared))
+
+    @property
+    def shared_distance(self):
+        '''Length of the shared parts, in meters.'''
+        return sum(part.distance for part in self.shared)
+
+    @property
+    def ratio(self):
+        '''Share of the length of the polyline that is shared, from 0 to 1.'''
+        return self.shared_distance / self.distance if self.distance else 1.0
+
+def _samples(polyline, step):
+    '''Returns the points of the polyline with extra points every step meters
+    along its line segments, as (latlng, measure, is_vertex) tuples.
+    '''
+    measures = polyline.measures
+    result = [(polyline[0], 0.0, True)]
+
+    for line, start in zip(polyline.lines, measures):
+        count = int(line.distance // step)
+        for k in xrange(1, count + 1):
+            distance = k * step
+            if line.distance - distance > 1e-6:
+                result.append((line.point_at_distance(distance), start + distance, False))
+        result.append((line.end, start + line.distance, True))
+
+    return result
+
+def _candidate_pairs(base, points, max_distance):
+    '''Returns (point positions, segment positions) of the segments of base
+    whose bounds are within max_distance of each point.
+    '''
+    point_ids = []
+    segment_ids = []
+
+    segment_count = len(base.lines)
+    if segment_count <= SEGMENT_INDEX_THRESHOLD:
+        bounds = base.bounds.buffer(max_distance)
+        for i, point in enumerate(points):
+            if bounds.contains(point):
+                point_ids.extend([i] * segment_count)
+                segment_ids.extend(xrange(segment_count))
+    else:
+        index = base.segment_index
+        for i, point in enumerate(points):
+            segments = index.within_distance(point, max_distance)
+            point_ids.extend([i] * len(segments))
+            segment_ids.extend(segments)
+
+    return point_ids, segment_ids
+
+def cross_track_distances(base, points, max_distance):
+    '''Returns the distance, in meters, from each point to the closest line
+    segment of base, for points within about max_distance of it.
+
+    Line segments are found with the segment index of base, then the
+    distances to all of them are computed at once (with numpy when it is
+    available) on a flat projection centered on each point, which is accurate
+    at the scale of a few hundred meters.
+
+    :param base: Polyline to measure the distances to.
+    :type base: Polyline
+    :param points: Points to measure the distances from.
+    :type points: list
+    :param max_distance: Search distance, in meters.
+    :type max_distance: number
+    :returns: Distance of each point, None for points with no line segment
+    within max_distance.
+    :rtype: list
+
+    '''
+    points = list(points)
+    point_ids, segment_ids = _candidate_pairs(base, points, max_distance)
+    result = [None] * len(points)
+    if not point_ids:
+        return result
+
+    base_points = base.points
+    p_lat = [points[i].lat for i in point_ids]
+    p_lng = [points[i].lng for i in point_ids]
+    a_lat = [base_points[j].lat for j in segment_ids]
+    a_lng = [base_points[j].lng for j in segment_ids]
+    b_lat = [base_points[j + 1].lat for j in segment_ids]
+    b_lng = [base_points[j + 1].lng for j in segment_ids]
+
+    if numpy is not None:
+        p_lat = numpy.array(p_lat)
+        p_lng = numpy.array(p_lng)
+        scale = numpy.cos(numpy.radians(p_lat)) * _METERS_PER_DEGREE
+
+        ax = ((numpy.array(a_lng) - p_lng + 180.0) % 360.0 - 180.0) * scale
+        ay = (numpy.array(a_lat) - p_lat) * _METERS_PER_DEGREE
+        bx = ((numpy.array(b_lng) - p_lng + 180.0) % 360.0 - 180.0) * scale
+        by = (numpy.array(b_lat) - p_lat) * _METERS_PER_DEGREE
+
+        dx = bx - ax
+        dy = by - ay
+        length2 = dx * dx + dy * dy
+        t = numpy.where(length2 > 0, -(ax * dx + ay * dy) / numpy.where(length2 > 0, length2, 1.0), 0.0)
+        t = numpy.clip(t, 0.0, 1.0)
+        distances = numpy.hypot(ax + t * dx, ay + t * dy)
+
+        closest = numpy.full(len(points), numpy.inf)
+        numpy.minimum.at(closest, numpy.array(point_ids), distances)
+        for i in set(point_ids):
+            result[i] = float(closest[i])
+        return result
+
+    for i, plat, plng, alat, alng, blat, blng in zip(point_ids, p_lat, p_lng, a_lat, a_lng, b_lat, b_lng):
+        scale = cos(radians(plat)) * _METERS_PER_DEGREE
+        ax = ((alng - plng + 180.0) % 360.0 - 180.0) * scale
+        ay = (alat - plat) * _METERS_PER_DEGREE
+        bx = ((blng - plng + 180.0) % 360.0 - 180.0) * scale
+        by = (blat - plat) * _METERS_PER_DEGREE
+
+        dx = bx - ax
+        dy = by - ay
+        length2 = dx * dx + dy * dy
+        t = min(max(-(ax * dx + ay * dy) / length2, 0.0), 1.0) if length2 > 0 else 0.0
+        distance = ((ax + t * dx) ** 2 + (ay + t * dy) ** 2) ** 0.5
+
+        if result[i] is None or distance < result[i]:
+            result[i] = distance
+
+    return result
+
+def overlap(base, other, max_distance, step=None):
+    '''Splits other into the parts that run along base and the parts that do
+    not.
+
+    other is sampled at its points and every step meters along its line
+    segments, a sample is shared when it is within max_distance of base (see
+    cross_track_distances). Consecutive samples with the same status form a
+    part, parts meet at the first sample of the next part, so the resolution
+    of where a part starts or ends is step meters.
+
+    :param base: Polyline to compare against.
+    :type base: Polyline
+    :param other: Polyline to split.
+    :type other: Polyline
+    :param max_distance: Maximum distance, in meters, from base of a shared
+    point.
+    :type max_distance: number
+    :param step: Distance, in meters, between samples, defaults to
+    max_distance.
+    :type step: number
+    :returns: Shared and unshared parts of other, with their measures along
+    other.
+    :rtype: Overlap
+
+    '''
+    step = float(step if step else max_distance)
+    samples = _samples(other, step)
+    distances = cross_track_distances(base, [s[0] for s in samples], max_distance)
+    flags = [d is not None and d <= max_distance for d in distances]
+
+    shared = []
+    unshared = []
+
+    start = 0
+    for i in xrange(1, len(samples) + 1):
+        if i < len(samples) and flags[i] == flags[start]:
+            continue
+
+        #the part ends at the first sample of the next part, if there is one
+        end = min(i, len(samples) - 1)
+        points = [samples[start][0]]
+        points.extend(s[0] for s in samples[start + 1:end] if s[2])
+        points.append(samples[end][0])
+
+        part = OverlapPart(Polyline(points), samples[start][1], samples[end][1])
+        if part.distance > 0 or len(samples) == 1:
+            (shared if flags[start] else unshared).append(part)
+        start = i
+
+    return Overlap(shared, unshared, other.distance)
+
+def pairwise_overlap(polylines, max_distance, step=None, min_ratio=0.0):
+    '''Computes the overlap of every ordered pair of polylines whose bounds
+    are within max_distance of each other, found with a BoundsIndex.
+
+    :param polylines: Polylines to compare.
+    :type polylines: list
+    :param max_distance: See overlap.
+    :type max_distance: number
+    :param step: See overlap.
+    :type step: number
+    :param min_ratio: Minimum Overlap.ratio of the pairs to return.
+    :type min_ratio: number
+    :returns: dict of (i, j) -> Overlap of polylines[j] along polylines[i].
+    :rtype: dict
+
+    '''
+    polylines = list(polylines)
+    index = BoundsIndex([p.bounds.buffer(max_distance) for p in polylines])
+
+    result = {}
+    for i, base in enumerate(polylines):
+        for j in index.intersects(base.bounds):
+            if i == j:
+                continue
+            part = overlap(base, polylines[j], max_distance, step)
+            if part.shared and part.ratio >= min_ratio:
+                result[(i, j)] = part
+    return result
+
+__all__ = ['Overlap', 'OverlapPart', 'cross_track_distances', 'overlap', 'pairwise_overlap']
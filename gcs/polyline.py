@@ -4,17 +4,58 @@ Provides the Polyline, PolylineSnap, and SnapOptions classes, as well as the
 from_linestring utility function.
 '''
 
+from bisect import bisect_left, bisect_right
 from itertools import izip
+from weakref import WeakSet
 
-from math import radians
+from math import radians, pi
 
 from line import GeoLine
 from latlng import LatLng
 from latlngbounds import LatLngBounds
+from index import BoundsIndex, PointIndex
+from functions import distance_many, bearing_many
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+#polylines with more line segments than this use a segment index when snapping
+SEGMENT_INDEX_THRESHOLD = 32
 
 def from_linestring(linestring):
     return Polyline([LatLng(p[1], p[0]) for p in linestring])
 
+def _clip_segment(lat0, lng0, lat1, lng1, south, west, north, east):
+    '''Clips the line segment from (lat0, lng0) to (lat1, lng1) to the edges, 
+    in degrees, with the Liang-Barsky algorithm. Returns (t0, t1), the part of 
+    the segment within the edges from 0 to 1, or None.
+    '''
+    d_lat = lat1 - lat0
+    d_lng = lng1 - lng0
+    t0 = 0.0
+    t1 = 1.0
+    
+    for p, q in ((-d_lng, lng0 - west), (d_lng, east - lng0), (-d_lat, lat0 - south), (d_lat, north - lat0)):
+        if p == 0.0:
+            #parallel to this edge
+            if q < 0.0:
+                return None
+            continue
+        
+        r = q / p
+        if p < 0.0:
+            if r > t1:
+                return None
+            t0 = max(t0, r)
+        else:
+            if r < t0:
+                return None
+            t1 = min(t1, r)
+    
+    return t0, t1
+
 class PolylineSnap():
     def __init__(self, point, distance_from_initial, distance_from_index, index, exact_snap):
         self.point = point
@@ -46,6 +87,8 @@ class Polyline(object):
     
     '''
     
+    _views = None #live PolylineViews sharing the points, see view
+    
     def __init__(self, *args):  
         '''Creates a new instance of a Polyline
         
@@ -113,6 +156,14 @@ class Polyline(object):
         '''
         return Polyline(self._points)
     
+    def __getstate__(self):
+        '''Pickles the Polyline without the views sharing its points.
+        
+        '''
+        state = self.__dict__.copy()
+        state.pop('_views', None)
+        return state
+    
     def __len__(self):
         '''Gets the length of the Polyline (the number of points in the 
         Polyline)
@@ -147,6 +198,7 @@ class Polyline(object):
         if not value.__class__ is LatLng:
             raise Exception("Item must be a LatLng")
         
+        self.__detach_views()
         self._points[index] = value
         self.__on_shape_changed()
     
@@ -177,6 +229,50 @@ class Polyline(object):
         except:
             raise Exception("Unable to create a Polyline from given coordinates")
         
+    @staticmethod
+    def from_arrays(lats, lngs):
+        '''Creates a polyline from columns of latitudes and longitudes.
+        
+        This is the fast path for loading many shapes: the values are trusted 
+        to be numbers, so the checks done by the constructor are skipped. 
+        Consecutive equal points are still dropped.
+        
+        :param lats: Latitude of each point.
+        :type lats: sequence
+        :param lngs: Longitude of each point.
+        :type lngs: sequence
+        :returns: Polyline constructed from the supplied columns.
+        :rtype: Polyline
+        
+        '''
+        points = []
+        prev = None
+        for lat, lng in izip(lats, lngs):
+            point = LatLng(lat, lng)
+            key = (point._lat_clean, point._lng_clean)
+            if key != prev:
+                points.append(point)
+                prev = key
+        
+        if not points:
+            raise TypeError('Polyline must be initialized with at least one point.')
+        
+        return Polyline._from_points(points)
+    
+    @staticmethod
+    def _from_points(points):
+        '''Creates a polyline that takes ownership of a non-empty list of clean 
+        points (see clean_points) without checking them again.
+        
+        '''
+        if len(points) == 1:
+            points.append(points[0])
+        
+        result = Polyline.__new__(Polyline)
+        result._points = points
+        result.__on_shape_changed()
+        return result
+    
     @staticmethod
     def concat_multiple(polys):
         '''Concatenates multiple Polylines into a single Polyline
@@ -321,10 +417,8 @@ class Polyline(object):
         segments, in reverse order.
         
         '''
-        i = len(self) - 1
-        while i > 0:            
-            yield GeoLine(self[i],  self[i-1])
-            i -= 1
+        for line in reversed(self.lines):
+            yield line.inverse
                
     @property
     def coords(self):
@@ -349,15 +443,159 @@ class Polyline(object):
         
         return self._distance
     
+    @property
+    def measures(self):
+        '''Returns the distance along the Polyline, in meters, at each point.
+        
+        The first measure is always 0.0 and the last one is the total distance 
+        of the Polyline.
+        
+        :returns: Tuple containing the cumulative distance at each point.
+        :rtype: tuple
+        
+        '''
+        if self._measures is None:
+            total = 0.0
+            measures = [total]
+            for line in self.lines:
+                total += line.distance
+                measures.append(total)
+            
+            self._measures = tuple(measures)
+        return self._measures
+    
+    @property
+    def segment_index(self):
+        '''Returns a spatial index over the bounds of the Polyline's line 
+        segments. Queries on the index return positions in lines.
+        
+        :returns: Index of the line segments.
+        :rtype: BoundsIndex
+        
+        '''
+        if self._segment_index is None:
+            self._segment_index = BoundsIndex([line.bounds for line in self.lines])
+        return self._segment_index
+    
+    def _get_columns(self):
+        '''Returns (latitudes, longitudes) of the points, as numpy arrays when 
+        numpy is available.
+        
+        '''
+        if self._columns is None:
+            lats = [p.lat for p in self._points]
+            lngs = [p.lng for p in self._points]
+            
+            if numpy is not None:
+                lats = numpy.array(lats, dtype=float)
+                lngs = numpy.array(lngs, dtype=float)
+            
+            self._columns = (lats, lngs)
+        return self._columns
+    
+    def segment_lengths(self):
+        '''Returns the length, in meters, of each line segment in one 
+        vectorized pass.
+        
+        :returns: Length of each line segment, a numpy array when numpy is 
+        available.
+        :rtype: list
+        
+        '''
+        lats, lngs = self._get_columns()
+        return distance_many(lats[:-1], lngs[:-1], lats[1:], lngs[1:])
+    
+    def bearings(self):
+        '''Returns the bearing, in radians, of each line segment in one 
+        vectorized pass (see GeoLine.angle).
+        
+        :returns: Bearing of each line segment, a numpy array when numpy is 
+        available.
+        :rtype: list
+        
+        '''
+        lats, lngs = self._get_columns()
+        return bearing_many(lats[:-1], lngs[:-1], lats[1:], lngs[1:])
+    
+    def turn_angles(self):
+        '''Returns the change in direction, in radians between 0 and pi, at 
+        each point between two line segments (see GeoLine.angle_to).
+        
+        For a polyline with n points there are n - 2 turn angles.
+        
+        :returns: Change in direction at each inner point, a numpy array when 
+        numpy is available.
+        :rtype: list
+        
+        '''
+        bearings = self.bearings()
+        
+        if numpy is not None:
+            turns = numpy.abs(bearings[:-1] - bearings[1:]) % (2 * pi)
+            return numpy.where(turns > pi, (2 * pi) - turns, turns)
+        
+        result = []
+        for a, b in zip(bearings[:-1], bearings[1:]):
+            turn = abs(a - b) % (2 * pi)
+            result.append((2 * pi) - turn if turn > pi else turn)
+        return result
+    
+    @property
+    def vertex_index(self):
+        '''Returns a spatial index over the points of the Polyline. Queries on 
+        the index return point indexes. Once built, closest_vertex uses it.
+        
+        :returns: Index of the points.
+        :rtype: PointIndex
+        
+        '''
+        if self._vertex_index is None:
+            self._vertex_index = PointIndex(self._points)
+        return self._vertex_index
+    
     @property
     def inverse(self):
-        '''Returns the polyline in reverse.
+        '''Returns the polyline in reverse, as a view sharing the points of 
+        this one (see view).
         
         :returns: Reversed polyline
-        :rtype: Polyline
+        :rtype: PolylineView
         
         '''
-        return Polyline(reversed(self._points))
+        return self.view(reverse=True)
+    
+    def view(self, start=None, stop=None, reverse=False):
+        '''Returns a read-only view of the points from start up to, but not 
+        including, stop, without copying them.
+        
+        The view shares the points of this polyline and the caches derived 
+        from them (see PolylineView). It is copied into a plain polyline the 
+        first time either of them is changed.
+        
+        >>> p = Polyline(LatLng(35, -78), LatLng(35, -78.01), LatLng(35, -78.02))
+        >>> p.view(1).first == p[1]
+        True
+        
+        :param start: Index of the first point, as in a slice.
+        :type start: number
+        :param stop: Index after the last point, as in a slice.
+        :type stop: number
+        :param reverse: Whether the view runs from the last point to the first.
+        :type reverse: bool
+        :returns: View of the points.
+        :rtype: PolylineView
+        
+        '''
+        start, stop, _ = slice(start, stop).indices(len(self))
+        if stop - start < 2:
+            raise ValueError('A view must contain at least two points.')
+        
+        if self._views is None:
+            self._views = WeakSet()
+        
+        view = PolylineView(self, start, stop, reverse)
+        self._views.add(view)
+        return view
     
     @property
     def points(self):
@@ -369,6 +607,17 @@ class Polyline(object):
         '''
         return tuple(pt for pt in self)
     
+    def __detach_views(self):
+        '''Called before the shape of the polyline is altered.
+        
+        Views sharing the points copy them first.
+        
+        '''
+        if self._views:
+            for view in list(self._views):
+                view._materialize()
+        self._views = None
+    
     def __on_shape_changed(self):
         '''Called when the shape of the polyline has been altered.
         
@@ -378,6 +627,10 @@ class Polyline(object):
         self._bounds = None
         self._distance = None
         self._lines = None
+        self._measures = None
+        self._segment_index = None
+        self._vertex_index = None
+        self._columns = None
     
     def append(self, value):
         '''Adds a single point to the end of this polyline.
@@ -390,6 +643,7 @@ class Polyline(object):
         :type value: LatLng
         
         '''        
+        self.__detach_views()
         self._points.append(value)
         self.__on_shape_changed()
         
@@ -404,6 +658,7 @@ class Polyline(object):
         :type value: LatLng
         
         '''        
+        self.__detach_views()
         self._points.insert(0, value)
         self.__on_shape_changed()        
     
@@ -420,6 +675,7 @@ class Polyline(object):
         :type object: LatLng
         
         '''       
+        self.__detach_views()
         self._points.insert(index, object)
         self.__on_shape_changed()    
     
@@ -436,9 +692,9 @@ class Polyline(object):
         '''  
         if self.last == other.first:
             #chop the first point off the other polyline so that we don't end up with duplicate points
-            return Polyline(self._points + list(other)[1:])
+            return Polyline(list(self) + list(other)[1:])
         else:
-            return Polyline(self._points + list(other))
+            return Polyline(list(self) + list(other))
     
     def interpolate(self, ratio):
         '''Returns the point at ratio distance into the polyline. 
@@ -465,6 +721,49 @@ class Polyline(object):
         # We got all the way to the end; we shouldn't have any slacking length
         assert round(interp_distance, 4) == 0.0, "interp_distance: %f != 0.0" % interp_distance
         return self.last
+    
+    def slice_by_measure(self, start, end):
+        '''Returns the part of the polyline from start to end meters along it.
+        
+        The vertices around start and end are found with a binary search on 
+        measures, so only the points of the result are visited. When both 
+        start and end fall on vertices the result is a view (see view).
+        
+        >>> p = Polyline(LatLng(35, -78), LatLng(35, -77.99), LatLng(35.01, -77.99))
+        >>> round(p.slice_by_measure(500.0, 1500.0).distance)
+        1000.0
+        
+        :param start: Distance along the polyline, in meters, of the first 
+        point, clamped to the polyline.
+        :type start: number
+        :param end: Distance along the polyline, in meters, of the last point, 
+        clamped to the polyline.
+        :type end: number
+        :returns: Part of the polyline between the two distances.
+        :rtype: Polyline
+        
+        '''
+        measures = self.measures
+        start = min(max(start, 0.0), measures[-1])
+        end = min(max(end, 0.0), measures[-1])
+        if start > end:
+            raise ValueError('The start of the slice must not be after its end.')
+        
+        first = bisect_left(measures, start) #first vertex at or after start
+        last = bisect_right(measures, end) - 1 #last vertex at or before end
+        
+        if measures[first] == start and measures[last] == end and last > first:
+            return self.view(first, last + 1)
+        
+        points = self._points
+        result = []
+        if measures[first] != start:
+            result.append(GeoLine(points[first - 1], points[first]).point_at_distance(start - measures[first - 1]))
+        result.extend(points[first:last + 1])
+        if measures[last] != end:
+            result.append(GeoLine(points[last], points[last + 1]).point_at_distance(end - measures[last]))
+        
+        return Polyline(result)
         
     
     def splice(self, other):
@@ -503,45 +802,212 @@ class Polyline(object):
         :rtype: Polyline
         
         '''
+        #only the closest pairing is built, see gcs.assembly to join many
         pairings = (
-            (self.last, other.first, self.add(other)),
-            (self.last, other.last, self.add(other.inverse)),
-            (self.first, other.last, other.add(self)),
-            (self.first, other.first, other.inverse.add(self)),
+            (self.last, other.first, lambda: self.add(other)),
+            (self.last, other.last, lambda: self.add(other.inverse)),
+            (self.first, other.last, lambda: other.add(self)),
+            (self.first, other.first, lambda: other.inverse.add(self)),
         )
         closest = 1e99
         best = None
-        for left, right, result in pairings:
+        for left, right, build in pairings:
             dist = left.distance_to(right)
             if dist < closest:
                 closest = dist
-                best = result        
-
-        return best
+                best = build
+        
+        return best()
     
     def closest_vertex(self, point):
         '''Returns the closest vertex in the polyline to the given point.
         
+        Uses vertex_index if it has been built, otherwise checks every vertex.
+        
         :param point: Point to find the closest vertex for.
         :type point: LatLng
         :returns: Closest vertex point to the supplied point.
         :rtype: LatLng
         
         '''
+        if self._vertex_index is not None:
+            return self._points[self._vertex_index.nearest(point)[0]]
+        
         return min(self, key=lambda x: point.distance_to(x))
     
     def closest_point(self, point):
         '''Returns the closest point on the polyline to the given point,
         regardless of distance.
         
+        Long polylines visit their line segments best-first, ordered by the 
+        distance to the bounds of each segment (see segment_index), and stop 
+        once no remaining segment can be closer than the best point found.
+        
         :param point: Point to find the clsest point along the polyline for.
         :type point: LatLng
         :returns: Closest point on the Polyline (not necessarily a vertex)
         :rtype: LatLng
         
         '''
-        candidates = [L.closest_point(point) for L in self.lines]
-        return min(candidates, key=lambda x: x.distance_to(point))
+        lines = self.lines
+        
+        if len(lines) <= SEGMENT_INDEX_THRESHOLD:
+            candidates = [L.closest_point(point) for L in lines]
+            return min(candidates, key=lambda x: x.distance_to(point))
+        
+        best = None
+        best_distance = None
+        for lower_bound, i in self.segment_index.iter_nearest(point):
+            if best is not None and lower_bound >= best_distance:
+                break
+            
+            candidate = lines[i].closest_point(point)
+            distance = candidate.distance_to(point)
+            if best is None or distance < best_distance:
+                best = candidate
+                best_distance = distance
+        
+        return best
+    
+    def closest_points(self, points):
+        '''Runs closest_point for many points.
+        
+        :param points: Points to find the closest points along the polyline for.
+        :type points: list
+        :returns: List containing the closest point on the Polyline for each of 
+        the supplied points.
+        :rtype: list
+        
+        '''
+        return [self.closest_point(point) for point in points]
+    
+    def project_many(self, points, tolerance=50.0, max_candidates=8):
+        '''Returns the distance along the polyline, in meters, of many points 
+        visited in order, such as the stops of a route.
+        
+        Each point is projected onto the line segments near it (found with 
+        segment_index and measured with measures), keeping the projections 
+        within tolerance meters of the closest one as candidates. The 
+        candidates are then chosen so the measures never decrease, minimizing 
+        the total distance from the points to the polyline, which resolves 
+        points near more than one part of a loop or of an out-and-back shape.
+        
+        When the points can not be matched in order, the measures are clamped 
+        so they never decrease.
+        
+        :param points: Points to project, in the order they are visited.
+        :type points: list
+        :param tolerance: How much farther, in meters, than the closest 
+        projection another projection can be to be considered.
+        :type tolerance: number
+        :param max_candidates: Maximum number of projections considered per 
+        point.
+        :type max_candidates: number
+        :returns: Measure of each point.
+        :rtype: list
+        
+        '''
+        steps = [self._projections(point, tolerance, max_candidates) for point in points]
+        if not steps:
+            return []
+        
+        #dynamic programming over the candidates, the cost of a path is 
+        #(meters going backwards, total distance to the points) so going 
+        #backwards is only chosen when there is no other way
+        costs = [[((0.0, distance), None) for _, distance in steps[0]]]
+        for previous, current in izip(steps, steps[1:]):
+            previous_costs = costs[-1]
+            step_costs = []
+            for measure, distance in current:
+                best = None
+                for j, (previous_measure, _) in enumerate(previous):
+                    backwards, total = previous_costs[j][0]
+                    cost = (backwards + max(previous_measure - measure, 0.0), total + distance)
+                    if best is None or cost < best[0]:
+                        best = (cost, j)
+                step_costs.append(best)
+            costs.append(step_costs)
+        
+        position = min(xrange(len(costs[-1])), key=lambda j: costs[-1][j][0])
+        result = []
+        for step, step_costs in izip(reversed(steps), reversed(costs)):
+            result.append(step[position][0])
+            position = step_costs[position][1]
+        result.reverse()
+        
+        for i in xrange(1, len(result)):
+            if result[i] < result[i - 1]:
+                result[i] = result[i - 1]
+        
+        return result
+    
+    def _projections(self, point, tolerance, max_candidates):
+        '''Returns (measure, distance) of the projections of a point onto the 
+        line segments, for project_many.
+        
+        '''
+        lines = self.lines
+        measures = self.measures
+        
+        if len(lines) <= SEGMENT_INDEX_THRESHOLD:
+            nearest = ((0.0, i) for i in xrange(len(lines)))
+        else:
+            nearest = self.segment_index.iter_nearest(point)
+        
+        projections = {}
+        best_distance = None
+        for lower_bound, i in nearest:
+            if best_distance is not None and lower_bound > best_distance + tolerance:
+                break
+            
+            line = lines[i]
+            projected = line.closest_point(point)
+            distance = projected.distance_to(point)
+            measure = measures[i] + line.start.distance_to(projected)
+            
+            #a projection onto a shared vertex is found from both segments
+            key = round(measure, 6)
+            if key not in projections or distance < projections[key][1]:
+                projections[key] = (measure, distance)
+            
+            if best_distance is None or distance < best_distance:
+                best_distance = distance
+        
+        candidates = [p for p in projections.itervalues() if p[1] <= best_distance + tolerance]
+        candidates.sort(key=lambda p: p[1])
+        return sorted(candidates[:max_candidates])
+    
+    def dedup(self, tolerance):
+        '''Returns a copy of the polyline without the points that are within
+        tolerance meters of the previous point that was kept. The first and
+        last points are always kept, runs of jittery points collapse onto the
+        first point of the run.
+        
+        >>> p = Polyline(LatLng(35, -78), LatLng(35, -78.000001), LatLng(35, -78.01))
+        >>> len(p.dedup(1.0))
+        2
+        
+        :param tolerance: Minimum distance, in meters, between kept points.
+        :type tolerance: number
+        :returns: Polyline without the near-duplicate points.
+        :rtype: Polyline
+        
+        '''
+        points = self._points
+        kept = [points[0]]
+        
+        for i in xrange(1, len(points) - 1):
+            point = points[i]
+            if kept[-1].distance_to(point) >= tolerance:
+                kept.append(point)
+        
+        #the last point replaces the previous kept point if they are too close
+        if len(kept) > 1 and kept[-1].distance_to(points[-1]) < tolerance:
+            kept[-1] = points[-1]
+        else:
+            kept.append(points[-1])
+        
+        return Polyline(kept)
     
     def split_at_angle(self, threshold=radians(60)):
         '''Splits the polyline wherever the change in direction angle is 
@@ -556,19 +1022,30 @@ class Polyline(object):
         '''
         if len(self) <= 2:
             return [list(self)]
-
+        
+        lengths = self.segment_lengths()
+        turns = self.turn_angles()
+        points = self._points
+        
+        # make sure both lines are at least a millimeter b/c angles aren't 
+        # sensible at that size.
+        if numpy is not None:
+            long_enough = lengths >= 0.001
+            splits = set((numpy.nonzero(long_enough[:-1] & long_enough[1:] & (turns > threshold))[0]).tolist())
+        else:
+            splits = set(i for i, turn in enumerate(turns) 
+                         if lengths[i] >= 0.001 and lengths[i + 1] >= 0.001 and turn > threshold)
+        
         # the first line starts us off
-        result = [self[:2]]
+        result = [points[:2]]
         
-        for A, B in self.angles:
-            # make sure it's at least a meter b/c angles aren't sensible at that
-            # size.
-            if A.distance >= 0.001 and B.distance >= 0.001 and A.angle_to(B) > threshold:
+        for i in xrange(len(points) - 2):
+            if i in splits:
                 # we have a turn, break it up here
-                result.append(list(B.points))
+                result.append([points[i + 1], points[i + 2]])
             else:
                 # still on the same path. tack it onto the last
-                result[-1].append(B.end)
+                result[-1].append(points[i + 2])
 
         return [Polyline(points) for points in result]
     
@@ -582,57 +1059,140 @@ class Polyline(object):
         :rtype: Polyline
         
         '''
+        self.__detach_views()
         old_points = self._points
         
         self._points = self._points[:index + 1]
         self.__on_shape_changed()
         
-        return Polyline(old_points[index:])
+        return Polyline._from_points(old_points[index:])
                     
     def split_at_point(self, point, threshold):
         '''Splits the polyline and returns the Polyline beyond the split point.
         
         Unlike split_at(index), this will split at any point along the Polyline 
-        instead of at an exact vertex index.
+        instead of at an exact vertex index. The point is inserted after the 
+        start of the closest line segment, found best-first through 
+        segment_index on long polylines.
         
         :param point: Point to split at.
         :type point: LatLng
-        :param threshold: TODO: comment this attribute
+        :param threshold: Maximum distance, in meters, from the polyline to the 
+        point.
         :type threshold: number
-        :returns: Tail of the Polyline that was split off.
+        :returns: Tail of the Polyline that was split off, None if the point is 
+        further than threshold from the polyline.
         :rtype: Polyline
         
         '''
-        cur_buffer = [self.first]
-        new_buffer = []
-        has_split = False
+        lines = self.lines
         
-        for line in self.lines:
-            if has_split:
-                new_buffer.append(line.end)                
-            elif point.is_between(line.start, line.end, threshold):
-                has_split = True
-                cur_buffer.append(point)
-                new_buffer.append(point)
-                new_buffer.append(line.end)
+        if len(lines) <= SEGMENT_INDEX_THRESHOLD:
+            candidates = ((0.0, i) for i in xrange(len(lines)))
+        else:
+            candidates = self.segment_index.iter_nearest(point)
+        
+        best = None
+        best_distance = None
+        for lower_bound, i in candidates:
+            if best is not None and lower_bound >= best_distance:
+                break
+            
+            distance = lines[i].closest_point(point).distance_to(point)
+            if best is None or distance < best_distance:
+                best = i
+                best_distance = distance
+        
+        if best is None or best_distance > threshold:
+            return None
+        
+        self.__detach_views()
+        points = self._points
+        
+        head = list(Polyline.clean_points(points[:best + 1] + [point]))
+        if len(head) == 1:
+            head.append(head[0])
+        
+        self._points = head
+        self.__on_shape_changed()
+        return Polyline([point] + points[best + 1:])
+    
+    def clip(self, bounds):
+        '''Returns the parts of the polyline within bounds, without shapely.
+        
+        Each line segment is clipped against the edges of the bounds with the 
+        Liang-Barsky algorithm, treating latitude and longitude as flat 
+        coordinates. Long polylines only clip the segments found with 
+        segment_index. Parts made of whole line segments are views (see view).
+        
+        :param bounds: Bounds to clip to.
+        :type bounds: LatLngBounds
+        :returns: Parts of the polyline within the bounds, in order. Parts that 
+        only touch the bounds at a point are left out.
+        :rtype: list
+        
+        '''
+        points = self._points
+        south, west, north, east = bounds.south, bounds.west, bounds.north, bounds.east
+        
+        own = self.bounds
+        if own.south >= south and own.north <= north and own.west >= west and own.east <= east:
+            return [self.view()]
+        
+        if len(points) - 1 > SEGMENT_INDEX_THRESHOLD:
+            segments = sorted(self.segment_index.intersects(bounds))
+        else:
+            segments = xrange(len(points) - 1)
+        
+        #parts as [first point or None, first vertex, last vertex, last point or None]
+        parts = []
+        current = None
+        for i in segments:
+            a = points[i]
+            b = points[i + 1]
+            clipped = _clip_segment(a.lat, a.lng, b.lat, b.lng, south, west, north, east)
+            if clipped is None or clipped[0] >= clipped[1]:
+                current = None
+                continue
+            
+            t0, t1 = clipped
+            if current is None or current[2] != i or t0 > 0.0:
+                start = None if t0 == 0.0 else LatLng(a.lat + t0 * (b.lat - a.lat), a.lng + t0 * (b.lng - a.lng))
+                current = [start, i if start is None else i + 1, i, None]
+                parts.append(current)
+            
+            if t1 < 1.0:
+                current[3] = LatLng(a.lat + t1 * (b.lat - a.lat), a.lng + t1 * (b.lng - a.lng))
+                current = None
             else:
-                cur_buffer.append(line.end)
+                current[2] = i + 1
         
-        if len(new_buffer) > 1:             
-            self._points = cur_buffer
-            self.__on_shape_changed()
-            return Polyline(new_buffer)
+        result = []
+        for start, first, last, end in parts:
+            if start is None and end is None:
+                result.append(self.view(first, last + 1))
+            else:
+                inner = points[first:last + 1]
+                if start is not None:
+                    inner.insert(0, start)
+                if end is not None:
+                    inner.append(end)
+                result.append(Polyline(inner))
+        return result
     
     def snap_point_all(self, latlng, options=None):
         ''''Finds the closets points on the polyline that is within the 
         max_distance of the given point.
         
-        :param latlng: TODO: comment this attribute
+        Long polylines only test the line segments whose bounds are within 
+        max_distance of the point, using segment_index.
+        
+        :param latlng: Point to snap onto the Polyline.
         :type latlng: LatLng
         :param options: Options for snapping.
         :type options: SnapOptions
-        :returns: TODO: comment the return value.
-        :rtype: TODO: comment the return type.
+        :returns: Every snap of the point onto the Polyline, closest first.
+        :rtype: list
         
         '''
         
@@ -643,16 +1203,26 @@ class Polyline(object):
         if not (self.bounds.contains(latlng) or self.bounds.buffer(max_distance).contains(latlng)):
             return []
                     
-        lines = list(self.lines)        
+        lines = self.lines
+        
+        if len(lines) > SEGMENT_INDEX_THRESHOLD:
+            candidates = sorted(self.segment_index.intersects(LatLngBounds(latlng).buffer(max_distance)))
+            vertices = sorted(set(candidates) | set(i + 1 for i in candidates))
+        else:
+            candidates = range(len(lines))
+            vertices = range(len(self._points))
+        
         snaps = []
         
         #simple check that the other point is exactly one of the polyline points
-        for i, point in enumerate(self):
+        for i in vertices:
+            point = self._points[i]
             if latlng == point:
                 snaps.append(PolylineSnap(point, 0.0, 0.0, i, True))
                 
         if not len(snaps):                
-            for i, line in enumerate(lines):
+            for i in candidates:
+                line = lines[i]
                 snap_beyond = options.snap_beyond or (i < len(lines) - 1)                     
                 snap = line.snap_point(latlng, max_distance, snap_beyond)
                             
@@ -667,14 +1237,10 @@ class Polyline(object):
                     cur_snap = PolylineSnap(snap.point, snap.distance_from_initial, snap.distance_from_start, i, False)
                 
                 snaps.append(cur_snap)
-                
+        
+        measures = self.measures
         for snap in snaps:            
-            distance = snap.distance_from_index
-            for i, line in enumerate(lines):
-                if i >= snap.index:
-                    break
-                distance += line.distance
-            snap.polyline_distance = distance
+            snap.polyline_distance = measures[snap.index] + snap.distance_from_index
          
         return sorted(snaps, key=lambda snap: snap.distance_from_initial)
     
@@ -719,126 +1285,254 @@ class Polyline(object):
         '''Returns the points that are in the other polyline that are not part 
         of this one.
         
+        The other polyline is sampled every max_distance meters and split 
+        wherever it comes within max_distance of this one (see 
+        gcs.overlap.overlap).
+        
         :param other: Other Polyline.
         :type other: Polyline
-        :param max_distance: Maximum distance to allow for snapping.
+        :param max_distance: Maximum distance, in meters, to allow for snapping.
         :type max_distance: number
         :returns: List of Polylines for the points on the other Polyline that 
         couldn't be snapped (weren't "part" of this polyline)
         :rtype: list
         
         '''
+        from overlap import overlap
         
-        self_list = list(self)
-        other_list = list(other)
-        other_reversed = False
+        return [part.polyline for part in overlap(self, other, max_distance).unshared]
+
+
+class _SharedPoints(object):
+    '''Read-only sequence of a range of the points of a polyline, possibly in 
+    reverse, indexing into the polyline's list instead of copying it. Slices 
+    are lists.
+    
+    '''
+    
+    __slots__ = ('_points', '_start', '_stop', '_reverse')
+    
+    def __init__(self, points, start, stop, reverse):
+        self._points = points
+        self._start = start
+        self._stop = stop
+        self._reverse = reverse
+    
+    def __len__(self):
+        return self._stop - self._start
+    
+    def __iter__(self):
+        points = self._points
+        if self._reverse:
+            for i in xrange(self._stop - 1, self._start - 1, -1):
+                yield points[i]
+        else:
+            for i in xrange(self._start, self._stop):
+                yield points[i]
+    
+    def __getitem__(self, index):
+        length = self._stop - self._start
+        if index.__class__ is slice:
+            start, stop, step = index.indices(length)
+            if not len(xrange(start, stop, step)):
+                return []
+            if self._reverse:
+                start, stop, step = self._stop - 1 - start, self._stop - 1 - stop, -step
+            else:
+                start, stop = self._start + start, self._start + stop
+            if stop < 0:
+                stop = None
+            return self._points[start:stop:step]
+        
+        if index < 0:
+            index += length
+        if not 0 <= index < length:
+            raise IndexError('Polyline index out of range')
+        
+        if self._reverse:
+            return self._points[self._stop - 1 - index]
+        return self._points[self._start + index]
+
+class PolylineView(Polyline):
+    '''A read-only view of a range of the points of a Polyline, possibly in 
+    reverse, see Polyline.view.
+    
+    The view shares the points of its polyline and the caches derived from 
+    them: its measures, distance, line segments and columns are sliced from 
+    the polyline's when it has built them, and otherwise computed for the 
+    range of the view alone. Changing either the view or its polyline first 
+    copies the shared points into the view, which then behaves like a plain 
+    Polyline.
+    
+    '''
+    
+    def __init__(self, polyline, start, stop, reverse=False):
+        '''Creates a view of polyline[start:stop], use Polyline.view instead.
         
-        if self.first == other.first:
-            pass
-        elif self.last == other.last:
-            self_list.reverse()
-            other_list.reverse()
-            other_reversed = True
-        elif self.first == other.last:            
-            other_list.reverse()  
-            other_reversed = True
-        elif self.last == other.first:
-            self_list.reverse()                                        
+        '''
+        self._polyline = polyline #None once the points have been copied
+        self._start = start
+        self._stop = stop
+        self._reverse = reverse
+        self._own = None #points of the view once copied
+        self._shared = _SharedPoints(polyline._points, start, stop, reverse)
+        self._Polyline__on_shape_changed()
+    
+    def __reduce__(self):
+        return (Polyline, (list(self), ))
+    
+    def _materialize(self):
+        '''Copies the shared points, detaching the view from its polyline. The 
+        caches stay valid, the shape has not changed.
+        
+        '''
+        if self._polyline is None:
+            return
+        
+        self._own = list(self._shared)
+        
+        if self._polyline._views:
+            self._polyline._views.discard(self)
+        
+        self._polyline = None
+        self._shared = None
+    
+    def _get_points(self):
+        if self._polyline is None:
+            return self._own
+        return self._shared
+    
+    def _set_points(self, points):
+        self._materialize()
+        self._own = points
+    
+    _points = property(_get_points, _set_points)
+    
+    def __iter__(self):
+        '''Iterator that iterates over the points in the view
+        
+        '''
+        return iter(self._points)
+    
+    def __len__(self):
+        return len(self._points)
+    
+    def __getitem__(self, index):
+        return self._points[index]
+    
+    def __setitem__(self, index, value):
+        self._materialize()
+        Polyline.__setitem__(self, index, value)
+    
+    def append(self, value):
+        self._materialize()
+        Polyline.append(self, value)
+    
+    def prepend(self, value):
+        self._materialize()
+        Polyline.prepend(self, value)
+    
+    def insert(self, index, object):
+        self._materialize()
+        Polyline.insert(self, index, object)
+    
+    def split_at(self, index):
+        self._materialize()
+        return Polyline.split_at(self, index)
+    
+    def split_at_point(self, point, threshold):
+        self._materialize()
+        return Polyline.split_at_point(self, point, threshold)
+    
+    def view(self, start=None, stop=None, reverse=False):
+        '''Returns a view of a range of this view, sharing the points of the 
+        same polyline (see Polyline.view).
+        
+        '''
+        if self._polyline is None:
+            return Polyline.view(self, start, stop, reverse)
+        
+        start, stop, _ = slice(start, stop).indices(len(self))
+        if self._reverse:
+            start, stop = self._stop - stop, self._stop - start
         else:
-            return [other]
+            start, stop = self._start + start, self._start + stop
+        
+        return self._polyline.view(start, stop, reverse != self._reverse)
+    
+    @property
+    def bounds(self):
+        '''Bounding box of the points of the view, from the columns of the 
+        polyline.
+        
+        '''
+        if self._polyline is not None and self._bounds is None:
+            lats, lngs = self._get_columns()
+            if numpy is not None:
+                self._bounds = LatLngBounds.from_edges(float(lats.min()), float(lngs.min()), 
+                                                       float(lats.max()), float(lngs.max()))
+            else:
+                self._bounds = LatLngBounds.from_edges(min(lats), min(lngs), max(lats), max(lngs))
         
+        return Polyline.bounds.fget(self)
+    
+    @property
+    def lines(self):
+        '''Line segments of the view, shared with the polyline once it has 
+        built its own (or their inverses for a reversed view).
         
-        cur = self_list[0]
-        self_i = 1
-        other_i = 1
-        broken = False
+        '''
+        if self._polyline is not None and self._lines is None:
+            if self._polyline._lines:
+                lines = self._polyline._lines[self._start:self._stop - 1]
+                if self._reverse:
+                    lines = tuple(line.inverse for line in reversed(lines))
+            else:
+                points = self._shared
+                lines = tuple(GeoLine(points[i], points[i + 1]) for i in xrange(len(points) - 1))
+            self._lines = lines
         
-        new_path = [cur]
-        result = [new_path]
+        return Polyline.lines.fget(self)
+    
+    @property
+    def distance(self):
+        '''Length of the view in meters, from the measures of the polyline 
+        once it has them.
         
-        #run until we have looked at all the points in the other polyline
-        while other_i < len(other_list):
-            #if we have run out of points in this polyline then add the remaining ones from other to the output
-            if self_i >= len(self_list):
-                new_path += other_list[other_i:]   
-                break
-            
-            
-            self_next = self_list[self_i]
-            other_next = other_list[other_i]
-            
-            if broken is True:
-                #after a break, check all the remaining points on self to find one that snaps to the other
-                                
-                #try to snap remaining points from this polyline on the other one
-                snap = other.snap_point(self_next, max_distance) 
-                if snap is not None:
-                    _, (snap_pos, _, _) = snap
-                    cur = self_next
-                    
-                    #check if the other polyine snaps first
-                    while other_i <= snap_pos - 1:
-                        other_prev = other_list[other_i]
-                        other_cur = other_list[other_i + 1]
-                        
-                        if other_cur.is_between(other_prev, cur, max_distance):
-                            cur =  other_cur
-                            break
-                        
-                        new_path.append(other_cur)                        
-                        other_i += 1
-                    
-                    new_path.append(cur)                        
-                    broken = False
-                else:    
-                    self_i += 1
-            
-            else: #not broken
-                if self_next == other_next:
-                    cur = self_next
-                    self_i += 1
-                    other_i += 1
-                    new_path.append(cur)
-                    continue
-                
-                #given cur, a point we know is on both polylines, find which polyline has the
-                #next closest point
-                if cur.distance_to(other_next) < cur.distance_to(self_next):
-                    closest = other_next
-                    farthest = self_next
-                else:
-                    closest = self_next
-                    farthest = other_next
-                
-                #check if the closest point lies between the current point and the farthest
-                #if it does not then we have found a break
-                if closest.is_between(cur, farthest, max_distance):
-                    cur = closest
-                    
-                    if closest == other_next:                        
-                        other_i += 1
-                else: 
-                    broken = True
-                    
-                    if new_path[-1] != cur:
-                        new_path.append(cur)
-                    new_path = [cur]
-                    result.append(new_path)
-                
-                if closest == self_next:
-                    self_i += 1
-                
-        if len(result[0]) == 1:
-            return [other]
+        '''
+        if self._polyline is not None and self._distance is None and self._polyline._measures is not None:
+            measures = self._polyline._measures
+            self._distance = measures[self._stop - 1] - measures[self._start]
         
-        if len(new_path) == 1:
-            result.pop()
+        return Polyline.distance.fget(self)
+    
+    @property
+    def measures(self):
+        '''Distance along the view at each point, from the measures of the 
+        polyline once it has them.
         
-        if other_reversed is True:
-            result.reverse()           
-            [path.reverse() for path in result]
-            
-        return [Polyline(path) for path in result]
-
+        '''
+        if self._polyline is not None and self._measures is None and self._polyline._measures is not None:
+            measures = self._polyline._measures[self._start:self._stop]
+            if self._reverse:
+                end = measures[-1]
+                self._measures = tuple(end - m for m in reversed(measures))
+            else:
+                start = measures[0]
+                self._measures = tuple(m - start for m in measures)
+        
+        return Polyline.measures.fget(self)
+    
+    def _get_columns(self):
+        if self._polyline is not None and self._columns is None and self._polyline._columns is not None:
+            lats, lngs = self._polyline._columns
+            lats = lats[self._start:self._stop]
+            lngs = lngs[self._start:self._stop]
+            if self._reverse:
+                lats = lats[::-1]
+                lngs = lngs[::-1]
+            self._columns = (lats, lngs)
+        
+        return Polyline._get_columns(self)
 
-__all__ = ['from_linestring', 'Polyline', 'PolylineSnap', 'SnapOptions']
+__all__ = ['from_linestring', 'Polyline', 'PolylineView', 'PolylineSnap', 'SnapOptions']
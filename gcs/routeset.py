@@ -0,0 +1,156 @@
+'''routeset
+
+Provides the RouteSet class, a collection of Polylines that points can be
+snapped against in one call.
+'''
+
+from gcs.index import BoundsIndex
+from gcs.polyline import SnapOptions
+
+class RouteSet(object):
+    '''A read-only collection of keyed Polylines (routes).
+
+    Snapping first prunes the routes with an index over their bounds, then
+    snaps the point onto each remaining route, which in turn only tests the
+    line segments near the point (see Polyline.snap_point_all).
+
+    The routes must not be changed after the RouteSet has been created.
+
+    >>> from gcs import LatLng, Polyline
+    >>> routes = RouteSet({'a': Polyline(LatLng(35, -78), LatLng(35, -77.99))})
+    >>> key, snap = routes.snap(LatLng(35.00001, -77.995), SnapOptions(max_distance=15.0))
+    >>> key
+    'a'
+
+    '''
+
+    def __init__(self, routes, node_capacity=None):
+        '''Creates a new RouteSet.
+
+        :param routes: Either a dict of key -> Polyline, or a list of Polylines
+        in which case the keys are the positions in the list.
+        :param node_capacity: Maximum number of children per node of the bounds
+        index, uses the BoundsIndex default if None.
+        :type node_capacity: number
+
+        '''
+        if hasattr(routes, 'items'):
+            items = sorted(routes.items())
+        else:
+            items = list(enumerate(routes))
+
+        self._routes = dict(items)
+        self._keys = [key for key, _ in items]
+
+        kwargs = {} if node_capacity is None else {'node_capacity': node_capacity}
+        self._index = BoundsIndex([route.bounds for _, route in items], self._keys, **kwargs)
+
+    def __len__(self):
+        '''Gets the number of routes in the set.
+
+        :returns: Number of routes.
+        :rtype: number
+
+        '''
+        return len(self._keys)
+
+    def __iter__(self):
+        '''Iterates over the keys of the routes in the set.
+
+        '''
+        for key in self._keys:
+            yield key
+
+    def __getitem__(self, key):
+        '''Gets the route for a key.
+
+        :param key: Key of the route.
+        :returns: Route for the key.
+        :rtype: Polyline
+
+        '''
+        return self._routes[key]
+
+    @property
+    def index(self):
+        '''The BoundsIndex over the bounds of the routes, queries on it return
+        route keys.'''
+        return self._index
+
+    def candidates(self, latlng, max_distance):
+        '''Finds the keys of the routes whose bounds are within max_distance
+        of a point.
+
+        :param latlng: Point to search around.
+        :type latlng: LatLng
+        :param max_distance: Distance in meters.
+        :type max_distance: number
+        :returns: Keys of the candidate routes.
+        :rtype: list
+
+        '''
+        return self._index.within_distance(latlng, max_distance)
+
+    def snap_all(self, latlng, options=None):
+        '''Snaps a point onto every route it is within max_distance of.
+
+        :param latlng: Point to snap.
+        :type latlng: LatLng
+        :param options: Options for snapping.
+        :type options: SnapOptions
+        :returns: List of (key, PolylineSnap) tuples with the best snap for each
+        route that the point snapped to, closest first.
+        :rtype: list
+
+        '''
+        options = options if options else SnapOptions()
+
+        result = []
+        for key in self.candidates(latlng, options.max_distance):
+            snap = self._routes[key].snap_point(latlng, options)
+            if snap is not None:
+                result.append((key, snap))
+
+        result.sort(key=lambda pair: pair[1].distance_from_initial)
+        return result
+
+    def snap_point_all(self, latlng, options=None):
+        '''Snaps a point onto every route it is within max_distance of,
+        keeping every snap of each route (see Polyline.snap_point_all), which
+        matters for routes that pass the same place more than once.
+
+        :param latlng: Point to snap.
+        :type latlng: LatLng
+        :param options: Options for snapping.
+        :type options: SnapOptions
+        :returns: List of (key, PolylineSnap) tuples, closest first.
+        :rtype: list
+
+        '''
+        options = options if options else SnapOptions()
+
+        result = []
+        for key in self.candidates(latlng, options.max_distance):
+            result.extend((key, snap) for snap in self._routes[key].snap_point_all(latlng, options))
+
+        result.sort(key=lambda pair: pair[1].distance_from_initial)
+        return result
+
+    def snap(self, latlng, options=None):
+        '''Snaps a point onto the closest route.
+
+        :param latlng: Point to snap.
+        :type latlng: LatLng
+        :param options: Options for snapping.
+        :type options: SnapOptions
+        :returns: (key, PolylineSnap) tuple for the closest route, or None if
+        the point is not within max_distance of any route.
+        :rtype: tuple
+
+        '''
+        snaps = self.snap_all(latlng, options)
+        if not snaps:
+            return None
+        return snaps[0]
+
+__all__ = ['RouteSet']
@@ -0,0 +1,455 @@
+'''similarity
+
+Provides the hausdorff and frechet functions, shape similarity measures in
+meters between Polylines, their batch versions hausdorff_many and
+frechet_many, and the SimilarityMatrix class, for keeping the similarity of
+every pair of shapes of a network up to date.
+'''
+
+import csv
+
+from math import radians
+from multiprocessing import Pool
+from multiprocessing.sharedctypes import RawArray
+
+from gcs.functions import distance_many, _haversine
+from gcs.index import BoundsIndex
+from gcs.polyline import Polyline
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+BLOCK_SIZE = 256
+'''Number of points whose distances to a whole Polyline are computed at once'''
+
+class _Points(object):
+    '''Coordinates of the points of a Polyline, as numpy arrays when numpy
+    is available, otherwise as lists of radians.
+    '''
+
+    def __init__(self, polyline):
+        lats = [p.lat for p in polyline]
+        lngs = [p.lng for p in polyline]
+
+        if numpy is not None:
+            self.lats = numpy.array(lats, dtype=float)
+            self.lngs = numpy.array(lngs, dtype=float)
+        else:
+            self.lats = [radians(lat) for lat in lats]
+            self.lngs = [radians(lng) for lng in lngs]
+
+    def __len__(self):
+        return len(self.lats)
+
+    def distance(self, i, other, j):
+        if numpy is not None:
+            return float(distance_many(self.lats[i], self.lngs[i], other.lats[j], other.lngs[j]))
+        return _haversine(self.lats[i], self.lngs[i], other.lats[j], other.lngs[j])
+
+    def distances(self, start, stop, other):
+        '''Distances from the points start to stop to every point of other,
+        one row per point.
+        '''
+        if numpy is not None:
+            return distance_many(self.lats[start:stop, None], self.lngs[start:stop, None],
+                                 other.lats[None, :], other.lngs[None, :])
+
+        return [[_haversine(lat, lng, other_lat, other_lng)
+                 for other_lat, other_lng in zip(other.lats, other.lngs)]
+                for lat, lng in zip(self.lats[start:stop], self.lngs[start:stop])]
+
+def _bounds_lower_bound(a, b):
+    '''A lower bound of the Hausdorff distance: the farthest any point of
+    either Polyline is from the bounds of the other one.
+    '''
+    b_bounds = b.bounds
+    a_bounds = a.bounds
+    return max(max(b_bounds.distance_to(p) for p in a),
+               max(a_bounds.distance_to(p) for p in b))
+
+def _directed_hausdorff(a, b, cmax, max_distance):
+    '''Returns the largest distance from a point of a to its closest point of
+    b, or a value above max_distance as soon as one is found. cmax is a
+    distance already known to be part of the result.
+    '''
+    if numpy is not None:
+        for start in xrange(0, len(a), BLOCK_SIZE):
+            closest = a.distances(start, start + BLOCK_SIZE, b).min(axis=1)
+            cmax = max(cmax, float(closest.max()))
+            if max_distance is not None and cmax > max_distance:
+                break
+        return cmax
+
+    #without numpy the scan for the closest point stops as soon as a point is
+    #closer than cmax, since that point can not raise the result. The scan
+    #starts at the closest point of the previous point, which is usually close
+    count = len(b)
+    start = 0
+    for i in xrange(len(a)):
+        cmin = None
+        for k in xrange(count):
+            j = (start + k) % count
+            d = a.distance(i, b, j)
+            if cmin is None or d < cmin:
+                cmin = d
+                start = j
+                if cmin <= cmax:
+                    break
+
+        if cmin > cmax:
+            cmax = cmin
+            if max_distance is not None and cmax > max_distance:
+                break
+    return cmax
+
+def hausdorff(a, b, max_distance=None):
+    '''Calculates the discrete Hausdorff distance, in meters, between the
+    points of two Polylines: the farthest any point of either one is from the
+    closest point of the other one.
+
+    With max_distance, the calculation is abandoned as soon as the distance is
+    known to be above it, starting with a lower bound from the bounds of the
+    Polylines.
+
+    :param a: First Polyline.
+    :type a: Polyline
+    :param b: Second Polyline.
+    :type b: Polyline
+    :param max_distance: Distance, in meters, above which the result is not
+    needed.
+    :type max_distance: number
+    :returns: Hausdorff distance, None if it is above max_distance.
+    :rtype: number
+
+    '''
+    cmax = _bounds_lower_bound(a, b)
+    if max_distance is not None and cmax > max_distance:
+        return None
+
+    a_points = _Points(a)
+    b_points = _Points(b)
+
+    cmax = _directed_hausdorff(a_points, b_points, cmax, max_distance)
+    if max_distance is None or cmax <= max_distance:
+        cmax = _directed_hausdorff(b_points, a_points, cmax, max_distance)
+
+    if max_distance is not None and cmax > max_distance:
+        return None
+    return cmax
+
+def frechet(a, b, max_distance=None):
+    '''Calculates the discrete Frechet distance, in meters, between two
+    Polylines: the shortest leash that lets two walkers go from the first to
+    the last point of each Polyline, never going back.
+
+    The distances from each point of a to all the points of b are computed a
+    row at a time (vectorized when numpy is available) and only one row of
+    the coupling table is kept. With max_distance, the calculation is
+    abandoned once every cell of a row is above it, or when a lower bound
+    (the distance between the ends, or the bounds of the Polylines) is.
+
+    :param a: First Polyline.
+    :type a: Polyline
+    :param b: Second Polyline.
+    :type b: Polyline
+    :param max_distance: Distance, in meters, above which the result is not
+    needed.
+    :type max_distance: number
+    :returns: Frechet distance, None if it is above max_distance.
+    :rtype: number
+
+    '''
+    a_points = _Points(a)
+    b_points = _Points(b)
+
+    if max_distance is not None:
+        lower_bound = max(a_points.distance(0, b_points, 0),
+                          a_points.distance(len(a_points) - 1, b_points, len(b_points) - 1))
+        if lower_bound > max_distance or _bounds_lower_bound(a, b) > max_distance:
+            return None
+
+    row = None
+    for i in xrange(len(a_points)):
+        distances = a_points.distances(i, i + 1, b_points)[0]
+        if numpy is not None:
+            distances = distances.tolist()
+
+        current = []
+        if row is None:
+            previous = 0.0
+            for d in distances:
+                previous = max(d, previous)
+                current.append(previous)
+        else:
+            previous = max(distances[0], row[0])
+            current.append(previous)
+            for j in xrange(1, len(distances)):
+                previous = max(distances[j], min(row[j], row[j - 1], previous))
+                current.append(previous)
+
+        if max_distance is not None and min(current) > max_distance:
+            return None
+        row = current
+
+    result = row[-1]
+    if max_distance is not None and result > max_distance:
+        return None
+    return result
+
+def _many(measure, polylines, others, max_distance):
+    polylines = list(polylines)
+    symmetric = others is None
+    others = polylines if symmetric else list(others)
+
+    index = BoundsIndex([p.bounds for p in others])
+
+    result = {}
+    for i, a in enumerate(polylines):
+        for j in index.intersects(a.bounds.buffer(max_distance)):
+            if symmetric and j <= i:
+                continue
+            distance = measure(a, others[j], max_distance)
+            if distance is not None:
+                result[(i, j)] = distance
+    return result
+
+def hausdorff_many(polylines, others=None, max_distance=50.0):
+    '''Calculates the Hausdorff distance between many pairs of Polylines, see
+    hausdorff. Pairs whose bounds are farther apart than max_distance are
+    pruned with a BoundsIndex.
+
+    :param polylines: Polylines to compare.
+    :type polylines: list
+    :param others: Polylines to compare against, defaults to comparing the
+    polylines with each other.
+    :type others: list
+    :param max_distance: Largest distance, in meters, to return.
+    :type max_distance: number
+    :returns: dict of (i, j) -> distance for the pairs within max_distance.
+    When comparing the polylines with each other only i < j is returned.
+    :rtype: dict
+
+    '''
+    return _many(hausdorff, polylines, others, max_distance)
+
+def frechet_many(polylines, others=None, max_distance=50.0):
+    '''Calculates the Frechet distance between many pairs of Polylines, see
+    frechet and hausdorff_many.
+
+    :param polylines: Polylines to compare.
+    :type polylines: list
+    :param others: Polylines to compare against, defaults to comparing the
+    polylines with each other.
+    :type others: list
+    :param max_distance: Largest distance, in meters, to return.
+    :type max_distance: number
+    :returns: dict of (i, j) -> distance for the pairs within max_distance.
+    :rtype: dict
+
+    '''
+    return _many(frechet, polylines, others, max_distance)
+
+#state of the worker processes of SimilarityMatrix, set by _init_worker
+_worker = {}
+
+def _init_worker(lats, lngs, offsets, measure, max_distance):
+    _worker.clear()
+    _worker.update(lats=lats, lngs=lngs, offsets=offsets, measure=measure,
+                   max_distance=max_distance, shapes={})
+
+def _worker_shape(i):
+    shapes = _worker['shapes']
+    if i not in shapes:
+        start, stop = _worker['offsets'][i], _worker['offsets'][i + 1]
+        shapes[i] = Polyline.from_arrays(_worker['lats'][start:stop], _worker['lngs'][start:stop])
+    return shapes[i]
+
+def _compute_chunk(pairs):
+    measure = _worker['measure']
+    max_distance = _worker['max_distance']
+    return [measure(_worker_shape(i), _worker_shape(j), max_distance) for i, j in pairs]
+
+def _coordinates(polyline):
+    return tuple((p.lat, p.lng) for p in polyline)
+
+class SimilarityMatrix(object):
+    '''A sparse matrix of the similarity of every pair of shapes of a network.
+
+    Only the pairs within max_distance of each other are kept. Pairs are
+    pruned with a BoundsIndex over the bounds of the shapes, the remaining
+    ones are measured on a pool of processes. The coordinates of the shapes
+    are copied once into shared memory buffers that the workers read from,
+    so only pairs of positions and the resulting distances are sent between
+    processes.
+
+    update only measures the pairs that involve shapes that were added or
+    changed since the previous update.
+
+    >>> from gcs import LatLng, Polyline
+    >>> matrix = SimilarityMatrix(max_distance=20.0)
+    >>> changed = matrix.update({'a': Polyline(LatLng(35, -78), LatLng(35, -77.99)),
+    ...                          'b': Polyline(LatLng(35.0001, -78), LatLng(35.0001, -77.99))})
+    >>> round(matrix['a', 'b'], 1)
+    11.1
+
+    '''
+
+    def __init__(self, measure=hausdorff, max_distance=50.0, processes=None, chunk_size=64):
+        '''Creates an empty SimilarityMatrix.
+
+        :param measure: Function measuring two Polylines with a max_distance,
+        such as hausdorff or frechet. It must be defined at the top level of
+        a module to be used with processes.
+        :type measure: function
+        :param max_distance: Largest distance, in meters, to keep.
+        :type max_distance: number
+        :param processes: Number of worker processes, pairs are measured in
+        this process when None or less than 2.
+        :type processes: number
+        :param chunk_size: Number of pairs sent to a worker at once.
+        :type chunk_size: number
+
+        '''
+        self.measure = measure
+        self.max_distance = max_distance
+        self.processes = processes
+        self.chunk_size = chunk_size
+
+        self._shapes = {}
+        self._coordinates = {} #key -> coordinates of the shape at the last update
+        self._distances = {} #(key, key) -> distance, keys in sorted order
+
+    def __len__(self):
+        '''Gets the number of pairs within max_distance.
+
+        :returns: Number of pairs.
+        :rtype: number
+
+        '''
+        return len(self._distances)
+
+    def __getitem__(self, pair):
+        '''Gets the distance between two shapes.
+
+        :param pair: Keys of the two shapes.
+        :type pair: tuple
+        :returns: Distance, in meters, None if it is above max_distance.
+        :rtype: number
+
+        '''
+        a, b = pair
+        if a == b and a in self._shapes:
+            return 0.0
+        return self._distances.get((a, b) if a < b else (b, a))
+
+    def items(self):
+        '''Returns the ((key, key), distance) of every pair within
+        max_distance, sorted by keys.
+
+        :returns: List of pairs and their distances.
+        :rtype: list
+
+        '''
+        return sorted(self._distances.iteritems())
+
+    def neighbors(self, key):
+        '''Returns the shapes within max_distance of a shape.
+
+        :param key: Key of the shape.
+        :returns: dict of key -> distance.
+        :rtype: dict
+
+        '''
+        result = {}
+        for (a, b), distance in self._distances.iteritems():
+            if a == key:
+                result[b] = distance
+            elif b == key:
+                result[a] = distance
+        return result
+
+    def update(self, shapes):
+        '''Replaces the shapes and measures the pairs that involve a shape
+        that was added or changed.
+
+        :param shapes: All the shapes of the network.
+        :type shapes: dict of key -> Polyline
+        :returns: Keys of the shapes that were added, changed or removed.
+        :rtype: set
+
+        '''
+        shapes = dict(shapes)
+        coordinates = dict((key, _coordinates(polyline)) for key, polyline in shapes.iteritems())
+
+        changed = set(key for key in shapes if self._coordinates.get(key) != coordinates[key])
+        stale = changed | set(key for key in self._shapes if key not in shapes)
+
+        for pair in [pair for pair in self._distances if pair[0] in stale or pair[1] in stale]:
+            del self._distances[pair]
+
+        self._shapes = shapes
+        self._coordinates = coordinates
+
+        if changed:
+            keys = sorted(shapes)
+            index = BoundsIndex([shapes[key].bounds.buffer(self.max_distance) for key in keys], keys)
+
+            pairs = set()
+            for key in changed:
+                for other in index.intersects(shapes[key].bounds):
+                    if other != key:
+                        pairs.add((key, other) if key < other else (other, key))
+
+            pairs = sorted(pairs)
+            for pair, distance in zip(pairs, self._measure_pairs(pairs)):
+                if distance is not None:
+                    self._distances[pair] = distance
+
+        return stale
+
+    def _measure_pairs(self, pairs):
+        if not self.processes or self.processes < 2 or len(pairs) <= self.chunk_size:
+            return [self.measure(self._shapes[a], self._shapes[b], self.max_distance) for a, b in pairs]
+
+        #pack the coordinates of the shapes involved into shared buffers
+        keys = sorted(set(key for pair in pairs for key in pair))
+        positions = dict((key, i) for i, key in enumerate(keys))
+
+        offsets = [0]
+        for key in keys:
+            offsets.append(offsets[-1] + len(self._shapes[key]))
+
+        lats = RawArray('d', offsets[-1])
+        lngs = RawArray('d', offsets[-1])
+        for key, start in zip(keys, offsets):
+            for k, point in enumerate(self._shapes[key]):
+                lats[start + k] = point.lat
+                lngs[start + k] = point.lng
+
+        position_pairs = [(positions[a], positions[b]) for a, b in pairs]
+        chunks = [position_pairs[i:i + self.chunk_size] for i in xrange(0, len(position_pairs), self.chunk_size)]
+
+        pool = Pool(self.processes, _init_worker, (lats, lngs, offsets, self.measure, self.max_distance))
+        try:
+            results = pool.map(_compute_chunk, chunks)
+        finally:
+            pool.close()
+            pool.join()
+
+        return [distance for chunk in results for distance in chunk]
+
+    def write(self, csvfile):
+        '''Writes the pairs within max_distance as CSV rows of key, key,
+        distance, sorted by keys.
+
+        :param csvfile: Open file to write to.
+
+        '''
+        writer = csv.writer(csvfile)
+        writer.writerow(['key_a', 'key_b', 'distance'])
+        for (a, b), distance in self.items():
+            writer.writerow([a, b, repr(distance)])
+
+__all__ = ['hausdorff', 'frechet', 'hausdorff_many', 'frechet_many', 'SimilarityMatrix']
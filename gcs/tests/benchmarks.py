@@ -0,0 +1,145 @@
+#!/usr/bin/python
+'''benchmarks
+
+Rough timings for the hot paths of gcs. Run with:
+
+    python -m gcs.tests.benchmarks
+'''
+
+import random
+
+from timeit import default_timer
+
+from gcs import LatLng, Polyline
+from gcs.polyline import SnapOptions
+
+def random_walk(count, seed=1, start=LatLng(35.78, -78.64), step=25.0):
+    '''Builds a Polyline of count points that wanders around like a vehicle
+    trace, step meters between points.
+    '''
+    rnd = random.Random(seed)
+    bearing = 0.0
+    points = [start]
+    for _ in range(count - 1):
+        bearing += rnd.uniform(-0.4, 0.4)
+        points.append(points[-1].apply_bearing_and_distance(bearing, step))
+    return Polyline(points)
+
+def random_points(bounds, count, seed=2):
+    rnd = random.Random(seed)
+    return [LatLng(rnd.uniform(bounds.south, bounds.north), rnd.uniform(bounds.west, bounds.east))
+            for _ in range(count)]
+
+def timed(label, func, repeat=1):
+    start = default_timer()
+    for _ in range(repeat):
+        result = func()
+    elapsed = (default_timer() - start) / repeat
+    print '%-50s %10.4fs' % (label, elapsed)
+    return result
+
+def bench_closest_point():
+    poly = random_walk(10001)
+    points = random_points(poly.bounds.buffer(500.0), 20)
+
+    def scan():
+        return [min((L.closest_point(p) for L in poly.lines), key=lambda x: x.distance_to(p)) for p in points]
+
+    timed('build segment_index (10k segments)', lambda: poly.segment_index)
+    timed('closest_point all-segments scan x20', scan)
+    timed('closest_point best-first x20', lambda: poly.closest_points(points))
+
+def bench_split_at_angle():
+    poly = random_walk(10001)
+
+    def pairwise():
+        return [A.angle_to(B) for A, B in Polyline(list(poly)).angles]
+
+    timed('turn angles via GeoLine pairs (10k points)', pairwise)
+    timed('turn_angles vectorized (10k points)', lambda: Polyline(list(poly)).turn_angles())
+    timed('split_at_angle (10k points)', lambda: poly.split_at_angle())
+
+def bench_project_many():
+    poly = random_walk(5001)
+    stops = [poly[i].apply_bearing_and_distance(1.0, 8.0) for i in range(0, 5001, 25)]
+    options = SnapOptions(max_distance=50.0)
+    poly.segment_index
+
+    timed('snap_point per stop (200 stops, 5k segments)', lambda: [poly.snap_point(p, options) for p in stops])
+    timed('project_many (200 stops, 5k segments)', lambda: poly.project_many(stops))
+
+def bench_similarity():
+    from gcs.similarity import hausdorff, frechet
+
+    a = random_walk(2001)
+    b = Polyline([p.apply_bearing_and_distance(0.5, 5.0) for p in a])
+
+    timed('contains (2k points, 10 m)', lambda: a.contains(b, 10.0))
+    timed('hausdorff (2k x 2k points)', lambda: hausdorff(a, b))
+    timed('hausdorff abandoned at 2 m (2k x 2k points)', lambda: hausdorff(a, b, 2.0))
+    timed('frechet (2k x 2k points)', lambda: frechet(a, b))
+
+def bench_graph():
+    from gcs.graph import Graph
+
+    shapes = [random_walk(201, seed=seed) for seed in range(100)]
+    graph = timed('Graph (100 shapes, 20k points)', lambda: Graph(shapes, tolerance=5.0))
+    pairs = [(shapes[i][0], shapes[i + 1][-1]) for i in range(50)]
+
+    timed('dijkstra (50 pairs)', lambda: [graph.dijkstra(graph.nearest_node(a), graph.nearest_node(b)) for a, b in pairs])
+    timed('astar (50 pairs)', lambda: [graph.astar(graph.nearest_node(a), graph.nearest_node(b)) for a, b in pairs])
+    timed('shortest_path (50 pairs)', lambda: [graph.shortest_path(a, b) for a, b in pairs])
+
+def bench_assembly():
+    from gcs.assembly import assemble
+
+    points = random_walk(20001).points
+    fragments = [Polyline(points[i:i + 41]) for i in range(0, 20000, 40)]
+    random.Random(3).shuffle(fragments)
+
+    def splice_all():
+        result = fragments[0]
+        for fragment in fragments[1:]:
+            result = result.splice_fuzzy(fragment)
+        return result
+
+    timed('splice_fuzzy in order found (500 fragments)', splice_all)
+    timed('assemble (500 fragments)', lambda: assemble(fragments))
+
+def bench_views():
+    poly = random_walk(10001)
+    poly.measures
+    points = list(poly)
+
+    timed('Polyline(reversed) (10k points, x100)', lambda: Polyline(reversed(points)), 100)
+    timed('inverse view (10k points, x100)', lambda: poly.inverse, 100)
+    timed('inverse view distance (10k points, x100)', lambda: poly.inverse.distance, 100)
+    timed('view measures (5k of 10k points, x100)', lambda: poly.view(2500, 7500).measures, 100)
+
+def bench_lod():
+    from gcs.encoders.google_polyline import encode_polyline
+    from gcs.lod import LODPyramid
+
+    poly = random_walk(20001)
+    pyramid = timed('LODPyramid (20k points)', lambda: LODPyramid(poly))
+    zooms = range(8, 18)
+
+    timed('encode_polyline full resolution (x10 zooms)', lambda: [encode_polyline(poly) for _ in zooms])
+    timed('pyramid.encode first request (10 zooms)', lambda: [pyramid.encode(pyramid.tolerance_for_zoom(z)) for z in zooms])
+    timed('pyramid.encode cached (10 zooms)', lambda: [pyramid.encode(pyramid.tolerance_for_zoom(z)) for z in zooms])
+
+BENCHMARKS = [
+    bench_closest_point,
+    bench_split_at_angle,
+    bench_project_many,
+    bench_similarity,
+    bench_graph,
+    bench_assembly,
+    bench_views,
+    bench_lod,
+]
+
+if __name__ == '__main__':
+    for bench in BENCHMARKS:
+        print bench.__name__
+        bench()
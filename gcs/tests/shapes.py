@@ -0,0 +1,12 @@
+'''shapes
+
+Builders of test shapes shared by the test modules.
+'''
+
+from math import radians
+
+def line(start, bearing, distance, step=50.0):
+    '''Points from start along a constant bearing, in degrees, every step
+    meters for distance meters.
+    '''
+    return [start.apply_bearing_and_distance(radians(bearing), i * step) for i in range(int(distance / step) + 1)]
@@ -0,0 +1,91 @@
+import unittest
+import random
+
+from math import radians
+
+from gcs import LatLng, Polyline
+from gcs.assembly import assemble, chain_fragments
+from gcs.tests.shapes import line
+
+def cut(points, size):
+    '''Cuts a list of points into Polylines of size line segments sharing
+    their endpoints.'''
+    return [Polyline(points[i:i + size + 1]) for i in range(0, len(points) - 1, size)]
+
+class AssemblyTestCase(unittest.TestCase):
+
+    def setUp(self):
+        start = LatLng(35.0, -78.0)
+        points = line(start, 90, 2000.0)
+        points += line(points[-1], 0, 1000.0)[1:]
+        self.points = points
+        self.shape = Polyline(points)
+
+    def testShuffled(self):
+        fragments = cut(self.points, 3)
+        random.seed(3)
+        random.shuffle(fragments)
+        fragments = [f.inverse if random.random() < 0.5 else f for f in fragments]
+
+        result = assemble(fragments)
+        self.assertEqual(len(result), 1)
+        shape = result[0]
+        if shape.first != self.shape.first:
+            shape = shape.inverse
+        self.assertEqual(shape.points, self.shape.points)
+
+        chain = chain_fragments(fragments)[0]
+        self.assertEqual(sorted(i for i, _ in chain), range(len(fragments)))
+        self.assertEqual([r for i, r in chain if i == 0], [False])
+
+    def testMatchesSpliceFuzzy(self):
+        fragments = cut(self.points, 4)
+        #gaps of a few meters between the fragments
+        fragments = [Polyline(f.points[:-1] + (f.last.apply_bearing_and_distance(0.0, 2.0), )) for f in fragments]
+
+        expected = fragments[0]
+        for fragment in fragments[1:]:
+            expected = expected.splice_fuzzy(fragment)
+
+        self.assertEqual(assemble(fragments, 1.0)[0].points, fragments[0].points)
+        result = assemble(fragments, 5.0)
+        self.assertEqual(len(result), 1)
+        self.assertEqual(result[0].points, expected.points)
+
+    def testSeveralChains(self):
+        start = LatLng(36.0, -78.0)
+        other = line(start, 0, 1000.0)
+        fragments = cut(other, 5) + cut(self.points, 5)
+
+        chains = chain_fragments(fragments)
+        self.assertEqual(len(chains), 2)
+        self.assertEqual([i for i, _ in chains[0]], [0, 1, 2, 3])
+
+        result = assemble(fragments)
+        self.assertEqual(result[0].points, Polyline(other).points)
+        self.assertEqual(result[1].points, self.shape.points)
+
+    def testClosestJoinedFirst(self):
+        start = LatLng(35.0, -78.0)
+        east = Polyline(line(start, 90, 200.0))
+        north = Polyline(line(east.last.apply_bearing_and_distance(0.0, 0.5), 0, 200.0))
+        south = Polyline(line(east.last.apply_bearing_and_distance(radians(180), 0.2), 180, 200.0))
+
+        chains = chain_fragments([east, north, south])
+        self.assertEqual(chains, [[(0, False), (2, False)], [(1, False)]])
+
+    def testLoop(self):
+        start = LatLng(35.0, -78.0)
+        points = line(start, 90, 500.0)
+        points += line(points[-1], 0, 500.0)[1:]
+        points += line(points[-1], 270, 500.0)[1:]
+        points += line(points[-1], 180, 500.0)[1:]
+        points[-1] = points[0]
+
+        result = assemble(cut(points, 4))
+        self.assertEqual(len(result), 1)
+        self.assertEqual(len(result[0]), len(points))
+        self.assertEqual(result[0].first, result[0].last)
+
+if __name__ == '__main__':
+    unittest.main()
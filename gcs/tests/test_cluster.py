@@ -0,0 +1,129 @@
+import unittest
+import random
+
+from gcs import LatLng
+from gcs.cluster import NOISE, dbscan, dbscan_arrays, merge_points
+
+def brute_force_dbscan(points, eps, min_samples):
+    neighbors = [[j for j, q in enumerate(points) if j != i and p.distance_to(q) <= eps]
+                 for i, p in enumerate(points)]
+    core = [len(n) + 1 >= min_samples for n in neighbors]
+
+    labels = [NOISE] * len(points)
+    cluster = 0
+    for i in range(len(points)):
+        if not core[i] or labels[i] != NOISE:
+            continue
+        labels[i] = cluster
+        stack = [i]
+        while stack:
+            for j in neighbors[stack.pop()]:
+                if core[j] and labels[j] == NOISE:
+                    labels[j] = cluster
+                    stack.append(j)
+        cluster += 1
+
+    for i in range(len(points)):
+        if not core[i]:
+            cores = [j for j in neighbors[i] if core[j]]
+            if cores:
+                labels[i] = labels[min(cores)]
+
+    return labels
+
+class ClusterTestCase(unittest.TestCase):
+
+    def setUp(self):
+        rnd = random.Random(7)
+        center = LatLng(35.78, -78.64)
+
+        points = []
+        for _ in range(8):
+            blob = center.apply_bearing_and_distance(rnd.uniform(0, 6.28), rnd.uniform(0, 3000.0))
+            for _ in range(40):
+                points.append(blob.apply_bearing_and_distance(rnd.uniform(0, 6.28), rnd.gauss(0, 80.0)))
+        for _ in range(100):
+            points.append(center.apply_bearing_and_distance(rnd.uniform(0, 6.28), rnd.uniform(0, 4000.0)))
+
+        rnd.shuffle(points)
+        self.points = points
+
+    def testMatchesBruteForce(self):
+        expected = brute_force_dbscan(self.points, 50.0, 4)
+
+        self.assertEqual(dbscan(self.points, 50.0, 4), expected)
+        #small tiles, so clusters cross tile edges
+        self.assertEqual(dbscan(self.points, 50.0, 4, tile_cells=2), expected)
+
+        self.assertTrue(NOISE in expected)
+        self.assertTrue(max(expected) >= 4)
+
+    def testProcesses(self):
+        expected = dbscan(self.points, 50.0, 4)
+        self.assertEqual(dbscan(self.points, 50.0, 4, processes=2, tile_cells=4), expected)
+
+    def testArrays(self):
+        lats = [p.lat for p in self.points]
+        lngs = [p.lng for p in self.points]
+        self.assertEqual(dbscan_arrays(lats, lngs, 50.0, 4), dbscan(self.points, 50.0, 4))
+
+        self.assertEqual(dbscan_arrays([], [], 50.0), [])
+        self.assertRaises(ValueError, dbscan_arrays, [35.0], [], 50.0)
+
+    def testPolesAndSpacing(self):
+        points = [LatLng(89.9999, lng) for lng in range(-180, 180, 30)]
+        self.assertEqual(dbscan(points, 50.0, 3), [0] * len(points))
+
+        points = [LatLng(0.0, 10.0), LatLng(0.0, 10.0001), LatLng(0.0, 10.0002)]
+        self.assertEqual(dbscan(points, 15.0, 2), [0, 0, 0])
+        self.assertEqual(dbscan(points, 5.0, 2), [NOISE, NOISE, NOISE])
+
+    def testMixedLatitudes(self):
+        #rows of cells at different latitudes have different widths
+        rnd = random.Random(11)
+        north = LatLng(70.0, 20.0)
+        points = self.points + [north.apply_bearing_and_distance(rnd.uniform(0, 6.28), rnd.uniform(0, 300.0))
+                                for _ in range(150)]
+        expected = brute_force_dbscan(points, 50.0, 4)
+        self.assertEqual(dbscan(points, 50.0, 4), expected)
+        #border points next to two clusters may join either
+        labels = dbscan(points, 50.0, 4, tile_cells=2)
+        self.assertEqual([l == NOISE for l in labels], [l == NOISE for l in expected])
+
+        #a point far north does not change the cells elsewhere
+        merged, assignment = merge_points(self.points, 25.0)
+        self.assertEqual(merge_points(self.points + [LatLng(85.0, 0.0)], 25.0)[1][:-1], assignment)
+
+    def testMergePoints(self):
+        rnd = random.Random(3)
+        center = LatLng(35.78, -78.64)
+        points = [center.apply_bearing_and_distance(rnd.uniform(0, 6.28), rnd.uniform(0, 200.0)) for _ in range(500)]
+
+        merged, assignment = merge_points(points, 25.0)
+        self.assertEqual(len(assignment), len(points))
+        self.assertTrue(len(merged) < len(points) / 2)
+        self.assertEqual(assignment[0], 0)
+
+        for point, position in zip(points, assignment):
+            #the centroid is in the same cell as the point, cells are a little more than 25 m wide
+            self.assertTrue(point.distance_to(merged[position]) < 40.0)
+
+        #near the pole the cells span many times the tolerance
+        polar = [LatLng(89.999, 0.0).apply_bearing_and_distance(rnd.uniform(0, 6.28), rnd.uniform(0, 200.0))
+                 for _ in range(500)]
+        merged, assignment = merge_points(polar, 25.0)
+        firsts = {}
+        for point, position in zip(polar, assignment):
+            first = firsts.setdefault(position, point)
+            self.assertTrue(first.distance_to(point) <= 25.0)
+        for i, a in enumerate(polar[:100]):
+            for j, b in enumerate(polar[:100]):
+                if assignment[i] == assignment[j]:
+                    self.assertTrue(a.distance_to(b) <= 50.0)
+
+        merged, assignment = merge_points(points, 0.001)
+        self.assertEqual(len(merged), len(points))
+        self.assertEqual(assignment, range(len(points)))
+
+if __name__ == '__main__':
+    unittest.main()
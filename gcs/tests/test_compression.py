@@ -0,0 +1,97 @@
+import unittest
+import random
+
+from gcs import LatLng, GeoLine
+from gcs.compression import TraceCompressor, compress
+
+class TraceCompressorTestCase(unittest.TestCase):
+
+    def _trace(self, count=500, seed=1):
+        rnd = random.Random(seed)
+        bearing = 1.0
+        points = [LatLng(35.78, -78.64)]
+        for i in range(count - 1):
+            if i % 50 == 0:
+                bearing += rnd.uniform(-1.5, 1.5)
+            point = points[-1].apply_bearing_and_distance(bearing, 10.0)
+            points.append(point.apply_bearing_and_distance(rnd.uniform(0, 6.28), rnd.uniform(0, 1.0)))
+        return points
+
+    def _max_error(self, original, compressed):
+        lines = compressed.lines
+        return max(min(L.closest_point(p).distance_to(p) for L in lines) for p in original)
+
+    def testCompress(self):
+        trace = self._trace()
+        result = compress(trace, 5.0)
+
+        self.assertTrue(len(result) < len(trace) / 10)
+        self.assertEqual(result.first, trace[0])
+        self.assertEqual(result.last, trace[-1])
+        self.assertTrue(self._max_error(trace, result) <= 5.0 + 0.001)
+
+    def testIncremental(self):
+        trace = self._trace(200, 2)
+        compressor = TraceCompressor(3.0)
+
+        kept = []
+        for point in trace:
+            decided = compressor.push(point)
+            self.assertTrue(len(decided) <= 1)
+            kept.extend(decided)
+
+        self.assertEqual(list(compressor.polyline)[1:], kept)
+        result = compressor.finish()
+        self.assertEqual(result.last, trace[-1])
+
+    def testTimestamps(self):
+        #constant position with a long stop in the middle of a straight line
+        start = LatLng(35.0, -78.0)
+        trace = [start.apply_bearing_and_distance(1.57, i * 10.0) for i in range(10)]
+        times = range(10)
+        trace += [trace[-1]] * 30
+        times += range(10, 40)
+        trace += [trace[-1].apply_bearing_and_distance(1.57, i * 10.0) for i in range(1, 10)]
+        times += range(40, 49)
+
+        self.assertEqual(len(compress(trace, 5.0)), 2)
+
+        with_times = compress(trace, 5.0, times)
+        self.assertTrue(len(with_times) > 2)
+
+    def testMaxWindow(self):
+        trace = [LatLng(35.0, -78.0 + i * 0.0001) for i in range(100)]
+        compressor = TraceCompressor(5.0, max_window=10)
+        for point in trace:
+            compressor.push(point)
+        self.assertEqual(len(compressor.finish()), 11)
+
+    def testSinglePoint(self):
+        compressor = TraceCompressor(5.0)
+        self.assertEqual(compressor.finish(), None)
+
+        compressor.push(LatLng(35.0, -78.0), 10)
+        result = compressor.finish()
+        self.assertEqual(len(result), 2)
+        self.assertEqual(compressor.times, [10, 10])
+
+        compressor = TraceCompressor(5.0)
+        compressor.push(LatLng(35.0, -78.0))
+        self.assertEqual(len(compressor.finish()), 2)
+        self.assertEqual(compressor.times, [])
+
+    def testMixedTimestamps(self):
+        compressor = TraceCompressor(5.0)
+        compressor.push(LatLng(35.0, -78.0), 0)
+        self.assertRaises(ValueError, compressor.push, LatLng(35.0, -77.999))
+
+        compressor = TraceCompressor(5.0)
+        compressor.push(LatLng(35.0, -78.0))
+        self.assertRaises(ValueError, compressor.push, LatLng(35.0, -77.999), 10)
+
+        #the rejected point was not taken in
+        compressor.push(LatLng(35.0, -77.999))
+        self.assertEqual(len(compressor.finish()), 2)
+
+if __name__ == '__main__':
+    unittest.main()
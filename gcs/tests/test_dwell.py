@@ -0,0 +1,85 @@
+import unittest
+import random
+
+from math import log
+
+from gcs import LatLng, Polyline
+from gcs.dwell import detect_dwells
+from gcs.trajectory import Trajectory
+
+class DwellTestCase(unittest.TestCase):
+
+    def setUp(self):
+        rnd = random.Random(4)
+        self.stop = LatLng(35.78, -78.64)
+
+        points = []
+        #drive to the stop at 10 m/s
+        for i in range(60, 0, -1):
+            points.append(self.stop.apply_bearing_and_distance(0.3, i * 10.0))
+        #wait 5 minutes with a few meters of GPS noise
+        for _ in range(300):
+            points.append(self.stop.apply_bearing_and_distance(rnd.uniform(0, 6.28), rnd.uniform(0, 6.0)))
+        #drive off, then a short 20 second pause
+        for i in range(1, 61):
+            points.append(self.stop.apply_bearing_and_distance(2.0, i * 10.0))
+        for _ in range(20):
+            points.append(points[-1])
+        for i in range(1, 11):
+            points.append(points[-1].apply_bearing_and_distance(2.0, 10.0))
+
+        self.points = points
+
+    def testDwells(self):
+        dwells = detect_dwells(self.points, 15.0, 60)
+
+        self.assertEqual(len(dwells), 1)
+        dwell = dwells[0]
+
+        self.assertTrue(abs(dwell.start_index - 60) <= 2)
+        self.assertTrue(abs(dwell.end_index - 359) <= 2)
+        self.assertTrue(abs(dwell.duration - 300) <= 4)
+        self.assertTrue(dwell.centroid.distance_to(self.stop) < 3.0)
+
+        self.assertEqual(len(detect_dwells(self.points, 15.0, 10)), 2)
+
+        #Polyline drops the repeated points of the short pause
+        self.assertEqual(len(detect_dwells(Polyline(self.points), 15.0, 10)), 1)
+
+    def testTrajectory(self):
+        times = [1000.0 + i * 2 for i in range(len(self.points))]
+        trajectory = Trajectory.from_latlngs(self.points, times)
+
+        dwells = detect_dwells(trajectory, 15.0, 120)
+        self.assertEqual(len(dwells), 1)
+        self.assertTrue(abs(dwells[0].duration - 600) <= 8)
+        self.assertTrue(dwells[0].start_time > 1000.0)
+
+    def testOutliers(self):
+        points = list(self.points)
+        points[200] = self.stop.apply_bearing_and_distance(1.0, 200.0)
+
+        self.assertEqual(len(detect_dwells(points, 15.0, 200)), 0)
+        self.assertEqual(len(detect_dwells(points, 15.0, 200, max_outliers=2)), 1)
+
+    def testOutliersStartNextDwell(self):
+        other = self.stop.apply_bearing_and_distance(1.0, 500.0)
+        points = [self.stop] * 100 + [other] * 100
+
+        dwells = detect_dwells(points, 15.0, 50, max_outliers=3)
+        self.assertEqual([(d.start_index, d.end_index) for d in dwells], [(0, 99), (100, 199)])
+        self.assertEqual(dwells[1].centroid, other)
+
+    def testSlowDrift(self):
+        #creeping slower and slower, each sample is close to the centroid of
+        #the ones before but the trace moves on by 100 m
+        points = [self.stop.apply_bearing_and_distance(1.0, 14.0 * log(k + 1)) for k in range(2000)]
+
+        dwells = detect_dwells(points, 15.0, 60)
+        self.assertTrue(len(dwells) > 1)
+        for dwell in dwells:
+            for point in points[dwell.start_index:dwell.end_index + 1]:
+                self.assertTrue(point.distance_to(dwell.centroid) <= 15.0 + 1e-6)
+
+if __name__ == '__main__':
+    unittest.main()
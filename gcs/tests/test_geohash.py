@@ -0,0 +1,75 @@
+import unittest
+import random
+
+from gcs import LatLng
+from gcs import geohash
+
+class GeohashTestCase(unittest.TestCase):
+
+    def testEncode(self):
+        self.assertEqual(geohash.encode(57.64911, 10.40744, 11), 'u4pruydqqvj')
+        self.assertEqual(LatLng(57.64911, 10.40744).geohash(5), 'u4pru')
+
+        center = geohash.decode('u4pruydqqvj')
+        self.assertAlmostEqual(center.lat, 57.64911, 5)
+        self.assertAlmostEqual(center.lng, 10.40744, 5)
+
+        cell = geohash.bounds('u4pru')
+        self.assertTrue(cell.contains(LatLng(57.64911, 10.40744)))
+
+    def testPrefix(self):
+        point = LatLng(35.7796, -78.6382)
+        self.assertTrue(point.geohash(9).startswith(point.geohash(4)))
+        self.assertEqual(point.morton(10) >> 2, point.morton(9))
+
+    def testNeighbors(self):
+        neighbors = geohash.neighbors('dnrgr')
+        self.assertEqual(len(neighbors), 8)
+        self.assertEqual(len(set(neighbors)), 8)
+
+        cell = geohash.bounds('dnrgr')
+        for neighbor in neighbors:
+            other = geohash.bounds(neighbor)
+            self.assertTrue(cell.intersects(other))
+            self.assertNotEqual(neighbor, 'dnrgr')
+
+        #cells touching the north pole have no northern neighbors
+        self.assertEqual(len(geohash.neighbors('z')), 5)
+
+    def testCellsWithin(self):
+        point = LatLng(35.7796, -78.6382)
+        cells = geohash.cells_within(point, 500.0, 7)
+
+        self.assertTrue(point.geohash(7) in cells)
+
+        rnd = random.Random(3)
+        for _ in range(200):
+            other = point.apply_bearing_and_distance(rnd.uniform(0, 6.28), rnd.uniform(0, 499.0))
+            self.assertTrue(other.geohash(7) in cells)
+
+    def testCellsWithinAntimeridian(self):
+        for lng in (179.9999, -179.9999):
+            point = LatLng(10.0, lng)
+            cells = geohash.cells_within(point, 500.0, 6)
+
+            self.assertTrue(point.geohash(6) in cells)
+            self.assertTrue(geohash.encode(10.0, -lng, 6) in cells)
+            self.assertEqual(len(cells), len(set(cells)))
+
+            rnd = random.Random(4)
+            for _ in range(200):
+                other = point.apply_bearing_and_distance(rnd.uniform(0, 6.28), rnd.uniform(0, 499.0))
+                self.assertTrue(other.geohash(6) in cells)
+
+    def testEncodeMany(self):
+        rnd = random.Random(5)
+        lats = [rnd.uniform(-90, 90) for _ in range(100)]
+        lngs = [rnd.uniform(-180, 180) for _ in range(100)]
+
+        self.assertEqual(geohash.encode_many(lats, lngs, 8),
+                         [geohash.encode(lat, lng, 8) for lat, lng in zip(lats, lngs)])
+        self.assertEqual([int(code) for code in geohash.morton_many(lats, lngs, 32)],
+                         [geohash.morton(lat, lng, 32) for lat, lng in zip(lats, lngs)])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,4 +1,5 @@
 import unittest
+import random
 
 from gcs import LatLng, GeoLine
 
@@ -13,6 +14,24 @@ class GelLineTestCase(unittest.TestCase):
         bc = GeoLine(b, c)
         
         self.assertEqual(ab.angle_to(bc), bc.angle_to(ab))            
+    
+    def testBounds(self):
+        #the arc between two points on the same parallel bows towards the pole
+        line = GeoLine(LatLng(45.0, 0.0), LatLng(45.0, 90.0))
+        self.assertTrue(line.bounds.north > line.point_at_distance(line.distance / 2).lat - 1e-9)
+        self.assertTrue(line.bounds.north > 50.0)
+        self.assertEqual(GeoLine(LatLng(-45.0, 0.0), LatLng(-45.0, 90.0)).bounds.south, -line.bounds.north)
+        
+        rnd = random.Random(3)
+        for _ in range(100):
+            line = GeoLine(LatLng(rnd.uniform(-80, 80), rnd.uniform(-180, 180)), 
+                           LatLng(rnd.uniform(-80, 80), rnd.uniform(-180, 180)))
+            bounds = line.bounds.buffer(0.01)
+            for i in range(21):
+                point = line.point_at_distance(line.distance * i / 20)
+                lng = (point.lng + 180.0) % 360.0 - 180.0
+                self.assertTrue(bounds.south <= point.lat <= bounds.north)
+                self.assertTrue(bounds.west <= lng <= bounds.east)
 
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
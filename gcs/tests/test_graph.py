@@ -0,0 +1,134 @@
+import unittest
+import random
+
+from math import radians
+
+from gcs import LatLng, Polyline, GeoLine
+from gcs.graph import Graph
+
+def grid_network(size=6, spacing=200.0):
+    '''Streets running east and north, crossing between their points.'''
+    origin = LatLng(35.0, -78.0)
+    streets = []
+    for k in range(size):
+        west = origin.apply_bearing_and_distance(0.0, k * spacing + spacing / 2)
+        streets.append(Polyline([west.apply_bearing_and_distance(radians(90), i * spacing) for i in range(size)]))
+        south = origin.apply_bearing_and_distance(radians(90), k * spacing + spacing / 2)
+        streets.append(Polyline([south.apply_bearing_and_distance(0.0, i * spacing) for i in range(size)]))
+    return streets
+
+def brute_force(graph, source):
+    '''Bellman-Ford distances from source.'''
+    distances = [None] * len(graph)
+    distances[source] = 0.0
+    for _ in range(len(graph)):
+        changed = False
+        for i in range(len(graph)):
+            if distances[i] is None:
+                continue
+            for j, weight in graph.neighbors(i):
+                if distances[j] is None or distances[i] + weight < distances[j] - 1e-9:
+                    distances[j] = distances[i] + weight
+                    changed = True
+        if not changed:
+            break
+    return distances
+
+class GraphTestCase(unittest.TestCase):
+
+    def testMerge(self):
+        a = LatLng(35.0, -78.0)
+        b = a.apply_bearing_and_distance(radians(90), 100.0)
+        c = b.apply_bearing_and_distance(0.0, 100.0)
+        near_b = b.apply_bearing_and_distance(0.0, 0.5)
+
+        graph = Graph([Polyline(a, b), Polyline(near_b, c)])
+        self.assertEqual(len(graph), 3)
+        self.assertEqual(graph.edge_count, 4)
+        self.assertEqual(sorted(n for n, _ in graph.neighbors(1)), [0, 2])
+
+        graph = Graph([Polyline(a, b), Polyline(near_b, c)], tolerance=0.1)
+        self.assertEqual(len(graph), 4)
+
+    def testIntersections(self):
+        streets = grid_network(4)
+        graph = Graph(streets)
+        #the streets overhang each other by half a block, 3 by 3 of them
+        #cross, plus the 4 points of each of the 8 streets
+        self.assertEqual(len(graph), 9 + 32)
+
+        graph = Graph(streets, split_at_intersections=False)
+        self.assertEqual(len(graph), 32)
+        self.assertEqual(graph.astar(0, 4), None)
+
+    def testShortestPaths(self):
+        graph = Graph(grid_network())
+        random.seed(4)
+        for _ in range(10):
+            source = random.randrange(len(graph))
+            expected = brute_force(graph, source)
+            for target in random.sample(range(len(graph)), 10):
+                dijkstra = graph.dijkstra(source, target)
+                astar = graph.astar(source, target)
+                if expected[target] is None:
+                    self.assertEqual(dijkstra, None)
+                    self.assertEqual(astar, None)
+                    continue
+
+                self.assertAlmostEqual(dijkstra[0], expected[target], 6)
+                self.assertAlmostEqual(astar[0], expected[target], 6)
+                self.assertEqual(astar[1][0], source)
+                self.assertEqual(astar[1][-1], target)
+                length = sum(graph.weight(i, j) for i, j in zip(astar[1], astar[1][1:]))
+                self.assertAlmostEqual(length, astar[0], 6)
+
+    def testShortestPath(self):
+        start = LatLng(35.0, -78.0)
+        east = Polyline([start.apply_bearing_and_distance(radians(90), i * 100.0) for i in range(11)])
+        north = Polyline([start.apply_bearing_and_distance(radians(90), 450.0).apply_bearing_and_distance(0.0, i * 100.0)
+                          for i in range(-3, 4)])
+        graph = Graph([east, north])
+
+        origin = start.apply_bearing_and_distance(radians(90), 120.0).apply_bearing_and_distance(0.0, 10.0)
+        destination = north[-1]
+        distance, path = graph.shortest_path(origin, destination)
+        self.assertAlmostEqual(distance, 330.0 + 300.0, 0)
+        self.assertAlmostEqual(path.distance, distance, 0)
+        self.assertAlmostEqual(path[0].distance_to(origin), 10.0, 1)
+        self.assertEqual(path[-1], destination)
+
+        #both points on the same edge
+        distance, path = graph.shortest_path(east[3], east[3].apply_bearing_and_distance(radians(90), 50.0))
+        self.assertAlmostEqual(distance, 50.0, 1)
+        self.assertEqual(len(path), 2)
+
+    def testDirected(self):
+        start = LatLng(35.0, -78.0)
+        east = Polyline([start.apply_bearing_and_distance(radians(90), i * 100.0) for i in range(5)])
+        graph = Graph([east], directed=True)
+
+        self.assertAlmostEqual(graph.astar(0, 4)[0], 400.0, 6)
+        self.assertEqual(graph.astar(4, 0), None)
+        self.assertEqual(graph.shortest_path(east[3], east[1]), None)
+        self.assertAlmostEqual(graph.shortest_path(east[1], east[3])[0], 200.0, 1)
+
+    def testNearestNode(self):
+        graph = Graph(grid_network(3))
+        for i in range(len(graph)):
+            point = graph.node(i).apply_bearing_and_distance(0.3, 5.0)
+            self.assertEqual(graph.nearest_node(point), i)
+
+    def testSnapLongEdges(self):
+        #edges thousands of kilometers long bow beyond their nodes
+        rnd = random.Random(9)
+        shapes = [Polyline([LatLng(rnd.uniform(-70, 70), rnd.uniform(-170, 170)) for _ in range(4)]) for _ in range(15)]
+        graph = Graph(shapes, split_at_intersections=False)
+
+        edges = [(i, j) for i in range(len(graph)) for j, _ in graph.neighbors(i) if i < j]
+        for _ in range(100):
+            point = LatLng(rnd.uniform(-80, 80), rnd.uniform(-180, 180))
+            expected = min(point.distance_to(GeoLine(graph.node(i), graph.node(j)).closest_point(point)) for i, j in edges)
+            self.assertAlmostEqual(graph.snap(point).distance_from_initial, expected, 6)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,98 @@
+import unittest
+import os
+import shutil
+import tempfile
+import zipfile
+
+from StringIO import StringIO
+
+from gcs import LatLng, Polyline
+from gcs.encoders.google_polyline import decode_polyline, encode_polyline
+from gcs import gtfs
+
+SHAPES = '''\xef\xbb\xbfshape_id,shape_pt_lat,shape_pt_lon,shape_pt_sequence,shape_dist_traveled
+a,35.0,-78.0,1,
+a,35.0,-78.001,2,
+a,35.0,-78.001,3,
+b,36.0,-79.0,10,
+b,36.002,-79.0,30,
+a,35.0,-78.002,4,
+b,36.001,-79.0,20,
+'''
+
+STOPS = '''stop_id,stop_name,stop_lat,stop_lon,location_type
+s1,First,35.0,-78.0005,0
+s2,Second,36.0015,-79.0001,0
+n1,Node,,,3
+'''
+
+class GtfsTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+        self.feed = os.path.join(self.directory, 'feed')
+        os.mkdir(self.feed)
+        with open(os.path.join(self.feed, 'shapes.txt'), 'wb') as f:
+            f.write(SHAPES)
+        with open(os.path.join(self.feed, 'stops.txt'), 'wb') as f:
+            f.write(STOPS)
+
+        self.zipped = os.path.join(self.directory, 'feed.zip')
+        with zipfile.ZipFile(self.zipped, 'w') as archive:
+            archive.writestr('shapes.txt', SHAPES)
+            archive.writestr('stops.txt', STOPS)
+
+        self.expected = {'a': Polyline(LatLng(35.0, -78.0), LatLng(35.0, -78.001), LatLng(35.0, -78.002)),
+                         'b': Polyline(LatLng(36.0, -79.0), LatLng(36.001, -79.0), LatLng(36.002, -79.0))}
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def testReadShapes(self):
+        shapes = gtfs.read_shapes(StringIO(SHAPES))
+        self.assertEqual(shapes, self.expected)
+
+        encoded = gtfs.read_shapes(StringIO(SHAPES), encoded=True)
+        self.assertEqual(encoded['b'], encode_polyline(self.expected['b']))
+
+        self.assertRaises(ValueError, gtfs.read_shapes, StringIO('shape_id,shape_pt_lat\na,35.0\n'))
+
+    def testFromArrays(self):
+        poly = Polyline.from_arrays([35.0, 35.0, 35.0, 36.0], [-78.0, -78.0, -78.5, -78.5])
+        self.assertEqual(poly, Polyline((35.0, -78.0), (35.0, -78.5), (36.0, -78.5)))
+        self.assertEqual(len(Polyline.from_arrays([35.0], [-78.0])), 2)
+        self.assertRaises(TypeError, Polyline.from_arrays, [], [])
+
+    def testReadStops(self):
+        stops = gtfs.read_stops(StringIO(STOPS))
+        self.assertEqual(stops, {'s1': LatLng(35.0, -78.0005), 's2': LatLng(36.0015, -79.0001)})
+
+    def testLoadFeeds(self):
+        feed = gtfs.load_feed(self.feed)
+        self.assertEqual(feed.shapes, self.expected)
+        self.assertEqual(len(feed.stops), 2)
+
+        for feeds in (gtfs.load_feeds([self.feed, self.zipped]),
+                      gtfs.load_feeds([self.feed, self.zipped], processes=2)):
+            self.assertEqual([f.path for f in feeds], [self.feed, self.zipped])
+            for f in feeds:
+                self.assertEqual(f.shapes, self.expected)
+                self.assertEqual(f.stops, feed.stops)
+
+        feeds = gtfs.load_feeds([self.zipped], encoded=True)
+        self.assertEqual(decode_polyline(feeds[0].shapes['a']), self.expected['a'])
+
+    def testWriteEncodedShapes(self):
+        output = StringIO()
+        gtfs.write_encoded_shapes(self.expected, output)
+
+        lines = output.getvalue().splitlines()
+        self.assertEqual(lines[0], 'shape_id,encoded_polyline')
+        self.assertEqual(len(lines), 3)
+        shape_id, encoded = lines[2].split(',', 1)
+        self.assertEqual(shape_id, 'b')
+        self.assertEqual(decode_polyline(encoded), self.expected['b'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,159 @@
+import unittest
+import random
+
+from gcs import LatLng, LatLngBounds, Polyline
+from gcs import index as index_module
+from gcs.index import BoundsIndex, PolylineIndex, PointIndex, Grid
+
+def random_bounds(rnd, count):
+    result = []
+    for _ in range(count):
+        lat = rnd.uniform(35.7, 35.9)
+        lng = rnd.uniform(-78.8, -78.6)
+        result.append(LatLng(lat, lng).buffer(rnd.uniform(10.0, 500.0)))
+    return result
+
+class BoundsIndexTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.rnd = random.Random(1)
+        self.bounds = random_bounds(self.rnd, 500)
+
+    def _indexes(self):
+        yield BoundsIndex(self.bounds, use_numpy=False)
+
+        try:
+            yield BoundsIndex(self.bounds, use_numpy=True)
+        except ImportError:
+            pass
+
+    def testIntersects(self):
+        area = LatLngBounds(LatLng(35.75, -78.75), LatLng(35.8, -78.7))
+        expected = sorted(i for i, b in enumerate(self.bounds) if b.intersects(area))
+
+        for index in self._indexes():
+            self.assertEqual(sorted(index.intersects(area)), expected)
+
+    def testWithinDistance(self):
+        point = LatLng(35.8, -78.7)
+        expected = sorted(i for i, b in enumerate(self.bounds) if b.distance_to(point) <= 1000.0)
+
+        for index in self._indexes():
+            self.assertEqual(sorted(index.within_distance(point, 1000.0)), expected)
+
+    def testNearest(self):
+        point = LatLng(35.81, -78.71)
+        expected = sorted(range(len(self.bounds)), key=lambda i: self.bounds[i].distance_to(point))
+
+        for index in self._indexes():
+            distances = [d for d, _ in index.iter_nearest(point)]
+            self.assertEqual(distances, sorted(distances))
+            self.assertEqual(len(distances), len(self.bounds))
+
+            nearest = index.nearest(point, 5)
+            self.assertEqual([self.bounds[i].distance_to(point) for i in nearest],
+                             [self.bounds[i].distance_to(point) for i in expected[:5]])
+
+    def testLowerBounds(self):
+        #continent sized bounds, the lower bounds match LatLngBounds.distance_to
+        rnd = random.Random(6)
+        bounds = [LatLng(rnd.uniform(-60, 60), rnd.uniform(-170, 170)).buffer(rnd.uniform(1e4, 2e6)) for _ in range(100)]
+        point = LatLng(50.0, 10.0)
+        expected = [b.distance_to(point) for b in bounds]
+
+        scalar = [index_module._lower_bound(point.lat, point.lng, b.south, b.west, b.north, b.east) for b in bounds]
+        for a, b in zip(scalar, expected):
+            self.assertAlmostEqual(a, b, 6)
+
+        if index_module.numpy is not None:
+            numpy = index_module.numpy
+            edges = [numpy.array([getattr(b, edge) for b in bounds]) for edge in ('south', 'west', 'north', 'east')]
+            for a, b in zip(index_module._lower_bounds_numpy(point.lat, point.lng, *edges), expected):
+                self.assertAlmostEqual(a, b, 6)
+
+    def testEmpty(self):
+        index = BoundsIndex([])
+        self.assertEqual(index.intersects(LatLng(0, 0).buffer(10)), [])
+        self.assertEqual(index.nearest(LatLng(0, 0)), [])
+
+class PolylineIndexTestCase(unittest.TestCase):
+
+    def testPolylines(self):
+        routes = {
+            'north': Polyline(LatLng(35.80, -78.70), LatLng(35.80, -78.60)),
+            'south': Polyline(LatLng(35.70, -78.70), LatLng(35.70, -78.60)),
+            'diagonal': Polyline(LatLng(35.70, -78.70), LatLng(35.75, -78.65), LatLng(35.80, -78.60)),
+        }
+        keys = sorted(routes)
+        index = PolylineIndex([routes[k] for k in keys], keys)
+
+        point = LatLng(35.8005, -78.65)
+        self.assertEqual(index.within_distance(point, 100.0), ['north'])
+        self.assertEqual(index.nearest(point, 2), ['north', 'diagonal'])
+        self.assertEqual(sorted(index.contains(LatLng(35.72, -78.68))), ['diagonal'])
+
+class PointIndexTestCase(unittest.TestCase):
+
+    def setUp(self):
+        rnd = random.Random(2)
+        self.points = [LatLng(rnd.uniform(35.7, 35.9), rnd.uniform(-78.8, -78.6)) for _ in range(1000)]
+        self.index = PointIndex(self.points)
+        self.query = LatLng(35.8, -78.7)
+
+    def testNearest(self):
+        expected = sorted(range(len(self.points)), key=lambda i: self.query.distance_to(self.points[i]))
+        self.assertEqual(self.index.nearest(self.query, 10), expected[:10])
+
+        distances = [d for d, _ in self.index.iter_nearest(self.query)]
+        self.assertEqual(len(distances), len(self.points))
+        self.assertAlmostEqual(distances[0], self.query.distance_to(self.points[expected[0]]), 4)
+        self.assertEqual(distances, sorted(distances))
+
+    def testWithin(self):
+        expected = sorted(i for i, p in enumerate(self.points) if self.query.distance_to(p) <= 2000.0)
+        found = self.index.within(self.query, 2000.0)
+
+        self.assertEqual(sorted(i for _, i in found), expected)
+        for distance, i in found:
+            self.assertAlmostEqual(distance, self.query.distance_to(self.points[i]), 4)
+
+    def testFromArrays(self):
+        index = PointIndex.from_arrays([p.lat for p in self.points], [p.lng for p in self.points])
+        self.assertEqual(index.nearest_many([self.query, self.points[5]], 1),
+                         [self.index.nearest(self.query), [5]])
+        self.assertEqual(len(index.within_many([self.query], 500.0)), 1)
+
+    def testPolylineClosestVertex(self):
+        poly = Polyline(self.points)
+        expected = poly.closest_vertex(self.query)
+
+        poly.vertex_index
+        self.assertEqual(poly.closest_vertex(self.query), expected)
+
+class GridTestCase(unittest.TestCase):
+
+    def testNeighbors(self):
+        rnd = random.Random(5)
+        points = []
+        for lat in (0.0, 35.0, 70.0, 89.99):
+            center = LatLng(lat, 20.0)
+            points.extend(center.apply_bearing_and_distance(rnd.uniform(0, 6.28), rnd.uniform(0, 500.0))
+                          for _ in range(100))
+
+        grid = Grid(100.0)
+        cells = grid.bucket([p.lat for p in points], [p.lng for p in points])
+        for i, point in enumerate(points):
+            found = set(j for members in grid.neighbors(cells, point.lat, point.lng) for j in members)
+            expected = set(j for j, other in enumerate(points) if point.distance_to(other) <= 100.0)
+            self.assertTrue(expected <= found)
+
+    def testWidths(self):
+        grid = Grid(100.0)
+        #cells span more degrees farther from the equator, and wrap
+        #the whole world next to the poles
+        self.assertTrue(grid.width(grid.row(0.0)) < grid.width(grid.row(60.0)))
+        self.assertEqual(grid.width(grid.row(89.999)), 360.0)
+        self.assertEqual(grid.width(grid.row(-30.0)), grid.width(-grid.row(30.0) - 1))
+
+if __name__ == '__main__':
+    unittest.main()
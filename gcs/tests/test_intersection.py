@@ -0,0 +1,110 @@
+import unittest
+import random
+
+from math import radians
+
+from gcs import LatLng, Polyline
+from gcs.intersection import intersections, self_intersections
+
+def brute_force(polylines):
+    from gcs.intersection import _cross
+    result = []
+    for shape_a, a in enumerate(polylines):
+        for shape_b, b in enumerate(polylines):
+            if shape_b < shape_a:
+                continue
+            for i, A in enumerate(a.lines):
+                for j, B in enumerate(b.lines):
+                    if shape_a == shape_b and j - i < 2:
+                        continue
+                    if _cross(A.start.lat, A.start.lng, A.end.lat, A.end.lng,
+                              B.start.lat, B.start.lng, B.end.lat, B.end.lng):
+                        result.append((shape_a, i, shape_b, j))
+    return sorted(result)
+
+class IntersectionTestCase(unittest.TestCase):
+
+    def testCrossing(self):
+        start = LatLng(35.0, -78.0)
+        east = Polyline([start.apply_bearing_and_distance(radians(90), i * 100.0) for i in range(11)])
+        north = Polyline([start.apply_bearing_and_distance(radians(90), 450.0).apply_bearing_and_distance(0.0, i * 100.0)
+                          for i in range(-3, 4)])
+
+        result = intersections([east, north])
+        self.assertEqual(len(result), 1)
+
+        crossing = result[0]
+        self.assertEqual((crossing.shape_a, crossing.segment_a), (0, 4))
+        self.assertEqual((crossing.shape_b, crossing.segment_b), (1, 2))
+        self.assertAlmostEqual(crossing.measure_a, 450.0, 0)
+        self.assertAlmostEqual(crossing.measure_b, 300.0, 0)
+        self.assertTrue(crossing.point.distance_to(start.apply_bearing_and_distance(radians(90), 450.0)) < 1.0)
+
+    def testAtVertex(self):
+        a = Polyline((35.0, -78.0), (35.0, -77.99), (35.0, -77.98))
+        b = Polyline((34.99, -77.99), (35.0, -77.99), (35.01, -77.99))
+        result = intersections([a, b])
+        self.assertEqual(len(result), 1)
+        self.assertEqual(result[0].point, LatLng(35.0, -77.99))
+        self.assertEqual((result[0].segment_a, result[0].segment_b), (0, 0))
+
+        #only a's vertex is on the crossing, whatever the size of the cells
+        b = Polyline((34.99, -77.99), (35.01, -77.99))
+        for cell_size in (None, 1.0, 100.0, 5000.0):
+            result = intersections([a, b], cell_size)
+            self.assertEqual(len(result), 1)
+            self.assertEqual((result[0].segment_a, result[0].segment_b), (0, 0))
+            self.assertEqual(result[0].point, LatLng(35.0, -77.99))
+            self.assertEqual(result[0].measure_a, a.measures[1])
+
+    def testRevisitedPoint(self):
+        #b goes through the middle of a twice, at the same vertex
+        a = Polyline((35.0, -78.0), (35.0, -77.98))
+        b = Polyline((34.99, -77.99), (35.0, -77.99), (35.01, -77.99), (35.01, -77.985), (35.0, -77.99),
+                     (34.99, -77.995))
+        result = intersections([a, b], include_self=False)
+        self.assertEqual([(x.segment_a, x.segment_b) for x in result], [(0, 0), (0, 3)])
+
+        #and crosses itself there once
+        result = self_intersections(b)
+        self.assertEqual(len(result), 1)
+        self.assertEqual(result[0].point, LatLng(35.0, -77.99))
+
+    def testSelfIntersections(self):
+        #a figure eight crosses itself once, a closed square does not
+        eight = Polyline((0.0, 0.0), (0.01, 0.01), (0.01, 0.0), (0.0, 0.01), (0.0, 0.0))
+        self.assertEqual(len(self_intersections(eight)), 1)
+
+        square = Polyline((0.0, 0.0), (0.0, 0.01), (0.01, 0.01), (0.01, 0.0), (0.0, 0.0))
+        self.assertEqual(self_intersections(square), [])
+        self.assertEqual(intersections([eight], include_self=False), [])
+
+    def testAntimeridian(self):
+        a = Polyline((0.0, 179.99), (0.0, -179.99))
+        b = Polyline((-0.01, 180.0), (0.01, 180.0))
+        self.assertEqual(len(intersections([a, b])), 1)
+
+    def testMatchesBruteForce(self):
+        rnd = random.Random(9)
+        polylines = []
+        for _ in range(6):
+            point = LatLng(35.78, -78.64).apply_bearing_and_distance(rnd.uniform(0, 6.28), rnd.uniform(0, 500.0))
+            points = [point]
+            for _ in range(40):
+                points.append(points[-1].apply_bearing_and_distance(rnd.uniform(0, 6.28), rnd.uniform(20.0, 150.0)))
+            polylines.append(Polyline(points))
+
+        expected = brute_force(polylines)
+        self.assertTrue(len(expected) > 20)
+
+        for cell_size in (None, 10.0, 5000.0):
+            result = intersections(polylines, cell_size)
+            self.assertEqual(sorted((x.shape_a, x.segment_a, x.shape_b, x.segment_b) for x in result), expected)
+
+        #a shape far north has cells of its own width
+        north = Polyline((85.0, 10.0), (85.01, 10.2), (85.0, 10.4))
+        result = intersections(polylines + [north], 10.0)
+        self.assertEqual(sorted((x.shape_a, x.segment_a, x.shape_b, x.segment_b) for x in result), expected)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,79 @@
+import unittest
+import random
+
+from gcs import LatLng, LatLngBounds
+
+class LatLngBoundsTestCase(unittest.TestCase):
+
+    def testBuffer(self):
+        distance_m = 500.0
+
+        bounds = LatLngBounds(LatLng(35.78, -78.67), LatLng(35.79, -78.66))
+        buffered = bounds.buffer(distance_m)
+
+        self.assertTrue(buffered.south < bounds.south)
+        self.assertTrue(buffered.north > bounds.north)
+
+        self.assertAlmostEqual(LatLng(bounds.south, bounds.west).distance_to(LatLng(buffered.south, bounds.west)), distance_m, 3)
+
+        #the buffer must be at least distance_m wide even along the northern edge
+        north_pad = LatLng(buffered.north, buffered.west).distance_to(LatLng(buffered.north, bounds.west))
+        self.assertTrue(north_pad >= distance_m - 0.001)
+
+        #the original bounds are left untouched
+        self.assertAlmostEqual(bounds.north, 35.79)
+
+    def testIntersects(self):
+        a = LatLngBounds(LatLng(0, 0), LatLng(2, 2))
+        b = LatLngBounds(LatLng(1, 1), LatLng(3, 3))
+        c = LatLngBounds(LatLng(5, 5), LatLng(6, 6))
+
+        self.assertTrue(a.intersects(b))
+        self.assertTrue(b.intersects(a))
+        self.assertFalse(a.intersects(c))
+
+        shared = a.intersection(b)
+        self.assertEqual(shared, LatLngBounds(LatLng(1, 1), LatLng(2, 2)))
+        self.assertEqual(a.intersection(c), None)
+
+    def testContainsMany(self):
+        bounds = LatLngBounds(LatLng(0, 0), LatLng(2, 2))
+
+        lats = [1, 3, 0, -1]
+        lngs = [1, 1, 2, 1]
+
+        mask = bounds.contains_many(lats, lngs)
+        self.assertEqual([bool(m) for m in mask], [True, False, True, False])
+        self.assertEqual(list(mask), [bounds.contains(LatLng(y, x)) for y, x in zip(lats, lngs)])
+
+    def testDistanceTo(self):
+        rnd = random.Random(2)
+        for _ in range(200):
+            south = rnd.uniform(-80.0, 60.0)
+            west = rnd.uniform(-180.0, 120.0)
+            north = min(south + rnd.uniform(0.1, 40.0), 90.0)
+            east = min(west + rnd.uniform(0.1, 60.0), 180.0)
+            bounds = LatLngBounds(LatLng(south, west), LatLng(north, east))
+            point = LatLng(rnd.uniform(-89.0, 89.0), rnd.uniform(-180.0, 180.0))
+
+            #the closest of a dense sample of the bounds is at least as far
+            #as the closest point of the bounds
+            steps = 40
+            closest = min(point.distance_to(LatLng(south + (north - south) * i / steps, west + (east - west) * j / steps))
+                          for i in range(steps + 1) for j in range(steps + 1))
+            self.assertTrue(bounds.distance_to(point) <= closest + 1e-6)
+
+            if bounds.contains(point):
+                self.assertEqual(bounds.distance_to(point), 0.0)
+
+        #on the same parallel the shortest path bows towards the pole
+        bounds = LatLngBounds(LatLng(45.0, 90.0), LatLng(46.0, 91.0))
+        self.assertTrue(bounds.distance_to(LatLng(45.0, 0.0)) <= LatLng(45.0, 0.0).distance_to(LatLng(45.0, 90.0)))
+
+        #the shorter way around the antimeridian
+        bounds = LatLngBounds(LatLng(0.0, 170.0), LatLng(1.0, 179.0))
+        distance = LatLng(0.0, -179.0).distance_to(LatLng(0.0, 179.0))
+        self.assertTrue(0.99 * distance <= bounds.distance_to(LatLng(0.0, -179.0)) <= distance)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,137 @@
+import unittest
+import random
+
+from gcs import LatLng, Polyline
+from gcs import lod as lod_module
+from gcs.encoders.google_polyline import encode_polyline
+from gcs.json import GcsJSONEncoder
+from gcs.lod import LODPyramid, tolerance_for_zoom
+
+def random_walk(count, seed=1):
+    rnd = random.Random(seed)
+    bearing = 0.0
+    points = [LatLng(35.78, -78.64)]
+    for _ in range(count - 1):
+        bearing += rnd.uniform(-0.6, 0.6)
+        points.append(points[-1].apply_bearing_and_distance(bearing, rnd.uniform(5.0, 50.0)))
+    return Polyline(points)
+
+def douglas_peucker(polyline, tolerance):
+    '''Positions of the points kept by a plain recursive Douglas-Peucker with
+    the same flat distances as the pyramid.'''
+    raw = _RawDistances(polyline)
+    kept = set([0, len(polyline) - 1])
+
+    def simplify(i, j):
+        if j - i < 2:
+            return
+        k = max(range(i + 1, j), key=lambda k: raw[i, j][k])
+        if raw[i, j][k] > tolerance:
+            kept.add(k)
+            simplify(i, k)
+            simplify(k, j)
+
+    simplify(0, len(polyline) - 1)
+    return sorted(kept)
+
+class _RawDistances(object):
+    '''Flat distance of each point to the segment between two points.'''
+
+    def __init__(self, polyline):
+        from math import cos, radians
+        from gcs.constants import ARCDEGREE_LAT_LENGTH
+
+        points = list(polyline)
+        lat0 = sum(p.lat for p in points) / len(points)
+        scale = cos(radians(lat0))
+        self.xs = [(p.lng - points[0].lng) * scale * ARCDEGREE_LAT_LENGTH for p in points]
+        self.ys = [(p.lat - lat0) * ARCDEGREE_LAT_LENGTH for p in points]
+
+    def __getitem__(self, pair):
+        i, j = pair
+        xs, ys = self.xs, self.ys
+        dx = xs[j] - xs[i]
+        dy = ys[j] - ys[i]
+        length2 = dx * dx + dy * dy
+
+        result = {}
+        for k in range(i + 1, j):
+            px = xs[k] - xs[i]
+            py = ys[k] - ys[i]
+            if length2 > 0:
+                t = min(max((px * dx + py * dy) / length2, 0.0), 1.0)
+                px -= t * dx
+                py -= t * dy
+            result[k] = (px * px + py * py) ** 0.5
+        return result
+
+class LODTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.poly = random_walk(300)
+        self.pyramid = LODPyramid(self.poly)
+
+    def testLevels(self):
+        previous = None
+        for tolerance in (0.0, 0.5, 2.0, 10.0, 50.0, 200.0, 1e6):
+            indexes = self.pyramid.indexes(tolerance)
+            self.assertEqual(indexes, douglas_peucker(self.poly, tolerance))
+
+            level = self.pyramid.level(tolerance)
+            self.assertEqual(len(level), len(indexes))
+            self.assertEqual(list(level), [self.poly[i] for i in indexes])
+
+            #levels are nested
+            if previous is not None:
+                self.assertTrue(set(indexes) <= set(previous))
+            previous = indexes
+
+        self.assertEqual(len(self.pyramid.level(0.0)), len(self.poly))
+        self.assertEqual(len(self.pyramid.level(1e6)), 2)
+
+    def testNumpyFallback(self):
+        numpy = lod_module.numpy
+        try:
+            lod_module.numpy = None
+            importance = lod_module._importance(self.poly)
+        finally:
+            lod_module.numpy = numpy
+
+        for a, b in zip(importance, self.pyramid.importance):
+            self.assertAlmostEqual(a, b, 6)
+
+    def testCache(self):
+        tolerance = 20.0
+        level = self.pyramid.level(tolerance)
+
+        #any tolerance that keeps the same points shares the level
+        count = self.pyramid.count(tolerance)
+        ranks = sorted(self.pyramid.importance, reverse=True)
+        self.assertTrue(self.pyramid.level((ranks[count - 1] + ranks[count]) / 2) is level)
+
+        encoded = self.pyramid.encode(tolerance)
+        self.assertEqual(encoded, encode_polyline(level))
+        self.assertTrue(self.pyramid.encode(tolerance) is encoded)
+
+        json = self.pyramid.to_json(tolerance)
+        self.assertEqual(json, GcsJSONEncoder().encode_polyline(level))
+        self.assertTrue(self.pyramid.to_json(tolerance) is json)
+
+    def testZoom(self):
+        self.assertAlmostEqual(tolerance_for_zoom(0), 156543.03, 2)
+        self.assertAlmostEqual(tolerance_for_zoom(10, 60.0), 156543.03 / 1024 / 2, 2)
+        self.assertAlmostEqual(tolerance_for_zoom(3, 0.0, 4.0), 156543.03 / 2, 2)
+
+        counts = [len(self.pyramid.level_for_zoom(zoom)) for zoom in range(2, 20)]
+        self.assertEqual(counts, sorted(counts))
+        self.assertEqual(counts[0], 2)
+
+    def testClosed(self):
+        points = [LatLng(35.0, -78.0), LatLng(35.01, -78.0), LatLng(35.01, -77.99), LatLng(35.0, -77.99),
+                  LatLng(35.0, -78.0)]
+        pyramid = LODPyramid(Polyline(points))
+        self.assertEqual(len(pyramid.level(1.0)), 5)
+        self.assertEqual(pyramid.indexes(1e6), [0, 4])
+
+if __name__ == '__main__':
+    unittest.main()
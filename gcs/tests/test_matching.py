@@ -0,0 +1,60 @@
+import unittest
+import random
+
+from gcs import LatLng, Polyline, SnapOptions
+from gcs.matching import MapMatcher
+
+class MapMatcherTestCase(unittest.TestCase):
+
+    def setUp(self):
+        #two parallel streets about 22 meters apart
+        self.routes = {
+            'main': Polyline([LatLng(35.8, -78.70 + i * 0.001) for i in range(11)]),
+            'side': Polyline([LatLng(35.8002, -78.70 + i * 0.001) for i in range(11)]),
+        }
+        self.options = SnapOptions(max_distance=40.0)
+
+    def _trace(self, lat, seed):
+        rnd = random.Random(seed)
+        trace = []
+        for i in range(40):
+            lng = -78.699 + i * 0.0002
+            trace.append(LatLng(lat + rnd.uniform(-0.00012, 0.00012), lng))
+        return trace
+
+    def testParallelRoutes(self):
+        trace = self._trace(35.8, 1)
+
+        #snapping independently jumps between the streets
+        independent = set(min(self.routes, key=lambda k: self.routes[k].snap_point(p, self.options).distance_from_initial)
+                          for p in trace)
+        self.assertEqual(independent, set(['main', 'side']))
+
+        matcher = MapMatcher(self.routes, self.options, sigma=15.0, window=5)
+        matches = matcher.match(trace)
+
+        self.assertEqual(len(matches), len(trace))
+        self.assertEqual([m.latlng for m in matches], trace)
+        self.assertEqual(set(m.key for m in matches), set(['main']))
+
+    def testWindow(self):
+        matcher = MapMatcher(self.routes, self.options, window=3)
+        decided = []
+
+        for point in self._trace(35.8002, 2)[:10]:
+            decided.extend(matcher.update(point))
+            self.assertTrue(len(matcher) <= 3)
+
+        self.assertEqual(len(decided), 7)
+        decided.extend(matcher.flush())
+        self.assertEqual(len(decided), 10)
+        self.assertEqual(len(matcher), 0)
+
+    def testUnmatched(self):
+        matcher = MapMatcher(self.routes, self.options, window=3)
+        matches = matcher.match([LatLng(35.8, -78.699), LatLng(36.5, -78.0), LatLng(35.8, -78.698)])
+
+        self.assertEqual([m.key for m in matches], ['main', None, 'main'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,90 @@
+import unittest
+
+from gcs import LatLng, Polyline
+from gcs import overlap as overlap_module
+from gcs.overlap import overlap, pairwise_overlap, cross_track_distances
+from gcs.tests.shapes import line
+
+class OverlapTestCase(unittest.TestCase):
+
+    def setUp(self):
+        start = LatLng(35.0, -78.0)
+        #base runs 2 km east
+        self.base = Polyline(line(start, 90, 2000.0))
+
+        #other runs along base 5 m to the north for 1 km, turns north for 500 m,
+        #comes back and runs along base again for the last 500 m
+        shifted = start.apply_bearing_and_distance(0.0, 5.0)
+        points = line(shifted, 90, 1000.0)
+        points += line(points[-1], 0, 500.0)[1:]
+        points += line(points[-1], 90, 500.0)[1:]
+        points += line(points[-1], 180, 500.0)[1:]
+        points += line(points[-1], 90, 500.0)[1:]
+        self.other = Polyline(points)
+
+    def testCrossTrackDistances(self):
+        points = [LatLng(35.0, -77.99).apply_bearing_and_distance(0.0, d) for d in (0.0, 7.0, 30.0, 500.0)]
+        distances = cross_track_distances(self.base, points, 50.0)
+
+        #the great circle of base bows a few centimeters north of the parallel
+        self.assertAlmostEqual(distances[0], 0.0, 1)
+        self.assertAlmostEqual(distances[1], 7.0, 1)
+        self.assertAlmostEqual(distances[2], 30.0, 1)
+        self.assertEqual(distances[3], None)
+
+    def testCrossTrackDistancesWithoutNumpy(self):
+        points = [LatLng(35.0, -77.99).apply_bearing_and_distance(0.0, d) for d in (0.0, 7.0, 30.0, 500.0)]
+        expected = cross_track_distances(self.base, points, 50.0)
+
+        numpy = overlap_module.numpy
+        overlap_module.numpy = None
+        try:
+            distances = cross_track_distances(self.base, points, 50.0)
+        finally:
+            overlap_module.numpy = numpy
+
+        for a, b in zip(distances, expected):
+            if b is None:
+                self.assertEqual(a, None)
+            else:
+                self.assertAlmostEqual(a, b, 6)
+
+    def testOverlap(self):
+        result = overlap(self.base, self.other, 20.0)
+
+        self.assertEqual(len(result.shared), 2)
+        self.assertEqual(len(result.unshared), 1)
+
+        first, second = result.shared
+        self.assertEqual(first.start, 0.0)
+        self.assertAlmostEqual(first.end, 1020.0, -1)
+        self.assertAlmostEqual(second.start, 2490.0, -1)
+        self.assertAlmostEqual(second.end, self.other.distance, 3)
+
+        gap = result.unshared[0]
+        self.assertEqual(gap.start, first.end)
+        self.assertEqual(gap.end, second.start)
+        self.assertAlmostEqual(result.ratio, 1500.0 / 3000.0, 1)
+
+        #the parts keep the original points of other
+        self.assertTrue(all(p in self.other.points for p in gap.polyline[1:-1]))
+
+    def testSubtractFrom(self):
+        parts = self.base.subtract_from(self.other, 20.0)
+        self.assertEqual(len(parts), 1)
+        self.assertAlmostEqual(parts[0].distance, 1470.0, -1)
+
+        far = Polyline(line(LatLng(36.0, -78.0), 0, 500.0))
+        self.assertEqual(self.base.subtract_from(far, 20.0), [far])
+        self.assertEqual(self.base.subtract_from(self.base, 1.0), [])
+
+    def testPairwise(self):
+        far = Polyline(line(LatLng(36.0, -78.0), 0, 500.0))
+        result = pairwise_overlap([self.base, self.other, far], 20.0)
+
+        self.assertEqual(sorted(result), [(0, 1), (1, 0)])
+        #base from 1000 m to 1500 m is not along other
+        self.assertAlmostEqual(result[(1, 0)].ratio, 1530.0 / 2000.0, 2)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,11 +1,15 @@
 import unittest
+import random
 
-from shapely.geometry import Point, LineString
+from math import radians
+
+from shapely.geometry import Point, LineString, box
 from gcs.encoders.google_polyline import decode_polyline
-from gcs import polyline, Polyline, LatLng
+from gcs import polyline, Polyline, LatLng, LatLngBounds, GeoLine
 
 WIDTH_OF_ROAD_KM =  (3.6576 / 1000) #12 feet radius
 
+SPLIT_POLYLINE = "izwbEhu_nN|Bp@X}AyHoB_JqCq@bCk@bCvAiGp@iET}AqD}@vCeRxAkCPoA|AuJvCt@_AzEgCq@KCxBaMnDbAzKvCoApH~Bj@f@yCb@uCvHvBmAjHnBh@LBnAiHxFzArBp@iDzReBi@mD_AALy@`E}GcB_JmCu@S]]RsAAcBEyCJ_Add@xL~Ab@RgAf@yCnBd@tA^z@_F|Ab@zJhCpK`DfJ`CrGtB`BPbIzBdPfEnN`EO~@e@fCpPjEnHpB|A}J~AZx@PpHnCva@jLd@NbGq]rPdEc@`CiA`HoL}CcCo@zH{d@~JdCdKrCn`@vJtJnCzEwXfIe_@rCyNz@wFx@YjDj@~DClEeA`C_AvDeCzQwPdFoDrGaD|J{DnBeA`CaBzJsIjDsB`GmBfDYhGD~E`AtExAhNhDxDpB~M~I|Bz@jDd@p@TpFp@|AZfD|@|Dz@ZkGDuGZu@f@YtE@n@FvF`BGXFYkGeBkIIy@l^H\_@j[KfBmCdNy@zEcBpMgDtRMLWlAkAlHHVm@~EoIji@mFv^{I|f@WhAYf@aBY_NqD}@W|@yF^??{AHs@x@uEJIwD}@UDO@MDOf@~EnAs@jE?zA_@?}@xFqLcDk@G`@jD`BrKdAfEkBbARj@UnA~@NnC|@hA|Ah@W|@bAlCjBtAt@hC|@|q@rP|`@dKrDt@fIvBfDt@zEnBdDhCpBjCdCxFdAdE\tCDdEYxGk@hCc@Pe@@mAOKHi@dDcAtFvAZPj@B|@gS~cAUdBQ~ELnD`@jDlG`\zClPf@nDPjBP|EKzCqUuFuA`JZLgCzQvDz@Bi@m@qA?a@@QkB[cC~O@|@Z|@x@j@vEjAT^vAXt@Bx@a@n@}Ad@s@VKn@n@BhAcEvXMvBiBnuAu@tRQpA]fAo@nAy@|@y@l@qA`@yCRia@QuI|@a[lE_BN_B@}DWwDaAkCqAaCoBgAaAsBoC_EeI{Zet@iSae@sNs]wCmEoBuB{D_DqFyCulBst@iWkKiD{ByBeC{A_C}BmHi@iDUeDBcF|B_k@j@sM?y@UwCy@oCkAgB_AaAiAu@aBk@uDWoG`AyBEs@QcEqAcViK_\oJchAkZmDyAe@o@w@eBiE}PY{ETqG|@iJnQyhARcD?{Es@oFaCoHsDwNGiA_A{CgDuFyCmFy@m@kAIiAJc@FWZkAc@kGmAuIiCY|A{Bq@"
 
 
 class PolylineTestCase(unittest.TestCase):
@@ -115,7 +119,7 @@ class PolylineTestCase(unittest.TestCase):
 
 
     def testSplit(self):
-        polyline_str = "izwbEhu_nN|Bp@X}AyHoB_JqCq@bCk@bCvAiGp@iET}AqD}@vCeRxAkCPoA|AuJvCt@_AzEgCq@KCxBaMnDbAzKvCoApH~Bj@f@yCb@uCvHvBmAjHnBh@LBnAiHxFzArBp@iDzReBi@mD_AALy@`E}GcB_JmCu@S]]RsAAcBEyCJ_Add@xL~Ab@RgAf@yCnBd@tA^z@_F|Ab@zJhCpK`DfJ`CrGtB`BPbIzBdPfEnN`EO~@e@fCpPjEnHpB|A}J~AZx@PpHnCva@jLd@NbGq]rPdEc@`CiA`HoL}CcCo@zH{d@~JdCdKrCn`@vJtJnCzEwXfIe_@rCyNz@wFx@YjDj@~DClEeA`C_AvDeCzQwPdFoDrGaD|J{DnBeA`CaBzJsIjDsB`GmBfDYhGD~E`AtExAhNhDxDpB~M~I|Bz@jDd@p@TpFp@|AZfD|@|Dz@ZkGDuGZu@f@YtE@n@FvF`BGXFYkGeBkIIy@l^H\_@j[KfBmCdNy@zEcBpMgDtRMLWlAkAlHHVm@~EoIji@mFv^{I|f@WhAYf@aBY_NqD}@W|@yF^??{AHs@x@uEJIwD}@UDO@MDOf@~EnAs@jE?zA_@?}@xFqLcDk@G`@jD`BrKdAfEkBbARj@UnA~@NnC|@hA|Ah@W|@bAlCjBtAt@hC|@|q@rP|`@dKrDt@fIvBfDt@zEnBdDhCpBjCdCxFdAdE\tCDdEYxGk@hCc@Pe@@mAOKHi@dDcAtFvAZPj@B|@gS~cAUdBQ~ELnD`@jDlG`\zClPf@nDPjBP|EKzCqUuFuA`JZLgCzQvDz@Bi@m@qA?a@@QkB[cC~O@|@Z|@x@j@vEjAT^vAXt@Bx@a@n@}Ad@s@VKn@n@BhAcEvXMvBiBnuAu@tRQpA]fAo@nAy@|@y@l@qA`@yCRia@QuI|@a[lE_BN_B@}DWwDaAkCqAaCoBgAaAsBoC_EeI{Zet@iSae@sNs]wCmEoBuB{D_DqFyCulBst@iWkKiD{ByBeC{A_C}BmHi@iDUeDBcF|B_k@j@sM?y@UwCy@oCkAgB_AaAiAu@aBk@uDWoG`AyBEs@QcEqAcViK_\oJchAkZmDyAe@o@w@eBiE}PY{ETqG|@iJnQyhARcD?{Es@oFaCoHsDwNGiA_A{CgDuFyCmFy@m@kAIiAJc@FWZkAc@kGmAuIiCY|A{Bq@"
+        polyline_str = SPLIT_POLYLINE
         poly = decode_polyline(polyline_str)
         
         splits = poly.split_at_angle()
@@ -124,8 +128,297 @@ class PolylineTestCase(unittest.TestCase):
         self.assertAlmostEqual(splits_sum, poly.distance)
         
         self.assertEqual(poly, Polyline.concat_multiple(splits))
-                
+    
+    def testMeasures(self):
+        point1 = LatLng(37.739323, -122.473586)
+        point2 = LatLng(37.749832, -122.453332)
+        
+        poly = Polyline(point1, point2, point1)
+        measures = poly.measures
+        
+        self.assertEqual(len(measures), len(poly))
+        self.assertEqual(measures[0], 0.0)
+        self.assertAlmostEqual(measures[1], point1.distance_to(point2))
+        self.assertAlmostEqual(measures[-1], poly.distance)
+        
+        poly.append(point2)
+        self.assertEqual(len(poly.measures), 4)
+    
+    def testSegmentIndexSnap(self):
+        poly = decode_polyline(SPLIT_POLYLINE)
+        options = polyline.SnapOptions(max_distance=30.0)
+        
+        threshold = polyline.SEGMENT_INDEX_THRESHOLD
+        self.assertTrue(len(poly.lines) > threshold)
+        
+        points = [line.point_at_distance(line.distance / 2).apply_bearing_and_distance(line.angle + 1.5, 10.0) 
+                  for line in poly.lines[::7]] + list(poly)[::11]
+        
+        indexed = [poly.snap_point_all(p, options) for p in points]
+        
+        polyline.SEGMENT_INDEX_THRESHOLD = len(poly.lines)
+        try:
+            scanned = [poly.snap_point_all(p, options) for p in points]
+        finally:
+            polyline.SEGMENT_INDEX_THRESHOLD = threshold
+        
+        for a, b in zip(indexed, scanned):
+            self.assertTrue(len(b) > 0)
+            self.assertEqual([(s.index, s.point) for s in a], [(s.index, s.point) for s in b])
+            self.assertEqual([s.polyline_distance for s in a], [s.polyline_distance for s in b])
+    
+    def testClosestPoint(self):
+        poly = decode_polyline(SPLIT_POLYLINE)
+        self.assertTrue(len(poly.lines) > polyline.SEGMENT_INDEX_THRESHOLD)
+        
+        bounds = poly.bounds.buffer(2000.0)
+        rnd = random.Random(7)
+        points = [LatLng(rnd.uniform(bounds.south, bounds.north), rnd.uniform(bounds.west, bounds.east)) for _ in range(50)]
+        points.append(LatLng(bounds.north + 1.0, bounds.east + 1.0))
+        
+        for point, closest in zip(points, poly.closest_points(points)):
+            expected = min((L.closest_point(point) for L in poly.lines), key=lambda x: x.distance_to(point))
+            self.assertAlmostEqual(closest.distance_to(point), expected.distance_to(point), 6)
+    
+    def testClosestPointContinental(self):
+        #segments thousands of kilometers long, spanning tens of degrees
+        rnd = random.Random(8)
+        poly = Polyline([LatLng(rnd.uniform(-70, 70), rnd.uniform(-170, 170)) for _ in range(100)])
+        self.assertTrue(len(poly.lines) > polyline.SEGMENT_INDEX_THRESHOLD)
+        
+        points = [LatLng(rnd.uniform(-80, 80), rnd.uniform(-180, 180)) for _ in range(200)]
+        for point, closest in zip(points, poly.closest_points(points)):
+            expected = min((L.closest_point(point) for L in poly.lines), key=lambda x: x.distance_to(point))
+            self.assertAlmostEqual(closest.distance_to(point), expected.distance_to(point), 6)
+    
+    def testSeries(self):
+        poly = decode_polyline(SPLIT_POLYLINE)
+        
+        lengths = list(poly.segment_lengths())
+        bearings = list(poly.bearings())
+        turns = list(poly.turn_angles())
+        
+        self.assertEqual(len(lengths), len(poly) - 1)
+        self.assertEqual(len(bearings), len(poly) - 1)
+        self.assertEqual(len(turns), len(poly) - 2)
+        
+        for length, bearing, line in zip(lengths, bearings, poly.lines):
+            self.assertAlmostEqual(length, line.distance, 6)
+            self.assertAlmostEqual(bearing, line.angle, 6)
+        
+        for turn, (A, B) in zip(turns, poly.angles):
+            self.assertAlmostEqual(turn, A.angle_to(B), 6)
+    
+    def testSplitAtAngle(self):
+        poly = decode_polyline(SPLIT_POLYLINE)
+        threshold = 0.5
+        
+        expected = [list(poly[:2])]
+        for A, B in poly.angles:
+            if A.distance >= 0.001 and B.distance >= 0.001 and A.angle_to(B) > threshold:
+                expected.append(list(B.points))
+            else:
+                expected[-1].append(B.end)
+        
+        splits = poly.split_at_angle(threshold)
+        self.assertTrue(len(splits) > 1)
+        self.assertEqual(splits, [Polyline(points) for points in expected])
+    
+    def testLineClosestPoint(self):
+        start = LatLng(35.0, -78.0)
+        end = LatLng(35.0, -77.9)
+        line = GeoLine(start, end)
+        
+        self.assertEqual(line.closest_point(LatLng(35.0, -78.5)), start)
+        self.assertEqual(line.closest_point(LatLng(35.0, -77.5)), end)
+        
+        middle = line.closest_point(LatLng(35.01, -77.95))
+        self.assertAlmostEqual(middle.lng, -77.95, 3)
+        self.assertAlmostEqual(middle.lat, 35.0, 3)
+    
+    def testProjectMany(self):
+        #out and back along the same road, 10 m apart
+        start = LatLng(35.0, -78.0)
+        out = [start.apply_bearing_and_distance(radians(90), i * 50.0) for i in range(41)]
+        back = [p.apply_bearing_and_distance(0.0, 10.0) for p in reversed(out)]
+        for points in (out[::10] + back[::10], out + back):
+            poly = Polyline(points)
+            
+            stops = [start.apply_bearing_and_distance(radians(90), d) for d in (0.0, 700.0, 1500.0, 1500.0, 700.0, 0.0)]
+            measures = poly.project_many(stops)
+            
+            self.assertEqual(len(measures), len(stops))
+            self.assertEqual(measures, sorted(measures))
+            self.assertAlmostEqual(measures[1], 700.0, 0)
+            self.assertAlmostEqual(measures[4], poly.distance - 700.0, 0)
+            
+            #closest projections only would go back to the way out
+            self.assertTrue(poly.snap_point(stops[4], polyline.SnapOptions(max_distance=20.0)).polyline_distance < 1000.0)
+        
+        self.assertEqual(poly.project_many([]), [])
+    
+    def testDedup(self):
+        rnd = random.Random(5)
+        points = []
+        for i in range(20):
+            stop = LatLng(35.0, -78.0 + i * 0.001)
+            points.append(stop)
+            for _ in range(10):
+                points.append(stop.apply_bearing_and_distance(rnd.uniform(0, 6.28), rnd.uniform(0, 0.05)))
+        poly = Polyline(points)
+        
+        deduped = poly.dedup(0.5)
+        self.assertEqual(len(deduped), 20)
+        self.assertEqual(deduped[0], poly[0])
+        self.assertEqual(deduped[-1], poly[-1])
+        self.assertTrue(all(A.distance >= 0.5 for A in deduped.lines[:-1]))
+        
+        self.assertEqual(poly.dedup(0.0), poly)
+        self.assertEqual(len(Polyline(points[:5]).dedup(1.0)), 2)
+    
+    def testView(self):
+        poly = Polyline([LatLng(35.0, -78.0).apply_bearing_and_distance(0.3 * i, 100.0 * i) for i in range(10)])
+        points = list(poly)
+        
+        for start, stop, reverse in ((None, None, True), (2, 7, False), (2, 7, True), (-4, None, False)):
+            view = poly.view(start, stop, reverse)
+            expected = Polyline(points[start:stop][::-1] if reverse else points[start:stop])
+            
+            self.assertEqual(list(view), list(expected))
+            self.assertEqual(len(view), len(expected))
+            self.assertEqual(view[1], expected[1])
+            self.assertEqual(view[-1], expected[-1])
+            self.assertEqual(view.lines, expected.lines)
+            self.assertEqual(list(view.lines_reversed), list(expected.lines_reversed))
+            self.assertAlmostEqual(view.distance, expected.distance, 6)
+            for a, b in zip(view.measures, expected.measures):
+                self.assertAlmostEqual(a, b, 6)
+            for edge in ('north', 'south', 'east', 'west'):
+                self.assertEqual(getattr(view.bounds, edge), getattr(expected.bounds, edge))
+            self.assertEqual(view.closest_point(points[5]), expected.closest_point(points[5]))
+        
+        #views of views map onto the same polyline
+        nested = poly.view(1, 9, True).view(2, 5, True)
+        self.assertEqual(list(nested), points[4:7])
+        self.assertTrue(nested._polyline is poly)
+        self.assertEqual(poly.inverse.inverse, poly)
+        
+        self.assertRaises(ValueError, poly.view, 3, 4)
+    
+    def testViewShares(self):
+        poly = Polyline([LatLng(35.0 + 0.0001 * (i % 7), -78.0 + 0.001 * i) for i in range(5000)])
+        bounds = LatLngBounds.from_edges(34.0, -77.5, 36.0, -75.0)
+        
+        for view in (poly.view(100, 4900), poly.view(100, 4900, True)):
+            len(view)
+            list(view)
+            view[10], view[-10], view[5:20]
+            view.lines
+            view.clip(bounds)
+            view.dedup(20.0)
+            view.slice_by_measure(1000.0, 50000.0)
+            view.closest_vertex(LatLng(35.0, -76.0))
+            
+            #the view still reads the points of the polyline, which never
+            #built its own line segments
+            self.assertTrue(view._own is None)
+            self.assertTrue(view._polyline is poly)
+            self.assertTrue(view in poly._views)
+            self.assertTrue(poly._lines is None)
+            self.assertTrue(view[0] is poly[4899 if view._reverse else 100])
+    
+    def testViewMutation(self):
+        poly = Polyline([LatLng(35.0, -78.0 + 0.001 * i) for i in range(5)])
+        view = poly.view(1, 4)
+        reverse = poly.inverse
+        distance = view.distance
+        
+        #changing the polyline copies the views first
+        poly[2] = LatLng(36.0, -78.0)
+        self.assertEqual(view[1], LatLng(35.0, -77.998))
+        self.assertEqual(reverse[2], LatLng(35.0, -77.998))
+        self.assertEqual(view.distance, distance)
+        
+        #changing a view copies it without touching the polyline
+        view = poly.view(1, 4)
+        view.append(LatLng(37.0, -78.0))
+        self.assertEqual(len(view), 4)
+        self.assertEqual(len(poly), 5)
+        self.assertEqual(view[1], LatLng(36.0, -78.0))
+        self.assertTrue(view.distance > distance)
+        
+        tail = poly.inverse.split_at(2)
+        self.assertEqual(len(poly), 5)
+        self.assertEqual(tail.first, poly[2])
+    
+    def testSliceByMeasure(self):
+        poly = Polyline([LatLng(35.0, -78.0).apply_bearing_and_distance(0.3 * i, 100.0 * i) for i in range(10)])
+        measures = poly.measures
+        
+        part = poly.slice_by_measure(150.0, 1200.0)
+        self.assertAlmostEqual(part.distance, 1050.0, 3)
+        self.assertAlmostEqual(poly.closest_point(part.first).distance_to(part.first), 0.0, 3)
+        self.assertEqual(list(part)[1:-1], [p for p, m in zip(poly, measures) if 150.0 < m < 1200.0])
+        
+        #on vertices, shares the points
+        part = poly.slice_by_measure(measures[2], measures[6])
+        self.assertEqual(list(part), list(poly)[2:7])
+        self.assertTrue(isinstance(part, polyline.PolylineView))
+        
+        #within one line segment, and clamped to the polyline
+        part = poly.slice_by_measure(measures[3] + 10.0, measures[3] + 20.0)
+        self.assertEqual(len(part), 2)
+        self.assertAlmostEqual(part.distance, 10.0, 3)
+        self.assertEqual(poly.slice_by_measure(-10.0, 1e9), poly)
+        
+        self.assertRaises(ValueError, poly.slice_by_measure, 500.0, 100.0)
+    
+    def testClip(self):
+        rnd = random.Random(7)
+        points = [LatLng(35.0, -78.0)]
+        for _ in range(200):
+            points.append(points[-1].apply_bearing_and_distance(rnd.uniform(0, 6.28), 100.0))
+        poly = Polyline(points)
+        line = LineString([(p.lng, p.lat) for p in poly])
+        
+        bounds = poly.bounds
+        d_lat = bounds.north - bounds.south
+        d_lng = bounds.east - bounds.west
+        for _ in range(10):
+            south = bounds.south + rnd.uniform(0, 0.8) * d_lat
+            west = bounds.west + rnd.uniform(0, 0.8) * d_lng
+            clip = LatLngBounds.from_edges(south, west, south + 0.3 * d_lat, west + 0.3 * d_lng)
+            
+            parts = poly.clip(clip)
+            expected = line.intersection(box(clip.west, clip.south, clip.east, clip.north))
+            
+            length = 0.0
+            for part in parts:
+                for point in part:
+                    self.assertTrue(clip.buffer(0.01).contains(point))
+                length += LineString([(p.lng, p.lat) for p in part]).length
+            self.assertAlmostEqual(length, expected.length, 9)
+            
+            #parts end where the polyline leaves the bounds
+            for a, b in zip(parts, parts[1:]):
+                self.assertTrue(a.last != b.first or not clip.contains(a.last))
+        
+        self.assertEqual(poly.clip(bounds.buffer(10.0)), [poly])
+        self.assertEqual(poly.clip(LatLngBounds.from_edges(0.0, 0.0, 1.0, 1.0)), [])
+    
+    def testSplitAtPoint(self):
+        poly = Polyline([LatLng(35.0, -78.0 + 0.001 * i) for i in range(100)])
+        point = LatLng(35.00001, -77.9505)
+        
+        self.assertEqual(poly.split_at_point(LatLng(35.01, -77.9505), 10.0), None)
+        self.assertEqual(len(poly), 100)
         
+        tail = poly.split_at_point(point, 10.0)
+        self.assertEqual(len(poly), 51)
+        self.assertEqual(poly.last, point)
+        self.assertEqual(tail.first, point)
+        self.assertEqual(tail[1], LatLng(35.0, -77.950))
+        self.assertEqual(len(tail), 51)
 
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
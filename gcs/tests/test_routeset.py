@@ -0,0 +1,49 @@
+import unittest
+
+from gcs import LatLng, Polyline, SnapOptions
+from gcs.routeset import RouteSet
+
+class RouteSetTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.routes = {
+            'north': Polyline(LatLng(35.80, -78.70), LatLng(35.80, -78.65), LatLng(35.80, -78.60)),
+            'south': Polyline(LatLng(35.70, -78.70), LatLng(35.70, -78.60)),
+            'parallel': Polyline(LatLng(35.8002, -78.70), LatLng(35.8002, -78.60)),
+        }
+        self.route_set = RouteSet(self.routes)
+        self.options = SnapOptions(max_distance=50.0)
+
+    def testSnap(self):
+        point = LatLng(35.79995, -78.66)
+
+        key, snap = self.route_set.snap(point, self.options)
+        self.assertEqual(key, 'north')
+
+        expected = self.routes['north'].snap_point(point, self.options)
+        self.assertEqual(snap.point, expected.point)
+        self.assertAlmostEqual(snap.polyline_distance, expected.polyline_distance)
+
+    def testSnapAll(self):
+        point = LatLng(35.8001, -78.66)
+
+        snaps = self.route_set.snap_all(point, self.options)
+        self.assertEqual(sorted(key for key, _ in snaps), ['north', 'parallel'])
+
+        distances = [snap.distance_from_initial for _, snap in snaps]
+        self.assertEqual(distances, sorted(distances))
+
+    def testNoSnap(self):
+        self.assertEqual(self.route_set.snap(LatLng(35.75, -78.65), self.options), None)
+        self.assertEqual(self.route_set.snap_all(LatLng(35.75, -78.65), self.options), [])
+
+    def testList(self):
+        route_set = RouteSet([self.routes['south'], self.routes['north']])
+        self.assertEqual(len(route_set), 2)
+        self.assertEqual(list(route_set), [0, 1])
+
+        key, _ = route_set.snap(LatLng(35.7001, -78.65), self.options)
+        self.assertEqual(key, 0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,152 @@
+import unittest
+import random
+
+from StringIO import StringIO
+
+from gcs import LatLng, Polyline
+from gcs import similarity
+
+from gcs.similarity import hausdorff, frechet, hausdorff_many, frechet_many, SimilarityMatrix
+
+def brute_force_hausdorff(a, b):
+    directed = lambda x, y: max(min(p.distance_to(q) for q in y) for p in x)
+    return max(directed(a, b), directed(b, a))
+
+def brute_force_frechet(a, b):
+    table = {}
+    for i, p in enumerate(a):
+        for j, q in enumerate(b):
+            d = p.distance_to(q)
+            if i == 0 and j == 0:
+                table[i, j] = d
+            elif i == 0:
+                table[i, j] = max(d, table[i, j - 1])
+            elif j == 0:
+                table[i, j] = max(d, table[i - 1, j])
+            else:
+                table[i, j] = max(d, min(table[i - 1, j], table[i - 1, j - 1], table[i, j - 1]))
+    return table[len(a) - 1, len(b) - 1]
+
+def trace(rnd, start, count, noise=0.0):
+    points = []
+    for i in range(count):
+        point = start.apply_bearing_and_distance(1.0, i * 40.0)
+        points.append(point.apply_bearing_and_distance(rnd.uniform(0, 6.28), rnd.uniform(0, noise)))
+    return Polyline(points)
+
+class SimilarityTestCase(unittest.TestCase):
+
+    def setUp(self):
+        rnd = random.Random(11)
+        start = LatLng(35.78, -78.64)
+        self.a = trace(rnd, start, 300)
+        self.b = trace(rnd, start, 300, noise=15.0)
+        self.far = trace(rnd, start.apply_bearing_and_distance(0.0, 2000.0), 50)
+
+    def check(self, func, expected):
+        self.assertAlmostEqual(func(self.a, self.b), expected(self.a, self.b), 3)
+        self.assertAlmostEqual(func(self.b, self.a), expected(self.b, self.a), 3)
+        self.assertAlmostEqual(func(self.a, self.far), expected(self.a, self.far), 3)
+
+        distance = func(self.a, self.b)
+        self.assertEqual(func(self.a, self.b, distance + 1.0), distance)
+        self.assertEqual(func(self.a, self.b, distance - 1.0), None)
+        self.assertEqual(func(self.a, self.far, 100.0), None)
+
+    def testHausdorff(self):
+        self.check(hausdorff, brute_force_hausdorff)
+        self.assertEqual(hausdorff(self.a, self.a.inverse), 0.0)
+
+    def testFrechet(self):
+        self.check(frechet, brute_force_frechet)
+        #the same points walked in the other direction are far apart
+        self.assertTrue(frechet(self.a, self.a.inverse) > self.a.distance / 2)
+        self.assertTrue(frechet(self.a, self.b) >= hausdorff(self.a, self.b))
+
+    def testWithoutNumpy(self):
+        numpy = similarity.numpy
+        similarity.numpy = None
+        try:
+            self.check(hausdorff, brute_force_hausdorff)
+            self.check(frechet, brute_force_frechet)
+        finally:
+            similarity.numpy = numpy
+
+    def testMany(self):
+        polylines = [self.a, self.far, self.b]
+
+        result = hausdorff_many(polylines, max_distance=100.0)
+        self.assertEqual(sorted(result), [(0, 2)])
+        self.assertAlmostEqual(result[(0, 2)], hausdorff(self.a, self.b), 6)
+
+        result = frechet_many([self.b], polylines, max_distance=100.0)
+        self.assertEqual(sorted(result), [(0, 0), (0, 2)])
+        self.assertEqual(result[(0, 2)], 0.0)
+
+calls = []
+
+def counting_hausdorff(a, b, max_distance=None):
+    calls.append((a, b))
+    return hausdorff(a, b, max_distance)
+
+class SimilarityMatrixTestCase(unittest.TestCase):
+
+    def setUp(self):
+        rnd = random.Random(12)
+        self.shapes = {}
+        for k in range(12):
+            start = LatLng(35.78, -78.64).apply_bearing_and_distance(rnd.uniform(0, 6.28), rnd.uniform(0, 3000.0))
+            self.shapes['s%02d' % k] = trace(rnd, start, 40)
+            #a near duplicate of every shape
+            self.shapes['d%02d' % k] = trace(rnd, start, 40, noise=10.0)
+
+    def expected(self, shapes):
+        keys = sorted(shapes)
+        result = hausdorff_many([shapes[k] for k in keys], max_distance=30.0)
+        return sorted(((keys[i], keys[j]), d) for (i, j), d in result.iteritems())
+
+    def testUpdate(self):
+        matrix = SimilarityMatrix(max_distance=30.0)
+        self.assertEqual(matrix.update(self.shapes), set(self.shapes))
+        self.assertEqual(matrix.items(), self.expected(self.shapes))
+        self.assertTrue(len(matrix) >= 12)
+
+        self.assertEqual(matrix['s03', 'd03'], matrix['d03', 's03'])
+        self.assertEqual(matrix['s03', 's03'], 0.0)
+        self.assertTrue('d03' in matrix.neighbors('s03'))
+
+    def testIncremental(self):
+        matrix = SimilarityMatrix(counting_hausdorff, max_distance=30.0)
+        matrix.update(self.shapes)
+
+        shapes = dict(self.shapes)
+        shapes['s01'] = Polyline(list(shapes['s01'])[:-5])
+        del shapes['s02']
+
+        del calls[:]
+        self.assertEqual(matrix.update(shapes), set(['s01', 's02']))
+        self.assertTrue(calls)
+        self.assertTrue(all(shapes['s01'] in pair for pair in calls))
+        self.assertEqual(matrix.items(), self.expected(shapes))
+
+        del calls[:]
+        self.assertEqual(matrix.update(shapes), set())
+        self.assertEqual(calls, [])
+
+    def testProcesses(self):
+        matrix = SimilarityMatrix(max_distance=30.0, processes=2, chunk_size=4)
+        matrix.update(self.shapes)
+        self.assertEqual(matrix.items(), self.expected(self.shapes))
+
+    def testWrite(self):
+        matrix = SimilarityMatrix(max_distance=30.0)
+        matrix.update(self.shapes)
+
+        output = StringIO()
+        matrix.write(output)
+        lines = output.getvalue().splitlines()
+        self.assertEqual(lines[0], 'key_a,key_b,distance')
+        self.assertEqual(len(lines), len(matrix) + 1)
+
+if __name__ == '__main__':
+    unittest.main()
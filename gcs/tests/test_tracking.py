@@ -0,0 +1,71 @@
+import unittest
+import pickle
+
+from math import radians
+
+from gcs import LatLng, Polyline
+from gcs.tracking import ProgressTracker
+
+class ProgressTrackerTestCase(unittest.TestCase):
+
+    def setUp(self):
+        #out and back along the same road, 10 m apart, 50 m segments
+        start = LatLng(35.0, -78.0)
+        out = [start.apply_bearing_and_distance(radians(90), i * 50.0) for i in range(41)]
+        back = [p.apply_bearing_and_distance(0.0, 10.0) for p in reversed(out)]
+        self.poly = Polyline(out + back)
+        self.start = start
+
+        self.stops = self.poly.project_many([out[10], out[30], back[10], back[30]])
+
+    def ping(self, measure):
+        '''Position at measure along the shape, 3 m off to the north.'''
+        return self.poly.interpolate(measure / self.poly.distance).apply_bearing_and_distance(0.0, 3.0)
+
+    def testProgress(self):
+        tracker = ProgressTracker(self.poly, self.stops)
+        self.assertEqual(tracker.etas(), [None] * 4)
+
+        for t in range(0, 350, 10):
+            measure = tracker.update(self.ping(t * 10.0), t)
+            #the way back is within a few meters of the way out, it must not be matched
+            self.assertAlmostEqual(measure, t * 10.0, -1)
+
+        self.assertAlmostEqual(tracker.speed, 10.0, 1)
+        self.assertEqual(tracker.next_stop, 3)
+
+        etas = tracker.etas()
+        self.assertEqual(len(etas), 1)
+        self.assertAlmostEqual(etas[0], (self.stops[3] - tracker.measure) / 10.0, -1)
+
+    def testNoise(self):
+        tracker = ProgressTracker(self.poly)
+        tracker.update(self.ping(500.0), 0)
+        tracker.update(self.ping(480.0), 10)
+        self.assertEqual(tracker.measure, tracker.update(self.ping(480.0), 10))
+        self.assertTrue(tracker.measure > 495.0)
+
+    def testRelocate(self):
+        tracker = ProgressTracker(self.poly, self.stops)
+        tracker.update(self.ping(100.0), 0)
+        tracker.update(self.ping(200.0), 10)
+
+        #far ahead of the search window, found again on the whole shape
+        measure = tracker.update(self.ping(1700.0), 20)
+        self.assertAlmostEqual(measure, 1700.0, -1)
+        self.assertEqual(tracker.speed, None)
+
+    def testState(self):
+        tracker = ProgressTracker(self.poly, self.stops)
+        tracker.update(self.ping(100.0), 0)
+        tracker.update(self.ping(200.0), 10)
+
+        state = pickle.loads(pickle.dumps(tracker.state, pickle.HIGHEST_PROTOCOL))
+        other = ProgressTracker.from_state(self.poly, state, self.stops)
+        self.assertEqual(other.etas(), tracker.etas())
+
+        self.assertEqual(other.update(self.ping(300.0), 20), tracker.update(self.ping(300.0), 20))
+        self.assertEqual(other.state, tracker.state)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,93 @@
+import unittest
+
+from gcs import LatLng, functions
+from gcs.trajectory import Trajectory
+
+class TrajectoryTestCase(unittest.TestCase):
+
+    def setUp(self):
+        start = LatLng(35.78, -78.64)
+        self.points = [start.apply_bearing_and_distance(0.5, i * 100.0) for i in range(11)]
+        self.times = [i * 10.0 for i in range(11)]
+        self.trajectory = Trajectory.from_latlngs(self.points, self.times)
+
+    def testPositionAt(self):
+        self.assertEqual(self.trajectory.position_at(0.0), self.points[0])
+        self.assertEqual(self.trajectory.position_at(100.0), self.points[-1])
+
+        middle = self.trajectory.position_at(25.0)
+        self.assertAlmostEqual(middle.distance_to(self.points[2]), 50.0, 3)
+        self.assertAlmostEqual(middle.distance_to(self.points[3]), 50.0, 3)
+
+        self.assertRaises(ValueError, self.trajectory.position_at, 101.0)
+
+    def testSlice(self):
+        view = self.trajectory.slice(15.0, 50.0)
+        self.assertTrue(view.is_view)
+        self.assertEqual(len(view), 4)
+        self.assertEqual(view.start_time, 20.0)
+        self.assertEqual(view.end_time, 50.0)
+        self.assertEqual(view[0], (20.0, self.points[2]))
+        self.assertEqual(view[-1], (50.0, self.points[5]))
+
+        #views share storage
+        self.assertTrue(view._times is self.trajectory._times)
+
+        nested = view.slice(30.0, 1000.0)
+        self.assertEqual(len(nested), 3)
+        self.assertRaises(ValueError, nested.position_at, 10.0)
+        self.assertRaises(ValueError, view.append, 60.0, self.points[0])
+
+    def testSeries(self):
+        speeds = list(self.trajectory.speeds())
+        self.assertEqual(len(speeds), 10)
+        for speed in speeds:
+            self.assertAlmostEqual(speed, 10.0, 3)
+
+        headings = list(self.trajectory.headings())
+        self.assertEqual(len(headings), 10)
+        self.assertAlmostEqual(headings[0], self.points[0].angle_to(self.points[1]))
+
+        view = self.trajectory.slice(20.0, 50.0)
+        self.assertEqual(len(view.speeds()), 3)
+
+    def testAppend(self):
+        trajectory = Trajectory()
+        trajectory.append(0.0, self.points[0])
+        trajectory.append(5.0, self.points[1])
+        self.assertEqual(len(trajectory), 2)
+        self.assertAlmostEqual(trajectory.speeds()[0], 20.0, 3)
+        self.assertRaises(ValueError, trajectory.append, 1.0, self.points[2])
+
+    def testAppendAfterColumns(self):
+        view = self.trajectory.slice(0.0, 50.0)
+        times = self.trajectory.times
+        lats = view.lats
+
+        #enough samples to move the storage to a bigger buffer
+        for i in range(11, 5000):
+            self.trajectory.append(i * 10.0, self.points[i % 11])
+
+        self.assertEqual(list(times), self.times)
+        self.assertEqual(list(lats), [p.lat for p in self.points[:6]])
+        self.assertEqual(list(view.times), self.times[:6])
+
+    def testManyFunctions(self):
+        lats1 = [p.lat for p in self.points[:-1]]
+        lngs1 = [p.lng for p in self.points[:-1]]
+        lats2 = [p.lat for p in self.points[1:]]
+        lngs2 = [p.lng for p in self.points[1:]]
+
+        for d, a, b in zip(functions.distance_many(lats1, lngs1, lats2, lngs2), self.points[:-1], self.points[1:]):
+            self.assertAlmostEqual(d, a.distance_to(b), 6)
+
+        numpy = functions.numpy
+        functions.numpy = None
+        try:
+            for d, a, b in zip(functions.bearing_many(lats1, lngs1, lats2, lngs2), self.points[:-1], self.points[1:]):
+                self.assertAlmostEqual(d, a.angle_to(b), 6)
+        finally:
+            functions.numpy = numpy
+
+if __name__ == '__main__':
+    unittest.main()
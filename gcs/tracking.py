@@ -0,0 +1,208 @@
+'''tracking
+
+Provides the ProgressTracker class, for following a vehicle along its shape
+and estimating when it will reach the stops ahead.
+'''
+
+from bisect import bisect_left, bisect_right
+
+class ProgressTracker(object):
+    '''Tracks the progress of one vehicle along a Polyline.
+
+    Each ping is projected onto the line segments around the last known
+    position only, from backtrack meters behind it to lookahead meters ahead
+    of it, so an update costs the same whatever the length of the shape. If
+    the ping is more than max_distance meters from those segments the vehicle
+    is searched for on the whole shape (see Polyline.segment_index).
+
+    Progress never goes backwards unless the vehicle was relocated by a whole
+    shape search. Speed is an exponential moving average of the progress made
+    between pings.
+
+    The state of a tracker is a small tuple (see state and from_state), so a
+    tracker can be handed off to another worker that has the same Polyline.
+
+    >>> from gcs import LatLng, Polyline
+    >>> tracker = ProgressTracker(Polyline(LatLng(35, -78), LatLng(35, -77.99)), [500.0, 900.0])
+    >>> round(tracker.update(LatLng(35.0001, -77.999), 0))
+    91.0
+    >>> round(tracker.update(LatLng(35.0001, -77.998), 10))
+    182.0
+    >>> [round(eta) for eta in tracker.etas()]
+    [35.0, 79.0]
+
+    '''
+
+    def __init__(self, polyline, stop_measures=(), smoothing=0.3, lookahead=500.0,
+                 backtrack=50.0, max_distance=100.0):
+        '''Creates a new ProgressTracker.
+
+        :param polyline: Shape the vehicle is following.
+        :type polyline: Polyline
+        :param stop_measures: Distance along the shape, in meters, of the
+        stops, in order (see Polyline.project_many).
+        :type stop_measures: list
+        :param smoothing: Weight of the latest speed in the moving average,
+        between 0 and 1.
+        :type smoothing: number
+        :param lookahead: How far ahead, in meters, a ping is searched for.
+        :type lookahead: number
+        :param backtrack: How far behind, in meters, a ping is searched for.
+        :type backtrack: number
+        :param max_distance: Distance, in meters, from the shape beyond which
+        the whole shape is searched.
+        :type max_distance: number
+
+        '''
+        self.polyline = polyline
+        self.stop_measures = tuple(stop_measures)
+        self.smoothing = smoothing
+        self.lookahead = lookahead
+        self.backtrack = backtrack
+        self.max_distance = max_distance
+
+        self.index = None #line segment of the last position
+        self.measure = None #distance along the shape of the last position, in meters
+        self.speed = None #smoothed speed along the shape, in meters per second
+        self.timestamp = None #time of the last ping, in seconds
+        self.distance = None #distance of the last ping from the shape, in meters
+
+    @property
+    def state(self):
+        '''The state of the tracker, see from_state.'''
+        return (self.index, self.measure, self.speed, self.timestamp, self.distance)
+
+    @staticmethod
+    def from_state(polyline, state, stop_measures=(), **kwargs):
+        '''Creates a ProgressTracker that continues from the state of another
+        one.
+
+        :param polyline: Shape the vehicle is following.
+        :type polyline: Polyline
+        :param state: State of the other tracker.
+        :type state: tuple
+        :param stop_measures: Distance along the shape of the stops.
+        :type stop_measures: list
+        :returns: Tracker with the given state.
+        :rtype: ProgressTracker
+
+        '''
+        tracker = ProgressTracker(polyline, stop_measures, **kwargs)
+        tracker.index, tracker.measure, tracker.speed, tracker.timestamp, tracker.distance = state
+        return tracker
+
+    def _project(self, latlng, segments):
+        '''Returns (distance, measure, index) of the closest projection of the
+        point onto the given line segments.
+        '''
+        lines = self.polyline.lines
+        measures = self.polyline.measures
+
+        best = None
+        for i in segments:
+            line = lines[i]
+            point = line.closest_point(latlng)
+            distance = point.distance_to(latlng)
+            if best is None or distance < best[0]:
+                best = (distance, measures[i] + line.start.distance_to(point), i)
+        return best
+
+    def _nearby_segments(self):
+        measures = self.polyline.measures
+        start = max(bisect_left(measures, self.measure - self.backtrack) - 1, 0)
+        stop = min(bisect_right(measures, self.measure + self.lookahead), len(measures) - 1)
+        return xrange(start, max(stop, start + 1))
+
+    def _locate(self, latlng):
+        '''Searches the whole shape for the closest projection of the point,
+        best-first through the segment index.
+        '''
+        best = None
+        for lower_bound, i in self.polyline.segment_index.iter_nearest(latlng):
+            if best is not None and lower_bound >= best[0]:
+                break
+            candidate = self._project(latlng, (i, ))
+            if best is None or candidate[0] < best[0]:
+                best = candidate
+        return best
+
+    def update(self, latlng, timestamp):
+        '''Updates the progress with a new ping.
+
+        :param latlng: Position of the vehicle.
+        :type latlng: LatLng
+        :param timestamp: Time of the ping, in seconds.
+        :type timestamp: number
+        :returns: Distance along the shape, in meters.
+        :rtype: number
+
+        '''
+        relocated = self.measure is None
+        projection = None
+
+        if not relocated:
+            projection = self._project(latlng, self._nearby_segments())
+            if projection[0] > self.max_distance:
+                projection = None
+                relocated = True
+
+        if projection is None:
+            projection = self._locate(latlng)
+
+        distance, measure, index = projection
+
+        if relocated:
+            self.speed = None
+        else:
+            if measure < self.measure:
+                #GPS noise, vehicles do not back up along their shape
+                measure, index = self.measure, self.index
+
+            elapsed = timestamp - self.timestamp
+            if elapsed > 0:
+                speed = (measure - self.measure) / float(elapsed)
+                if self.speed is None:
+                    self.speed = speed
+                else:
+                    self.speed += self.smoothing * (speed - self.speed)
+
+        self.index = index
+        self.measure = measure
+        self.timestamp = timestamp
+        self.distance = distance
+        return measure
+
+    @property
+    def next_stop(self):
+        '''Position in stop_measures of the first stop ahead of the vehicle,
+        len(stop_measures) once past the last stop.'''
+        if self.measure is None:
+            return 0
+        return bisect_left(self.stop_measures, self.measure)
+
+    def etas(self, stop_measures=None):
+        '''Estimates the time, in seconds from the last ping, until the vehicle
+        reaches each of the stops ahead at its smoothed speed.
+
+        :param stop_measures: Distance along the shape of the stops, defaults
+        to the tracker's stop_measures.
+        :type stop_measures: list
+        :returns: Time until each stop still ahead (stops behind the vehicle
+        are left out), None for each stop when the speed is not known or is
+        not positive.
+        :rtype: list
+
+        '''
+        if stop_measures is None:
+            stop_measures = self.stop_measures
+
+        if self.measure is None:
+            return [None] * len(stop_measures)
+
+        ahead = stop_measures[bisect_left(stop_measures, self.measure):]
+        if not self.speed or self.speed <= 0:
+            return [None] * len(ahead)
+
+        return [(stop - self.measure) / self.speed for stop in ahead]
+
+__all__ = ['ProgressTracker']
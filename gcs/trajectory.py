@@ -0,0 +1,275 @@
+'''trajectory
+
+Provides the Trajectory class, a timestamped trace of positions.
+'''
+
+from array import array
+from bisect import bisect_left, bisect_right
+
+from gcs.functions import distance_many, bearing_many
+from gcs.latlng import LatLng
+from gcs.line import GeoLine
+from gcs.polyline import Polyline
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+class Trajectory(object):
+    '''An ordered series of (time, position) samples.
+
+    Times, latitudes and longitudes are stored in three typed arrays (see the
+    array module). Slicing by time returns a view that shares the arrays of
+    the trajectory it was sliced from instead of copying them.
+
+    Times are numbers (seconds) and must never decrease.
+
+    >>> trajectory = Trajectory([0, 10], [35.0, 35.0], [-78.0, -77.99])
+    >>> trajectory.position_at(5)
+    LatLng(35.0000001025, -77.9950000000)
+
+    '''
+
+    def __init__(self, times=(), lats=(), lngs=()):
+        '''Creates a new Trajectory.
+
+        :param times: Time of each sample.
+        :type times: sequence
+        :param lats: Latitude of each sample.
+        :type lats: sequence
+        :param lngs: Longitude of each sample.
+        :type lngs: sequence
+
+        '''
+        self._times = array('d', times)
+        self._lats = array('d', lats)
+        self._lngs = array('d', lngs)
+
+        if not (len(self._times) == len(self._lats) == len(self._lngs)):
+            raise ValueError('times, lats and lngs must all have the same length.')
+
+        if any(b < a for a, b in zip(self._times[:-1], self._times[1:])):
+            raise ValueError('times must not decrease.')
+
+        self._start = 0
+        self._stop = None #None means the end of the arrays, so the view grows on append
+
+    @staticmethod
+    def from_latlngs(latlngs, times):
+        '''Creates a Trajectory from LatLngs and their times.
+
+        :param latlngs: Positions.
+        :type latlngs: list
+        :param times: Time of each position.
+        :type times: list
+        :returns: New trajectory.
+        :rtype: Trajectory
+
+        '''
+        latlngs = list(latlngs)
+        return Trajectory(times, [ll.lat for ll in latlngs], [ll.lng for ll in latlngs])
+
+    def _view(self, start, stop):
+        result = Trajectory.__new__(Trajectory)
+        result._times = self._times
+        result._lats = self._lats
+        result._lngs = self._lngs
+        result._start = start
+        result._stop = stop
+        return result
+
+    @property
+    def _end(self):
+        return len(self._times) if self._stop is None else self._stop
+
+    @property
+    def is_view(self):
+        '''Whether the Trajectory shares its storage with another one.'''
+        return self._start != 0 or self._stop is not None
+
+    def __len__(self):
+        '''Gets the number of samples in the Trajectory.
+
+        :returns: Number of samples.
+        :rtype: number
+
+        '''
+        return self._end - self._start
+
+    def __iter__(self):
+        '''Iterates over (time, LatLng) tuples.
+
+        '''
+        for i in xrange(self._start, self._end):
+            yield self._times[i], LatLng(self._lats[i], self._lngs[i])
+
+    def __getitem__(self, index):
+        '''Gets the (time, LatLng) tuple of a sample.
+
+        :param index: Index of the sample.
+        :type index: number
+        :returns: Time and position of the sample.
+        :rtype: tuple
+
+        '''
+        count = len(self)
+        if index < 0:
+            index += count
+        if not 0 <= index < count:
+            raise IndexError('Trajectory index out of range')
+
+        i = self._start + index
+        return self._times[i], LatLng(self._lats[i], self._lngs[i])
+
+    def append(self, time, latlng):
+        '''Adds a sample to the end of the Trajectory.
+
+        :param time: Time of the sample, not before the last one.
+        :type time: number
+        :param latlng: Position of the sample.
+        :type latlng: LatLng
+
+        '''
+        if self.is_view:
+            raise ValueError('Can not append to a view of a Trajectory.')
+
+        if len(self._times) and time < self._times[-1]:
+            raise ValueError('times must not decrease.')
+
+        self._times.append(time)
+        self._lats.append(latlng.lat)
+        self._lngs.append(latlng.lng)
+
+    @property
+    def start_time(self):
+        '''Time of the first sample.'''
+        return self._times[self._start]
+
+    @property
+    def end_time(self):
+        '''Time of the last sample.'''
+        return self._times[self._end - 1]
+
+    @property
+    def duration(self):
+        '''Time between the first and the last sample.'''
+        return self.end_time - self.start_time
+
+    @property
+    def times(self):
+        '''Copy of the times of the samples, a numpy array when numpy is
+        available, otherwise an array.'''
+        return self._column(self._times)
+
+    @property
+    def lats(self):
+        '''Copy of the latitudes of the samples, see times.'''
+        return self._column(self._lats)
+
+    @property
+    def lngs(self):
+        '''Copy of the longitudes of the samples, see times.'''
+        return self._column(self._lngs)
+
+    def _column(self, values):
+        '''Returns a copy of the part of a storage array covered by the
+        Trajectory, as a numpy array when numpy is available.
+
+        The numpy array wraps a slice of the storage array rather than the
+        storage array itself, which append can move to a bigger buffer.
+
+        '''
+        column = values[self._start:self._end]
+        if numpy is not None:
+            return numpy.frombuffer(column, dtype=float)
+        return column
+
+    @property
+    def polyline(self):
+        '''The positions of the Trajectory as a Polyline.'''
+        return Polyline([LatLng(self._lats[i], self._lngs[i]) for i in xrange(self._start, self._end)])
+
+    def position_at(self, time):
+        '''Returns the position at a given time, interpolated along the great
+        circle between the samples before and after it.
+
+        :param time: Time of the position.
+        :type time: number
+        :returns: Position at the given time.
+        :rtype: LatLng
+
+        '''
+        start = self._start
+        end = self._end
+
+        if start == end or not (self._times[start] <= time <= self._times[end - 1]):
+            raise ValueError('time must be within the Trajectory')
+
+        i = bisect_left(self._times, time, start, end)
+        if self._times[i] == time:
+            return LatLng(self._lats[i], self._lngs[i])
+
+        t0 = self._times[i - 1]
+        t1 = self._times[i]
+        line = GeoLine(LatLng(self._lats[i - 1], self._lngs[i - 1]), LatLng(self._lats[i], self._lngs[i]))
+        return line.point_at_distance(line.distance * (time - t0) / (t1 - t0))
+
+    def slice(self, start_time, end_time):
+        '''Returns the samples from start_time to end_time (inclusive) as a
+        view that shares storage with this Trajectory.
+
+        :param start_time: Time of the first sample.
+        :type start_time: number
+        :param end_time: Time of the last sample.
+        :type end_time: number
+        :returns: View of the samples within the time range.
+        :rtype: Trajectory
+
+        '''
+        start = bisect_left(self._times, start_time, self._start, self._end)
+        stop = bisect_right(self._times, end_time, start, self._end)
+        return self._view(start, stop)
+
+    def segment_lengths(self):
+        '''Returns the distance, in meters, between consecutive samples.
+
+        :returns: One distance less than there are samples.
+        :rtype: list
+
+        '''
+        lats = self._column(self._lats)
+        lngs = self._column(self._lngs)
+        return distance_many(lats[:-1], lngs[:-1], lats[1:], lngs[1:])
+
+    def speeds(self):
+        '''Returns the speed, in meters per second, between consecutive
+        samples. Samples with the same time have a speed of 0.0.
+
+        :returns: One speed less than there are samples.
+        :rtype: list
+
+        '''
+        lengths = self.segment_lengths()
+        times = self._column(self._times)
+
+        if numpy is not None:
+            elapsed = numpy.diff(times)
+            return numpy.where(elapsed > 0, lengths / numpy.where(elapsed > 0, elapsed, 1.0), 0.0)
+
+        return [length / (b - a) if b > a else 0.0
+                for length, a, b in zip(lengths, times[:-1], times[1:])]
+
+    def headings(self):
+        '''Returns the bearing, in radians, between consecutive samples (see
+        LatLng.angle_to).
+
+        :returns: One bearing less than there are samples.
+        :rtype: list
+
+        '''
+        lats = self._column(self._lats)
+        lngs = self._column(self._lngs)
+        return bearing_many(lats[:-1], lngs[:-1], lats[1:], lngs[1:])
+
+__all__ = ['Trajectory']